@@ -1,12 +1,12 @@
-from app.extensions import app, db
-from app.main.routes import main
-from app.auth.routes import auth
+import os
+from flask_migrate import upgrade
+from app import create_app
 
-app.register_blueprint(main)
-app.register_blueprint(auth)
+app = create_app()
 
+# The schema is owned by the migrations; bring the database up to the latest revision
 with app.app_context():
-    db.create_all()
+    upgrade(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -20,26 +20,72 @@ def create_app(config_class=None):
         app.config.from_object(config_class)
     
     # Initialize extensions
-    from app.extensions import db, bcrypt, login_manager
+    from app.extensions import db, bcrypt, login_manager, migrate
     db.init_app(app)
+    migrate.init_app(app, db)
     bcrypt.init_app(app)
     login_manager.init_app(app)
     
+    # Count SQL statements per request (and enforce SQLALCHEMY_QUERY_BUDGET)
+    from app import sqlstats
+    sqlstats.init_app(app)
+    
+    # Optional /metrics/pool endpoint
+    from app import poolstats
+    poolstats.init_app(app)
+    
+    # Page cache for anonymous visitors
+    from app.cache import response_cache
+    response_cache.init_app(app)
+    
+    # In-memory category catalog shared by all requests in this worker
+    from app.catalog import category_catalog
+    category_catalog.init_app(app)
+    
+    # In-memory prefix index for ingredient autocomplete
+    from app.ingredient_index import ingredient_index
+    ingredient_index.init_app(app)
+    
+    # In-memory ingredient-to-recipe index for "cook with what I have"
+    from app.pantry import pantry_index
+    pantry_index.init_app(app)
+    
     # Set up login manager
-    from app.models import User
     login_manager.login_view = 'auth.login'
     login_manager.login_message_category = 'info'
     
+    # Users are served from a short-lived cache instead of a query per request
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    # Password hashing runs on a bounded thread pool
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    # Fingerprinted static assets and the asset_url() template helper
+    from app.assets import asset_manifest
+    asset_manifest.init_app(app)
+    
+    # Uploaded images are resized in a process pool, never on the request thread
+    from app.images import image_pipeline
+    image_pipeline.init_app(app)
+    
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(user_id)
     
     # Register blueprints
     from app.auth.routes import auth
     from app.main.routes import main
+    from app.api.routes import api
     
     app.register_blueprint(auth)
     app.register_blueprint(main)
+    app.register_blueprint(api)
+    
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
     
     # Register error handlers
     @app.errorhandler(404)
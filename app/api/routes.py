@@ -0,0 +1,194 @@
+"""
+Read-only JSON API (version 1) for recipes and categories.
+
+Responses are built from column projections rather than ORM objects and
+carry ETags. Recipe ETags are derived from ``Recipe.updated_at``, which
+changes whenever the recipe, its categories or its counters change, so a
+client repeating a request with ``If-None-Match`` gets ``304 Not Modified``
+without the server serializing (or, for detail, even loading) the body.
+"""
+import hashlib
+from flask import Blueprint, jsonify, request, url_for, abort, current_app
+from app.extensions import db
+from app.models import Recipe, User, Ingredient, RecipeIngredient, recipe_categories
+from app.catalog import category_catalog
+from app.ingredient_index import ingredient_index
+from app.pagination import keyset_paginate
+from app.search import search_recipes
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Columns of a recipe in listings
+RECIPE_SUMMARY_COLUMNS = (
+    Recipe.id, Recipe.title, Recipe.preparation_time, Recipe.cooking_time, Recipe.servings,
+    Recipe.image_url, Recipe.created_at, Recipe.updated_at, Recipe.rating_sum, Recipe.rating_count,
+    Recipe.comment_count, Recipe.favorite_count, User.id.label('author_id'), User.username,
+)
+
+# The detail view adds the full description
+RECIPE_DETAIL_COLUMNS = RECIPE_SUMMARY_COLUMNS + (Recipe.description,)
+
+MAX_PER_PAGE = 50
+
+MAX_SUGGESTIONS = 20
+
+
+def make_etag(*parts):
+    """Build a strong ETag value from the parts that determine a response."""
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in ('v1',) + parts).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this ETag, else None."""
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+
+def json_with_etag(payload, etag):
+    """Return a JSON response tagged for conditional requests."""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def serialize_summary(row):
+    """Turn a RECIPE_SUMMARY_COLUMNS row into a dict."""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'preparation_time': row.preparation_time,
+        'cooking_time': row.cooking_time,
+        'servings': row.servings,
+        'image_url': row.image_url,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'average_rating': round(row.rating_sum / row.rating_count, 2) if row.rating_count else 0,
+        'rating_count': row.rating_count,
+        'comment_count': row.comment_count,
+        'favorite_count': row.favorite_count,
+        'author': {'id': row.author_id, 'username': row.username},
+        'url': url_for('api.recipe', recipe_id=row.id),
+    }
+
+
+@api.route('/recipes')
+def recipes():
+    """
+    List recipes, newest first.
+
+    Query parameters: ``category`` (id), ``search`` (ranked by relevance),
+    ``after`` (cursor from ``next_cursor``) and ``per_page`` (up to 50).
+    Searches are paged with ``page`` instead of cursors.
+    """
+    category_id = request.args.get('category', type=int)
+    search_query = request.args.get('search', type=str)
+    per_page = min(max(request.args.get('per_page', 12, type=int), 1), MAX_PER_PAGE)
+
+    query = db.session.query(*RECIPE_SUMMARY_COLUMNS).join(User, Recipe.user_id == User.id)
+    if category_id:
+        if category_catalog.get(category_id) is None:
+            abort(404)
+        query = query.filter(Recipe.id.in_(
+            db.select(recipe_categories.c.recipe_id)
+            .where(recipe_categories.c.category_id == category_id)
+        ))
+
+    if search_query:
+        page = max(request.args.get('page', 1, type=int), 1)
+        rows = (search_recipes(query, search_query).order_by(Recipe.created_at.desc())
+                .offset((page - 1) * per_page).limit(per_page + 1).all())
+        items, has_next = rows[:per_page], len(rows) > per_page
+        next_params = {'page': page + 1} if has_next else None
+    else:
+        pagination = keyset_paginate(query, per_page, after=request.args.get('after'))
+        items, has_next = pagination.items, pagination.has_next
+        next_params = {'after': pagination.next_cursor} if has_next else None
+
+    etag = make_etag(request.full_path, *((row.id, row.updated_at, row.username) for row in items))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    next_url = None
+    if next_params:
+        args = {key: value for key, value in request.args.items() if key not in ('after', 'page')}
+        next_url = url_for('api.recipes', **args, **next_params)
+    return json_with_etag({
+        'recipes': [serialize_summary(row) for row in items],
+        'next_cursor': next_params.get('after') if next_params else None,
+        'next_url': next_url,
+    }, etag)
+
+
+@api.route('/recipes/<int:recipe_id>')
+def recipe(recipe_id):
+    """Return one recipe with its description, ingredients and categories."""
+    row = (db.session.query(*RECIPE_DETAIL_COLUMNS).join(User, Recipe.user_id == User.id)
+           .filter(Recipe.id == recipe_id).first())
+    if row is None:
+        abort(404)
+
+    # Category names come from the catalog, so its version is part of the tag
+    etag = make_etag('recipe', row.id, row.updated_at, row.username, category_catalog.version())
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    ingredients = db.session.execute(
+        db.select(Ingredient.id, Ingredient.name, Ingredient.measurement_unit, RecipeIngredient.quantity)
+        .join(RecipeIngredient, RecipeIngredient.ingredient_id == Ingredient.id)
+        .where(RecipeIngredient.recipe_id == recipe_id)
+        .order_by(RecipeIngredient.id)
+    ).all()
+    category_ids = db.session.execute(
+        db.select(recipe_categories.c.category_id).where(recipe_categories.c.recipe_id == recipe_id)
+    ).scalars().all()
+
+    payload = serialize_summary(row)
+    payload['description'] = row.description
+    payload['ingredients'] = [{'id': item.id, 'name': item.name, 'quantity': item.quantity,
+                               'unit': item.measurement_unit} for item in ingredients]
+    payload['categories'] = [{'id': entry.id, 'name': entry.name}
+                             for entry in map(category_catalog.get, sorted(category_ids)) if entry]
+    return json_with_etag(payload, etag)
+
+
+@api.route('/categories')
+def categories():
+    """List every category."""
+    etag = make_etag('categories', category_catalog.version())
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    return json_with_etag({
+        'categories': [{'id': entry.id, 'name': entry.name, 'description': entry.description}
+                       for entry in category_catalog.all()],
+    }, etag)
+
+
+@api.route('/ingredients/autocomplete')
+def ingredient_autocomplete():
+    """
+    Suggest ingredients whose name, or a word in it, starts with ``q``.
+
+    Answered from the in-memory ingredient index; ``limit`` is at most 20.
+    """
+    limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_SUGGESTIONS)
+    matches = ingredient_index.complete(request.args.get('q', '', type=str), limit)
+    response = jsonify({'ingredients': [{'id': entry.id, 'name': entry.name, 'unit': entry.measurement_unit}
+                                        for entry in matches]})
+    # Repeated keystrokes can reuse an answer briefly; new ingredients are rare
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+@api.errorhandler(404)
+def not_found(error):
+    """Answer API 404s with JSON instead of the HTML error page."""
+    return jsonify({'error': 'not found'}), 404
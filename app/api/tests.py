@@ -0,0 +1,164 @@
+# Create your tests here.
+import os
+import runpy
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from flask_migrate import upgrade
+from app import create_app
+from app.extensions import db
+from app.models import User, Recipe, Category, Ingredient, RecipeIngredient
+from app.counters import adjust_recipe_counters
+from app.sqlstats import count_queries, assert_max_queries
+from app.config import Config, TestConfig
+from app.ingredient_index import ingredient_index
+from app.recipes import resolve_ingredients
+
+app = create_app(TestConfig)
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class ApiTests(unittest.TestCase):
+    def setUp(self):
+        """Set up test variables and initialize app."""
+        self.app = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', password='x')
+        self.category = Category(name='Dinner', description='Evening meals')
+        self.ingredient = Ingredient(name='Rice', measurement_unit='cups')
+        db.session.add_all([self.user, self.category, self.ingredient])
+        db.session.commit()
+
+        now = datetime.utcnow()
+        self.recipes = [
+            Recipe(title=f'Recipe {i}', description=f'Description {i}', preparation_time=5,
+                   cooking_time=10, servings=2, user_id=self.user.id,
+                   created_at=now - timedelta(minutes=i))
+            for i in range(5)
+        ]
+        self.recipes[0].categories = [self.category]
+        self.recipes[0].recipe_ingredients = [RecipeIngredient(ingredient=self.ingredient, quantity=1.5)]
+        db.session.add_all(self.recipes)
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down all setup variables."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_recipe_listing_pages_with_cursor(self):
+        """Test that the listing returns summaries newest first with a next cursor."""
+        data = self.app.get('/api/v1/recipes?per_page=3').get_json()
+        self.assertEqual([r['title'] for r in data['recipes']], ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+        self.assertEqual(data['recipes'][0]['author']['username'], 'testuser')
+        self.assertNotIn('description', data['recipes'][0])
+
+        data = self.app.get(data['next_url']).get_json()
+        self.assertEqual([r['title'] for r in data['recipes']], ['Recipe 3', 'Recipe 4'])
+        self.assertIsNone(data['next_cursor'])
+
+        data = self.app.get(f'/api/v1/recipes?category={self.category.id}').get_json()
+        self.assertEqual([r['title'] for r in data['recipes']], ['Recipe 0'])
+        self.assertEqual(self.app.get('/api/v1/recipes?category=999').status_code, 404)
+
+    def test_recipe_detail(self):
+        """Test that the detail view includes ingredients and categories."""
+        data = self.app.get(f'/api/v1/recipes/{self.recipes[0].id}').get_json()
+        self.assertEqual(data['description'], 'Description 0')
+        self.assertEqual(data['ingredients'], [{'id': self.ingredient.id, 'name': 'Rice',
+                                                'quantity': 1.5, 'unit': 'cups'}])
+        self.assertEqual(data['categories'], [{'id': self.category.id, 'name': 'Dinner'}])
+        self.assertEqual(self.app.get('/api/v1/recipes/999').get_json(), {'error': 'not found'})
+
+    def test_conditional_get(self):
+        """Test that repeated requests get 304 until the recipe changes."""
+        recipe_id = self.recipes[0].id
+        url = f'/api/v1/recipes/{recipe_id}'
+        response = self.app.get(url)
+        etag = response.headers['ETag']
+
+        with count_queries() as counter:
+            cached = self.app.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b'')
+        # The ETag is checked before the ingredients are loaded
+        self.assertFalse([sql for sql in counter.statements if 'recipe_ingredient' in sql])
+
+        listing = self.app.get('/api/v1/recipes')
+        self.assertEqual(self.app.get('/api/v1/recipes',
+                                      headers={'If-None-Match': listing.headers['ETag']}).status_code, 304)
+
+        # A new rating changes the counters and so updated_at
+        adjust_recipe_counters(recipe_id, rating_sum=5, rating_count=1)
+        db.session.commit()
+        changed = self.app.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(changed.get_json()['average_rating'], 5)
+        self.assertEqual(self.app.get('/api/v1/recipes',
+                                      headers={'If-None-Match': listing.headers['ETag']}).status_code, 200)
+
+    def test_categories(self):
+        """Test the category list and its ETag."""
+        response = self.app.get('/api/v1/categories')
+        self.assertEqual(response.get_json()['categories'],
+                         [{'id': self.category.id, 'name': 'Dinner', 'description': 'Evening meals'}])
+        self.assertEqual(self.app.get('/api/v1/categories',
+                                      headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+
+    def test_ingredient_autocomplete(self):
+        """Test prefix suggestions from the in-memory index and its incremental refresh."""
+        db.session.add_all([Ingredient(name='Brown Sugar', measurement_unit='cups'),
+                            Ingredient(name='Sugar', measurement_unit='cups'),
+                            Ingredient(name='Rice Vinegar', measurement_unit='tbsp')])
+        db.session.commit()
+        data = self.app.get('/api/v1/ingredients/autocomplete?q=SU').get_json()
+        self.assertEqual([item['name'] for item in data['ingredients']], ['Sugar', 'Brown Sugar'])
+        self.assertEqual(data['ingredients'][0]['unit'], 'cups')
+        self.assertEqual(self.app.get('/api/v1/ingredients/autocomplete?q=').get_json(), {'ingredients': []})
+
+        # Between version checks keystrokes cost no SQL at all
+        app.config['INGREDIENT_INDEX_CHECK_INTERVAL'] = 60
+        self.addCleanup(app.config.__setitem__, 'INGREDIENT_INDEX_CHECK_INTERVAL',
+                        TestConfig.INGREDIENT_INDEX_CHECK_INTERVAL)
+        with assert_max_queries(0):
+            data = self.app.get('/api/v1/ingredients/autocomplete?q=ri&limit=1').get_json()
+        self.assertEqual([item['name'] for item in data['ingredients']], ['Rice'])
+        app.config['INGREDIENT_INDEX_CHECK_INTERVAL'] = 0
+
+        # New ingredients are merged in, including ones written with Core inserts
+        resolve_ingredients([('Rice Flour', 1)])
+        db.session.commit()
+        with count_queries() as counter:
+            names = [entry.name for entry in ingredient_index.complete('rice')]
+        self.assertEqual(names, ['Rice', 'Rice Flour', 'Rice Vinegar'])
+        self.assertIn('ingredient.id > ?', counter.statements[-1])
+
+        # Renames rebuild the index
+        db.session.get(Ingredient, self.ingredient.id).name = 'Basmati Rice'
+        db.session.commit()
+        self.assertEqual([entry.name for entry in ingredient_index.complete('rice')],
+                         ['Rice Flour', 'Rice Vinegar', 'Basmati Rice'])
+
+    def test_wsgi_entry_point_serves_api(self):
+        """Test that the wsgi.py entry point registers the API blueprint and its extensions."""
+        with tempfile.TemporaryDirectory() as directory:
+            database = f'sqlite:///{os.path.join(directory, "wsgi.db")}'
+            with mock.patch.object(Config, 'SQLALCHEMY_DATABASE_URI', database), \
+                    mock.patch.object(Config, 'SQLALCHEMY_ENGINE_OPTIONS', {}):
+                entry = runpy.run_path(os.path.join(PROJECT_DIRECTORY, 'wsgi.py'))['app']
+            with entry.app_context():
+                upgrade(directory=os.path.join(PROJECT_DIRECTORY, 'migrations'))
+            client = entry.test_client()
+            response = client.get('/api/v1/recipes')
+            with entry.app_context():
+                db.engine.dispose()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['recipes'], [])
+        self.assertIn('response_cache', entry.extensions)
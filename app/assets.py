@@ -0,0 +1,258 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``flask build-assets`` minifies the stylesheets and scripts under app/static,
+writes each one to ASSETS_DIR under a name containing a hash of its content
+(``css/style.3f9c2a1b7d4e.css``) next to ``.gz`` and ``.br`` copies, and maps
+the original paths to the hashed ones in ``manifest.json``.
+
+Templates link assets with ``asset_url('css/style.css')``. Once a manifest
+exists it returns the hashed file's /assets/ URL, which is served with a
+one-year immutable Cache-Control header (a changed file gets a new name), in
+the best encoding the browser accepts. Without a build it falls back to the
+plain /static/ URL, so development needs no extra step.
+
+The minifiers are deliberately conservative: comments and redundant
+whitespace go, line breaks in scripts stay (automatic semicolon insertion
+depends on them), and strings and regular expressions are copied untouched.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from flask import abort, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+MANIFEST_NAME = 'manifest.json'
+
+# Hashed names never change content, so browsers may keep them for a year without revalidating
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Content-Encoding and file suffix of the precompressed copies, most preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_TOKEN = re.compile(r"""
+    (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<comment>/\*.*?\*/)
+  | (?P<space>\s+)
+  | (?P<other>[^"'\s/]+|/)
+""", re.S | re.X)
+
+_JS_TOKEN = re.compile(r"""
+    (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<comment>/\*.*?\*/|//[^\n]*)
+  | (?P<space>\s+)
+  | (?P<slash>/)
+  | (?P<other>[^"'`\s/]+)
+""", re.S | re.X)
+
+# A regular expression literal ends at the first unescaped / outside a [...] class
+_JS_REGEX = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*')
+
+# Characters after which a / starts a regular expression rather than a division
+_JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+_WORD = re.compile(r'[\w$]')
+
+
+def minify_css(source):
+    """Strip comments and collapse whitespace in a stylesheet."""
+    tokens = []
+    for match in _CSS_TOKEN.finditer(source):
+        if match.lastgroup != 'comment':
+            tokens.append((match.lastgroup, match.group()))
+
+    output = []
+    for index, (kind, text) in enumerate(tokens):
+        if kind == 'space':
+            previous = output[-1][-1] if output else ''
+            following = tokens[index + 1][1][0] if index + 1 < len(tokens) else ''
+            if previous and following and previous not in '{};,>:' and following not in '{};,>':
+                output.append(' ')
+            continue
+        if kind == 'other':
+            text = text.replace(';}', '}')
+            if text.startswith('}') and output and output[-1].endswith(';'):
+                output[-1] = output[-1][:-1]
+        output.append(text)
+    return ''.join(output)
+
+
+def minify_js(source):
+    """Strip comments, indentation and blank lines from a script."""
+    output = []
+    last = ''  # last significant character written
+    position = 0
+    pending = ''  # whitespace waiting to be written: '', ' ' or '\n'
+    while position < len(source):
+        match = _JS_TOKEN.match(source, position)
+        kind, text = match.lastgroup, match.group()
+        if kind == 'slash' and (not last or last in _JS_REGEX_PRECEDERS or re.search(r'\b(?:return|typeof)$',
+                                                                                     ''.join(output[-2:]))):
+            regex = _JS_REGEX.match(source, position)
+            if regex:
+                kind, text = 'regex', regex.group()
+        position += len(text)
+
+        if kind in ('comment', 'space'):
+            # A comment spanning lines counts as a line break, like the whitespace it replaces
+            pending = '\n' if '\n' in text or pending == '\n' else ' '
+            continue
+
+        if pending and output:
+            first = text[0]
+            if pending == '\n' and last not in '{;,' and first not in '})]':
+                output.append('\n')
+            elif (_WORD.match(last) and _WORD.match(first)) or (last in '+-' and first == last):
+                output.append(' ')
+        pending = ''
+        output.append(text)
+        last = text[-1]
+    return ''.join(output) + '\n'
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+def build_assets(static_dir, output_dir):
+    """
+    Minify, fingerprint and precompress every stylesheet and script.
+
+    Files from earlier builds are left in place, so pages cached before a
+    deploy can still load the assets they reference.
+
+    Args:
+        static_dir: Directory holding the source assets (app/static)
+        output_dir: Directory the hashed files and the manifest are written to
+
+    Returns:
+        dict mapping each source path (relative to static_dir) to its hashed path
+    """
+    import brotli
+
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    for root, directories, files in os.walk(static_dir):
+        directories[:] = sorted(name for name in directories
+                                if os.path.abspath(os.path.join(root, name)) != output_dir)
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            if extension not in MINIFIERS:
+                continue
+            source_path = os.path.join(root, name)
+            relative = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+            with open(source_path, encoding='utf-8') as handle:
+                data = MINIFIERS[extension](handle.read()).encode('utf-8')
+
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = posixpath.join(posixpath.dirname(relative), f'{stem}.{digest}{extension}')
+            target = os.path.join(output_dir, *hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            variants = {'': data,
+                        '.gz': gzip.compress(data, compresslevel=9, mtime=0),
+                        '.br': brotli.compress(data, quality=11)}
+            for suffix, content in variants.items():
+                # Clients that accept an encoding get the plain file when compression does not pay off
+                if suffix and len(content) >= len(data):
+                    continue
+                with open(target + suffix, 'wb') as handle:
+                    handle.write(content)
+            manifest[relative] = hashed
+
+    with open(os.path.join(output_dir, MANIFEST_NAME + '.tmp'), 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    os.replace(os.path.join(output_dir, MANIFEST_NAME + '.tmp'), os.path.join(output_dir, MANIFEST_NAME))
+    return manifest
+
+
+class _ManifestState:
+    """Loaded manifest for one application."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.mtime = None
+        self.entries = {}
+
+
+class AssetManifest:
+    """Flask extension resolving and serving fingerprinted assets."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the /assets/ route and the ``asset_url`` template helper."""
+        app.extensions['asset_manifest'] = _ManifestState()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def _entries(self):
+        """Return the manifest, reading it on first use (and after rebuilds in debug mode)."""
+        state = current_app.extensions['asset_manifest']
+        path = os.path.join(current_app.config['ASSETS_DIR'], MANIFEST_NAME)
+        if state.path == path and not current_app.debug:
+            return state.entries
+        with state.lock:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if state.path != path or state.mtime != mtime:
+                entries = {}
+                if mtime is not None:
+                    with open(path, encoding='utf-8') as handle:
+                        entries = json.load(handle)
+                state.entries, state.mtime, state.path = entries, mtime, path
+        return state.entries
+
+    def url(self, filename):
+        """
+        Return the URL of a static asset.
+
+        Args:
+            filename: Path relative to app/static, e.g. 'css/style.css'
+
+        Returns:
+            The hashed /assets/ URL when the manifest lists the file, else its /static/ URL
+        """
+        hashed = self._entries().get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    @staticmethod
+    def serve(filename):
+        """Serve a hashed asset, precompressed when the browser accepts it, cached for a year."""
+        directory = current_app.config['ASSETS_DIR']
+        if filename == MANIFEST_NAME:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if request.accept_encodings[name]:
+                path = safe_join(directory, filename + suffix)
+                if path is not None and os.path.isfile(path):
+                    encoding = name
+                    filename += suffix
+                    break
+
+        response = send_from_directory(directory, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+asset_manifest = AssetManifest()
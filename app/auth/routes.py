@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from app.extensions import bcrypt, db
+from app.extensions import db
+from app.passwords import password_hasher, HashingBusy
+from app.user_cache import user_cache
 from app.auth.forms import SignUpForm, LoginForm
 from app.models import User
 from sqlalchemy.exc import IntegrityError
@@ -22,7 +24,7 @@ def signup():
     if form.validate_on_submit():
         try:
             # Hash the password
-            hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+            hashed_password = password_hasher.hash(form.password.data)
             
             # Create new user
             user = User(
@@ -47,6 +49,9 @@ def signup():
             else:
                 flash('That email is already registered. Please use a different one.', 'danger')
                 form.email.errors.append('Email already exists')
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('auth/signup.html', form=form, title='Sign Up'), 503
         except Exception as e:
             db.session.rollback()
             flash(f'An unexpected error occurred. Please try again.', 'danger')
@@ -78,7 +83,16 @@ def login():
                 return render_template('auth/login.html', form=form, title='Login')
             
             # Check if password is correct
-            if bcrypt.check_password_hash(user.password, form.password.data):
+            if password_hasher.check(user.password, form.password.data):
+                # Upgrade hashes made with an older work factor while the password is at hand
+                if password_hasher.needs_rehash(user.password):
+                    try:
+                        user.password = password_hasher.hash(form.password.data)
+                        db.session.commit()
+                        user_cache.invalidate(user.id)
+                    except HashingBusy:
+                        pass
+                
                 login_user(user, remember=form.remember.data)
                 
                 # Redirect to the page user was trying to access before login
@@ -89,6 +103,9 @@ def login():
             else:
                 flash('Incorrect password. Please try again.', 'danger')
                 form.password.errors.append('Incorrect password')
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html', form=form, title='Login'), 503
         except Exception as e:
             flash('An error occurred during login. Please try again.', 'danger')
             print(f"Error during login: {str(e)}")
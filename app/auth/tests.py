@@ -1,8 +1,15 @@
 # Create your tests here.
 import unittest
 from flask import url_for
-from app import app, db
+from app import create_app
+from app.config import TestConfig
+from app.extensions import db, bcrypt
 from app.models import User
+from app.user_cache import user_cache
+from app.sqlstats import count_queries
+from app.passwords import password_hasher, hashing_slots, HashingBusy
+
+app = create_app(TestConfig)
 
 class AuthTests(unittest.TestCase):
     def setUp(self):
@@ -38,8 +45,8 @@ class AuthTests(unittest.TestCase):
             data={
                 'username': 'testuser',
                 'email': 'test@example.com',
-                'password': 'password123',
-                'confirm_password': 'password123'
+                'password': 'Password123',
+                'confirm_password': 'Password123'
             },
             follow_redirects=True
         )
@@ -62,4 +69,75 @@ class AuthTests(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 200)
         user = User.query.filter_by(username='testuser').first()
-        self.assertIsNone(user)  # User should not be created
\ No newline at end of file
+        self.assertIsNone(user)  # User should not be created
+        
+    def test_user_loader_cache(self):
+        """Test that the user loader reuses cached rows until the profile changes."""
+        app.config['USER_CACHE_TTL'] = 60
+        user_cache.init_app(app)
+        self.addCleanup(user_cache.init_app, app)
+        self.addCleanup(app.config.__setitem__, 'USER_CACHE_TTL', 0)
+        
+        user = User(username='cacheduser', email='cached@example.com',
+                    password=bcrypt.generate_password_hash('Password123').decode('utf-8'))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        
+        user_cache.load(user_id)
+        db.session.expunge_all()  # as if this were a new request
+        with count_queries() as counter:
+            cached = user_cache.load(user_id)
+        self.assertEqual(counter.count, 0)
+        self.assertEqual(cached.username, 'cacheduser')
+        self.assertIn(cached, db.session)
+        
+        self.app.post('/login', data={'username': 'cacheduser', 'password': 'Password123'})
+        self.app.post('/profile/edit', data={'username': 'renameduser', 'email': 'cached@example.com'})
+        db.session.expunge_all()
+        self.assertEqual(user_cache.load(user_id).username, 'renameduser')
+        
+    def test_login_upgrades_password_cost(self):
+        """Test that logging in rehashes a password stored with an outdated work factor."""
+        user = User(username='olduser', email='old@example.com',
+                    password=bcrypt.generate_password_hash('Password123', 5).decode('utf-8'))
+        db.session.add(user)
+        db.session.commit()
+        
+        response = self.app.post('/login', data={'username': 'olduser', 'password': 'Password123'})
+        self.assertEqual(response.status_code, 302)
+        
+        db.session.refresh(user)
+        self.assertTrue(user.password.startswith('$2b$04$'))
+        self.assertFalse(password_hasher.needs_rehash(user.password))
+        self.assertTrue(bcrypt.check_password_hash(user.password, 'Password123'))
+        
+    def test_hashing_keeps_a_request_thread_free(self):
+        """Test that a full hashing queue answers 503 instead of taking the last request threads."""
+        self.assertEqual(hashing_slots({'PASSWORD_HASH_WORKERS': 2, 'PASSWORD_HASH_QUEUE_DEPTH': 8,
+                                        'WEB_THREADS': 4}), 3)
+        self.assertEqual(hashing_slots({'PASSWORD_HASH_WORKERS': 2, 'PASSWORD_HASH_QUEUE_DEPTH': 8,
+                                        'WEB_THREADS': 1}), 1)
+        
+        app.config['WEB_THREADS'] = 3
+        password_hasher.init_app(app)
+        self.addCleanup(password_hasher.init_app, app)
+        self.addCleanup(app.config.__setitem__, 'WEB_THREADS', TestConfig.WEB_THREADS)
+        
+        user = User(username='busyuser', email='busy@example.com',
+                    password=bcrypt.generate_password_hash('Password123').decode('utf-8'))
+        db.session.add(user)
+        db.session.commit()
+        
+        # Occupy every slot, as requests waiting on their hashes would
+        slots = password_hasher._pool().slots
+        held = 0
+        while slots.acquire(blocking=False):
+            held += 1
+            self.addCleanup(slots.release)
+        self.assertEqual(held, 2)
+        
+        with self.assertRaises(HashingBusy):
+            password_hasher.hash('Password123')
+        response = self.app.post('/login', data={'username': 'busyuser', 'password': 'Password123'})
+        self.assertEqual(response.status_code, 503)
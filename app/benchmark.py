@@ -0,0 +1,295 @@
+"""
+Route-level latency benchmarks.
+
+Each scenario replays one route many times through the Flask test client,
+from several threads at once, as an anonymous or a logged-in visitor. The
+run reports throughput, latency percentiles, SQL statements per request and
+the page-cache hit ratio per scenario, and can be saved as JSON and compared
+with an earlier run to catch regressions. Run it against a large dataset
+(see ``flask generate-data``) for meaningful numbers.
+"""
+import json
+import math
+import platform
+import statistics
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from app.extensions import db
+from app.cache import NullBackend
+from app.models import User, Recipe, Category
+from app.pagination import encode_cursor
+from app.sqlstats import count_queries
+
+Scenario = namedtuple('Scenario', ['name', 'method', 'path', 'authenticated', 'data'])
+
+
+def percentile(values, fraction):
+    """
+    Return the nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: Measurements (need not be sorted)
+        fraction: Percentile as a fraction, e.g. 0.99
+
+    Returns:
+        The smallest value with at least ``fraction`` of the values at or below it
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+
+def deep_listing_cursor(deep_page, per_page):
+    """
+    Return the cursor whose keyset page starts at offset page ``deep_page``.
+
+    The keyset page lists the rows after the cursor's row, so the cursor
+    points at the last row of the page before.
+
+    Args:
+        deep_page: Offset page number (1-based)
+        per_page: Page size of the recipe listing
+
+    Returns:
+        Cursor token, or '' for the first page or a listing too short to reach it
+    """
+    offset = (deep_page - 1) * per_page
+    if not offset:
+        return ''
+    row = (Recipe.query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+           .offset(offset - 1).limit(1).first())
+    return encode_cursor(row) if row else ''
+
+
+def build_scenarios(username, password, deep_page=50):
+    """
+    Pick representative ids from the database and build the standard scenarios.
+
+    Args:
+        username: Account used by the logged-in scenarios
+        password: That account's password
+        deep_page: Page number used for the deep-pagination scenarios
+
+    Returns:
+        list of Scenario
+    """
+    user_id = db.session.execute(select(User.id).where(User.username == username)).scalar()
+    if user_id is None:
+        raise ValueError(f"No user named '{username}'")
+
+    popular_id = db.session.execute(
+        select(Recipe.id).order_by(Recipe.rating_count.desc(), Recipe.id).limit(1)
+    ).scalar()
+    author_id = db.session.execute(
+        select(Recipe.user_id).group_by(Recipe.user_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    category_id = db.session.execute(select(Category.id).order_by(Category.id).limit(1)).scalar()
+    if popular_id is None:
+        raise ValueError('The database has no recipes to benchmark')
+    search_term = db.session.get(Recipe, popular_id).title.split()[-1]
+
+    # The deep keyset and offset scenarios read the same rows, at the listing's own page size
+    deep_cursor = deep_listing_cursor(deep_page, current_app.config['RECIPES_PER_PAGE'])
+
+    scenarios = [
+        Scenario('index', 'GET', '/', False, None),
+        Scenario('all_recipes', 'GET', '/recipes', False, None),
+        Scenario('all_recipes_search', 'GET', f'/recipes?search={search_term}', False, None),
+        Scenario('all_recipes_category', 'GET', f'/recipes?category={category_id}', False, None),
+        Scenario('all_recipes_deep_offset', 'GET', f'/recipes?page={deep_page}', False, None),
+        Scenario('all_recipes_deep_keyset', 'GET', f'/recipes?after={deep_cursor}', False, None),
+        Scenario('recipe_detail', 'GET', f'/recipes/{popular_id}', False, None),
+        Scenario('recipe_detail_user', 'GET', f'/recipes/{popular_id}', True, None),
+        Scenario('profile', 'GET', f'/profile/{author_id}', False, None),
+        Scenario('dashboard', 'GET', '/dashboard', True, None),
+        Scenario('toggle_favorite', 'POST', f'/favorites/toggle/{popular_id}', True, None),
+        Scenario('login', 'POST', '/login', False, {'username': username, 'password': password}),
+    ]
+    return scenarios
+
+
+class _Client:
+    """
+    Sends one scenario's requests.
+
+    Logged-in scenarios reuse one session, logged in once; anonymous ones
+    start every request without cookies, like a new visitor.
+    """
+
+    def __init__(self, app, credentials):
+        self.app = app
+        self.client = app.test_client()
+        self.credentials = credentials
+        self.logged_in = False
+
+    def request(self, scenario):
+        if not scenario.authenticated:
+            return self.app.test_client().open(scenario.path, method=scenario.method, data=scenario.data)
+        if not self.logged_in:
+            self.client.post('/login', data=self.credentials)
+            self.logged_in = True
+        return self.client.open(scenario.path, method=scenario.method, data=scenario.data)
+
+
+def run_scenario(app, scenario, credentials, requests=200, concurrency=4, warmup=5):
+    """
+    Replay one scenario and measure it.
+
+    Every worker thread gets its own client (and so its own session cookie);
+    requests run outside any shared application context, as in production.
+    Logged-in writes run on one thread, since every client is the same user.
+
+    Args:
+        app: Flask application
+        scenario: Scenario to run
+        credentials: Login form data for authenticated scenarios
+        requests: Total number of measured requests
+        concurrency: Number of threads sending requests
+        warmup: Unmeasured requests each thread sends first
+
+    Returns:
+        dict of measurements
+    """
+    if scenario.authenticated and scenario.method != 'GET':
+        concurrency = 1
+    latencies = []
+    queries = []
+    sql_times = []
+    statuses = {}
+    cache_hits = 0
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if index < requests % concurrency else 0)
+                  for index in range(concurrency)]
+
+    def worker(count):
+        nonlocal cache_hits
+        client = _Client(app, credentials)
+        for _ in range(warmup):
+            client.request(scenario)
+        for _ in range(count):
+            with count_queries() as counter:
+                start = time.perf_counter()
+                response = client.request(scenario)
+                elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                queries.append(counter.count)
+                sql_times.append(counter.total_time * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                cache_hits += response.headers.get('X-Cache') == 'HIT'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, count) for count in per_thread]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    return {
+        'method': scenario.method,
+        'path': scenario.path,
+        'authenticated': scenario.authenticated,
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p90': round(percentile(latencies, 0.90), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(max(latencies, default=0.0), 3),
+        },
+        'sql_statements': {
+            'mean': round(statistics.fmean(queries), 2) if queries else 0.0,
+            'max': max(queries, default=0),
+            'mean_time_ms': round(statistics.fmean(sql_times), 3) if sql_times else 0.0,
+        },
+        'cache_hit_ratio': round(cache_hits / len(latencies), 3) if latencies else 0.0,
+    }
+
+
+def run_benchmarks(app, scenarios, credentials, requests=200, concurrency=4, warmup=5, page_cache=True,
+                   progress=None):
+    """
+    Run every scenario in turn.
+
+    Args:
+        app: Flask application
+        scenarios: Scenarios from build_scenarios()
+        credentials: Login form data for authenticated scenarios
+        requests, concurrency, warmup: See run_scenario()
+        page_cache: False to bypass the anonymous page cache and measure rendering
+        progress: Optional callable receiving (name, result) after each scenario
+
+    Returns:
+        JSON-serializable report
+    """
+    report = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'database': db.engine.dialect.name,
+        'settings': {'requests': requests, 'concurrency': concurrency, 'warmup': warmup,
+                     'page_cache': page_cache},
+        'scenarios': {},
+    }
+
+    # The replayed form posts carry no CSRF token
+    csrf_enabled = app.config.get('WTF_CSRF_ENABLED', True)
+    app.config['WTF_CSRF_ENABLED'] = False
+    cache_backend = app.extensions.get('response_cache')
+    if not page_cache:
+        app.extensions['response_cache'] = NullBackend()
+    try:
+        for scenario in scenarios:
+            result = run_scenario(app, scenario, credentials, requests, concurrency, warmup)
+            report['scenarios'][scenario.name] = result
+            if progress:
+                progress(scenario.name, result)
+    finally:
+        app.config['WTF_CSRF_ENABLED'] = csrf_enabled
+        app.extensions['response_cache'] = cache_backend
+    return report
+
+
+def compare_reports(baseline, current, threshold=0.10):
+    """
+    Compare p50 and p99 latencies of two reports.
+
+    Args:
+        baseline: Earlier report
+        current: New report
+        threshold: Relative slowdown that counts as a regression
+
+    Returns:
+        list of (scenario, metric, before, after, change) tuples for every
+        metric that got slower by more than ``threshold``
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p50', 'p99'):
+            old, new = before['latency_ms'][metric], result['latency_ms'][metric]
+            if old and (new - old) / old > threshold:
+                regressions.append((name, metric, old, new, (new - old) / old))
+    return regressions
+
+
+def save_report(report, path):
+    """Write a report as indented JSON."""
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(report, stream, indent=2, sort_keys=True)
+
+
+def load_report(path):
+    """Read a report written by save_report()."""
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
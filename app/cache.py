@@ -0,0 +1,292 @@
+"""
+Full-page response cache for anonymous visitors.
+
+Cached pages are keyed on the endpoint and its query arguments and tagged
+with what they display (e.g. ``recipes:category:3``). Invalidating a tag
+stores a fresh version token for it; entries remember the tag versions they
+were rendered under and are ignored once any of them changes, so a write
+only evicts the pages it can affect.
+
+Backends:
+    memory      In-process LRU with TTL (one cache per worker)
+    filesystem  Pickled files in a directory shared by all workers
+    null        Caching disabled
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, Response
+from flask_login import current_user
+
+# Tag carried by every cached page, used to flush everything at once
+ALL_PAGES_TAG = 'pages'
+
+
+class NullBackend:
+    """Backend that never stores anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class MemoryBackend:
+    """
+    Thread-safe in-process LRU cache with per-entry expiry.
+
+    Args:
+        max_entries: Number of entries kept before the least recently used is evicted
+    """
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileSystemBackend:
+    """
+    Cache stored as one pickle file per key, safe to share between processes.
+
+    Files are written to a temporary name and renamed into place, so readers
+    never see a partial entry. Once the directory holds more than
+    ``max_entries`` files, the least recently written ones are removed.
+
+    Args:
+        directory: Directory that holds the cache files
+        max_entries: Number of entries kept before the oldest are evicted
+    """
+
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                expires, value = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires is not None and expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        expires = time.time() + ttl if ttl else None
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as cache_file:
+                pickle.dump((expires, value), cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove the least recently written entries beyond ``max_entries``."""
+        entries = []
+        with os.scandir(self.directory) as directory:
+            for entry in directory:
+                # Skip the temporary files other writers are still filling
+                if entry.name.startswith('tmp'):
+                    continue
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        for _, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def create_backend(config):
+    """
+    Build the cache backend selected by the application config.
+
+    Args:
+        config: Flask config mapping
+
+    Returns:
+        Backend instance
+    """
+    name = config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if name == 'memory':
+        return MemoryBackend(config.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+    if name == 'filesystem':
+        return FileSystemBackend(config['RESPONSE_CACHE_DIR'], config.get('RESPONSE_CACHE_MAX_ENTRIES', 500))
+    if name == 'null':
+        return NullBackend()
+    raise ValueError(f'Unknown RESPONSE_CACHE_BACKEND: {name}')
+
+
+class ResponseCache:
+    """
+    Flask extension that caches rendered pages for logged-out requests.
+
+    The backend lives in ``app.extensions['response_cache']`` and can be
+    swapped at runtime (the tests do this).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the configured backend for an application."""
+        app.extensions['response_cache'] = create_backend(app.config)
+
+    @property
+    def backend(self):
+        return current_app.extensions.get('response_cache') or NullBackend()
+
+    def _tag_versions(self, tags):
+        """Return the current version token of each tag, creating missing ones."""
+        versions = {}
+        for tag in tags:
+            version = self.backend.get(f'tag:{tag}')
+            if version is None:
+                # A tag evicted from the backend must not match old entries again
+                version = uuid.uuid4().hex
+                self.backend.set(f'tag:{tag}', version, None)
+            versions[tag] = version
+        return versions
+
+    def invalidate(self, *tags):
+        """Expire every cached page carrying any of the given tags."""
+        for tag in tags:
+            self.backend.set(f'tag:{tag}', uuid.uuid4().hex, None)
+
+    def cached(self, tags):
+        """
+        Decorator that serves a view from the cache for anonymous visitors.
+
+        Args:
+            tags: Callable returning the tags for the current request
+
+        Returns:
+            View decorator
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._cacheable_request():
+                    return view(*args, **kwargs)
+
+                key = self._page_key()
+                entry = self.backend.get(key)
+                if entry is not None and entry['tags'] == self._tag_versions(entry['tags']):
+                    return Response(entry['body'], status=entry['status'],
+                                    content_type=entry['content_type'],
+                                    headers={'X-Cache': 'HIT'})
+
+                page_tags = set(tags()) | {ALL_PAGES_TAG}
+                versions = self._tag_versions(page_tags)
+                response = current_app.make_response(view(*args, **kwargs))
+                if self._cacheable_response(response):
+                    self.backend.set(key, {
+                        'body': response.get_data(),
+                        'status': response.status_code,
+                        'content_type': response.content_type,
+                        'tags': versions,
+                    }, current_app.config.get('RESPONSE_CACHE_TTL', 300))
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _cacheable_request():
+        """Only plain GETs from anonymous visitors with no pending flashes are cached."""
+        return (request.method == 'GET'
+                and '_flashes' not in session
+                and not current_user.is_authenticated)
+
+    @staticmethod
+    def _cacheable_response(response):
+        return (response.status_code == 200
+                and not response.headers.get('Set-Cookie')
+                and not session.modified)
+
+    @staticmethod
+    def _page_key():
+        # Encoded so a value containing '&' or '=' cannot spell out another page's key
+        args = urlencode(sorted(request.args.items(multi=True)))
+        return f'page:{request.endpoint}?{args}'
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_recipe_pages(category_ids=()):
+    """
+    Expire the cached listing pages a recipe write can change.
+
+    Args:
+        category_ids: Categories the recipe belongs (or belonged) to
+    """
+    tags = ['recipes:index', 'recipes:all', 'recipes:search']
+    tags.extend(f'recipes:category:{category_id}' for category_id in set(category_ids))
+    response_cache.invalidate(*tags)
+
+
+def invalidate_category_pages():
+    """Expire every cached page that lists the categories."""
+    response_cache.invalidate('categories')
+
+
+def invalidate_all_pages():
+    """Expire every cached page."""
+    response_cache.invalidate(ALL_PAGES_TAG)
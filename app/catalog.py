@@ -0,0 +1,128 @@
+"""
+Process-wide, read-only catalog of recipe categories.
+
+Categories change rarely, so each worker keeps them in memory as immutable
+tuples. Any insert, update or delete of a Category stores a new token in the
+``cache_version`` table in the same transaction; workers compare that token
+with the one they loaded (at most once per CATEGORY_CATALOG_CHECK_INTERVAL
+seconds) and reload when it differs, without needing a restart.
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event, insert, select, update
+from app.extensions import db
+from app.models import Category, CacheVersion
+
+CATALOG_NAME = 'categories'
+
+CategoryEntry = namedtuple('CategoryEntry', ['id', 'name', 'description'])
+
+
+def bump_version(connection, name):
+    """
+    Store a new version token for a cached data set.
+
+    Args:
+        connection: Connection of the transaction making the change
+        name: Name of the cached data set
+    """
+    table = CacheVersion.__table__
+    token = uuid.uuid4().hex
+    result = connection.execute(
+        update(table).where(table.c.name == name).values(version=token)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(name=name, version=token))
+
+
+@event.listens_for(Category, 'after_insert')
+@event.listens_for(Category, 'after_update')
+@event.listens_for(Category, 'after_delete')
+def _category_changed(mapper, connection, target):
+    """Mark every worker's catalog stale when a category is written."""
+    bump_version(connection, CATALOG_NAME)
+
+
+class _CatalogState:
+    """Loaded catalog data for one application."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = None
+        self.entries = ()
+        self.by_id = {}
+        self.choices = ()
+
+
+class CategoryCatalog:
+    """
+    Flask extension serving categories from memory.
+
+    Attributes are plain tuples, so templates and forms can share them safely
+    between threads.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create an empty catalog for an application; it loads on first use."""
+        app.extensions['category_catalog'] = _CatalogState()
+
+    def _state(self):
+        state = current_app.extensions.get('category_catalog')
+        if state is None:
+            state = current_app.extensions.setdefault('category_catalog', _CatalogState())
+        interval = current_app.config.get('CATEGORY_CATALOG_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if state.checked_at is not None and now - state.checked_at < interval:
+            return state
+
+        with state.lock:
+            version = db.session.execute(
+                select(CacheVersion.version).where(CacheVersion.name == CATALOG_NAME)
+            ).scalar()
+            if state.checked_at is None or version != state.version:
+                self._load(state, version)
+            state.checked_at = now
+        return state
+
+    @staticmethod
+    def _load(state, version):
+        rows = db.session.execute(
+            select(Category.id, Category.name, Category.description).order_by(Category.id)
+        ).all()
+        entries = tuple(CategoryEntry(*row) for row in rows)
+        state.entries = entries
+        state.by_id = {entry.id: entry for entry in entries}
+        state.choices = tuple((entry.id, entry.name)
+                              for entry in sorted(entries, key=lambda entry: entry.name))
+        if state.version is not None and version != state.version:
+            # Cached pages in this worker still show the old categories
+            from app.cache import invalidate_category_pages
+            invalidate_category_pages()
+        state.version = version
+
+    def all(self):
+        """Return every category as a tuple of CategoryEntry, ordered by id."""
+        return self._state().entries
+
+    def get(self, category_id):
+        """Return the CategoryEntry for an id, or None if it does not exist."""
+        return self._state().by_id.get(category_id)
+
+    def choices(self):
+        """Return (id, name) pairs ordered by name, for select fields."""
+        return self._state().choices
+
+    def version(self):
+        """Return the version token of the loaded categories ('' before any change)."""
+        return self._state().version or ''
+
+
+category_catalog = CategoryCatalog()
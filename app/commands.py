@@ -0,0 +1,215 @@
+"""Flask CLI commands for maintaining the CulinaryConnect database."""
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('recompute-counters')
+@click.option('--recipe-id', 'recipe_ids', type=int, multiple=True,
+              help='Only recompute these recipes (may be repeated).')
+@with_appcontext
+def recompute_counters_command(recipe_ids):
+    """Rebuild the cached rating, comment and favorite counters on recipes."""
+    from app.counters import recompute_recipe_counters
+    from app.extensions import db
+    updated = recompute_recipe_counters(recipe_ids or None)
+    db.session.commit()
+    click.echo(f'Recomputed counters for {updated} recipe(s).')
+
+
+@click.command('recompute-trending')
+@click.option('--recipe-id', 'recipe_ids', type=int, multiple=True,
+              help='Only recompute these recipes (may be repeated).')
+@with_appcontext
+def recompute_trending_command(recipe_ids):
+    """Rebuild the time-decayed trending scores on recipes."""
+    from app.trending import recompute_trending_scores
+    from app.extensions import db
+    updated = recompute_trending_scores(recipe_ids or None)
+    db.session.commit()
+    click.echo(f'Recomputed trending scores for {updated} recipe(s).')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Create the full-text recipe search index and repopulate it."""
+    from app.search import rebuild_search_index
+    if rebuild_search_index():
+        click.echo('Recipe search index rebuilt.')
+    else:
+        click.echo('Full-text search is not supported on this database; using ILIKE matching.')
+
+
+@click.command('import-recipes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['jsonl', 'csv']),
+              help='Input format (default: guessed from the file extension).')
+@click.option('--batch-size', default=1000, show_default=True, type=click.IntRange(min=1),
+              help='Recipes inserted per batch.')
+@click.option('--user', 'default_username',
+              help='Author for rows that do not name one.')
+@with_appcontext
+def import_recipes_command(path, file_format, batch_size, default_username):
+    """Stream recipes from a JSON Lines or CSV file into the database."""
+    from app.importer import import_recipes
+    from app.cache import invalidate_all_pages
+    if file_format is None:
+        file_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    with open(path, newline='', encoding='utf-8') as stream:
+        result = import_recipes(stream, file_format, batch_size, default_username)
+    invalidate_all_pages()
+
+    click.echo(f'Imported {result.recipes} recipe(s), skipped {result.skipped}; '
+               f'created {result.categories_created} categor(ies) and '
+               f'{result.ingredients_created} ingredient(s).')
+    for error in result.errors:
+        click.echo(f'  {error}', err=True)
+
+
+@click.command('generate-data')
+@click.option('--users', default=1000, show_default=True, type=click.IntRange(min=0))
+@click.option('--recipes', default=10000, show_default=True, type=click.IntRange(min=0))
+@click.option('--categories', default=15, show_default=True, type=click.IntRange(min=0))
+@click.option('--ingredients', default=500, show_default=True, type=click.IntRange(min=0))
+@click.option('--ingredients-per-recipe', default=8, show_default=True, type=click.IntRange(min=1),
+              help='Mean number of ingredients per recipe.')
+@click.option('--comments', default=50000, show_default=True, type=click.IntRange(min=0))
+@click.option('--ratings', default=100000, show_default=True, type=click.IntRange(min=0))
+@click.option('--favorites', default=50000, show_default=True, type=click.IntRange(min=0))
+@click.option('--skew', default=1.1, show_default=True, type=click.FloatRange(min=0),
+              help='Zipf exponent for recipe popularity and user activity (0 = uniform).')
+@click.option('--seed', default=42, show_default=True, type=int)
+@click.option('--days', default=365, show_default=True, type=click.IntRange(min=1),
+              help='Spread timestamps over this many days.')
+@click.option('--end', type=click.DateTime(), default=None,
+              help='Latest timestamp to generate (default: a fixed date, so a seed always yields the same data).')
+@click.option('--batch-size', default=5000, show_default=True, type=click.IntRange(min=1))
+@with_appcontext
+def generate_data_command(**options):
+    """Fill the database with a synthetic, production-shaped dataset."""
+    from app.synthetic import generate_dataset
+    from app.cache import invalidate_all_pages
+    generate_dataset(progress=lambda table, written: click.echo(f'{table}: {written} row(s)'), **options)
+    invalidate_all_pages()
+    click.echo('Done.')
+
+
+@click.command('benchmark')
+@click.option('--requests', default=200, show_default=True, type=click.IntRange(min=1),
+              help='Measured requests per scenario.')
+@click.option('--concurrency', default=4, show_default=True, type=click.IntRange(min=1),
+              help='Threads sending requests at once.')
+@click.option('--warmup', default=5, show_default=True, type=click.IntRange(min=0),
+              help='Unmeasured requests per thread before measuring.')
+@click.option('--username', default='user1', show_default=True,
+              help='Account used by the logged-in scenarios.')
+@click.option('--password', default='password', show_default=True)
+@click.option('--cache/--no-cache', 'page_cache', default=True, show_default=True,
+              help='Serve anonymous pages from the page cache.')
+@click.option('--only', multiple=True, help='Only run these scenarios (may be repeated).')
+@click.option('--output', type=click.Path(dir_okay=False), help='Save the results as JSON.')
+@click.option('--compare', 'baseline_path', type=click.Path(exists=True, dir_okay=False),
+              help='Earlier JSON results to check for regressions.')
+@click.option('--threshold', default=0.10, show_default=True, type=click.FloatRange(min=0),
+              help='Relative p50/p99 slowdown reported as a regression.')
+@with_appcontext
+def benchmark_command(requests, concurrency, warmup, username, password, page_cache, only, output,
+                      baseline_path, threshold):
+    """Measure latency, throughput and SQL statements for the main routes."""
+    from flask import current_app
+    from app.benchmark import (build_scenarios, run_benchmarks, compare_reports,
+                               save_report, load_report)
+    try:
+        scenarios = build_scenarios(username, password)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    if only:
+        scenarios = [scenario for scenario in scenarios if scenario.name in only]
+
+    click.echo(f"{'scenario':<26} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'sql':>6} {'hits':>6} {'5xx':>5}")
+
+    def progress(name, result):
+        latency = result['latency_ms']
+        click.echo(f"{name:<26} {result['throughput_rps']:>8.1f} {latency['p50']:>9.2f} "
+                   f"{latency['p99']:>9.2f} {result['sql_statements']['mean']:>6.1f} "
+                   f"{result['cache_hit_ratio']:>6.0%} {result['errors']:>5}")
+
+    report = run_benchmarks(current_app._get_current_object(), scenarios,
+                            {'username': username, 'password': password},
+                            requests, concurrency, warmup, page_cache, progress)
+    if output:
+        save_report(report, output)
+        click.echo(f'Results saved to {output}.')
+
+    if baseline_path:
+        regressions = compare_reports(load_report(baseline_path), report, threshold)
+        for name, metric, before, after, change in regressions:
+            click.echo(f'REGRESSION {name} {metric}: {before:.2f} ms -> {after:.2f} ms (+{change:.0%})')
+        if regressions:
+            raise click.exceptions.Exit(1)
+        click.echo('No regressions.')
+
+
+@click.command('similar-recipes')
+@click.option('--full', is_flag=True, help='Recompute every recipe instead of only what changed.')
+@click.option('--neighbors', default=6, show_default=True, type=click.IntRange(min=1),
+              help='Similar recipes to keep per recipe.')
+@click.option('--batch-size', default=256, show_default=True, type=click.IntRange(min=1),
+              help='Recipes compared with the catalog per matrix product.')
+@with_appcontext
+def similar_recipes_command(full, neighbors, batch_size):
+    """Precompute each recipe's most similar recipes."""
+    from app.similarity import refresh_similar_recipes
+    result = refresh_similar_recipes(neighbors, batch_size, full)
+    kind = 'Full' if result.full else 'Incremental'
+    click.echo(f'{kind} refresh: recomputed {result.recomputed} of {result.recipes} recipes, '
+               f'wrote {result.rows} rows.')
+
+
+@click.command('process-images')
+@click.option('--limit', type=click.IntRange(min=1), help='Process at most this many images per pass.')
+@click.option('--watch', type=click.FloatRange(min=0.1), metavar='SECONDS',
+              help='Keep running, checking for pending images at this interval.')
+@with_appcontext
+def process_images_command(limit, watch):
+    """Resize uploaded images that are still waiting for their variants."""
+    import time
+    from app.images import image_pipeline
+    while True:
+        ready, failed = image_pipeline.process_pending(limit)
+        if ready or failed or not watch:
+            click.echo(f'Processed {ready + failed} image(s): {ready} ready, {failed} failed.')
+        if not watch:
+            break
+        time.sleep(watch)
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Minify, fingerprint and precompress the static stylesheets and scripts."""
+    from flask import current_app
+    from app.assets import build_assets
+    manifest = build_assets(current_app.static_folder, current_app.config['ASSETS_DIR'])
+    for source, hashed in sorted(manifest.items()):
+        click.echo(f'{source} -> {hashed}')
+    click.echo(f'Built {len(manifest)} asset(s) into {current_app.config["ASSETS_DIR"]}.')
+
+
+def register_commands(app):
+    """
+    Attach the maintenance commands to the Flask CLI.
+
+    Args:
+        app: Flask application instance
+    """
+    app.cli.add_command(recompute_counters_command)
+    app.cli.add_command(recompute_trending_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(import_recipes_command)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(benchmark_command)
+    app.cli.add_command(similar_recipes_command)
+    app.cli.add_command(process_images_command)
+    app.cli.add_command(build_assets_command)
@@ -1,9 +1,44 @@
 """Initialize Config class to access environment variables."""
 from dotenv import load_dotenv
+from datetime import datetime
 import os
+import tempfile
 
 load_dotenv()
 
+
+def engine_options(database_uri):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for a database URI from DB_* environment variables.
+
+    SQLite keeps SQLAlchemy's defaults; server databases get a sized,
+    pre-pinged, recycled and instrumented connection pool.
+
+    Args:
+        database_uri: SQLAlchemy database URI
+
+    Returns:
+        dict of create_engine() keyword arguments
+    """
+    if database_uri.startswith('sqlite'):
+        return {}
+
+    from app.poolstats import InstrumentedQueuePool
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+    # Per-statement timeout in milliseconds, enforced by the server
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    if statement_timeout and database_uri.startswith('postgres'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
 class Config(object):
     """Set environment variables."""
 
@@ -11,3 +46,100 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///culinaryconnect.db")
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-for-development-only')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Serve per-worker connection pool metrics as JSON from /metrics/pool
+    POOL_METRICS_ENABLED = os.getenv('POOL_METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+    # Recipes per page of the /recipes listing (also used by the benchmark's deep-page scenarios)
+    RECIPES_PER_PAGE = int(os.getenv('RECIPES_PER_PAGE', 9))
+    # Recipe listing pagination: 'keyset' (cursor tokens) or 'offset' (page numbers)
+    RECIPES_PAGINATION = os.getenv('RECIPES_PAGINATION', 'keyset')
+    # Total shown with keyset pagination: 'none', 'estimate' or 'exact'
+    RECIPES_PAGINATION_TOTAL = os.getenv('RECIPES_PAGINATION_TOTAL', 'estimate')
+    # Comments shown on the recipe page, and fetched per "load more" request
+    COMMENTS_PER_PAGE = int(os.getenv('COMMENTS_PER_PAGE', 10))
+    # Precomputed similar recipes listed on the recipe page
+    SIMILAR_RECIPES_SHOWN = int(os.getenv('SIMILAR_RECIPES_SHOWN', 5))
+    # Recipes in the homepage "Trending Now" section
+    TRENDING_RECIPES_SHOWN = int(os.getenv('TRENDING_RECIPES_SHOWN', 6))
+    # Hours after which a rating, comment or favorite counts half as much towards trending
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 48))
+    # Initial reference time of the trending scores; `flask recompute-trending` moves it forward when needed
+    TRENDING_EPOCH = datetime.fromisoformat(os.getenv('TRENDING_EPOCH', '2026-01-01'))
+    # Fail any request that runs more SQL statements than this (None disables the check)
+    SQLALCHEMY_QUERY_BUDGET = None
+    # Log statements slower than this many milliseconds (0 disables the slow-query log)
+    SQLALCHEMY_SLOW_QUERY_MS = float(os.getenv('SQLALCHEMY_SLOW_QUERY_MS', 100))
+    # Also write the slow-query log to this file
+    SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE')
+    # Report per-request database time in a Server-Timing response header. Every client can read it,
+    # so enable it only where SQL timings and statement counts may be public (development, staging).
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+    # Anonymous page cache: 'memory' (per worker), 'filesystem' (shared) or 'null'
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR',
+                                   os.path.join(tempfile.gettempdir(), 'culinaryconnect-cache'))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+    # Entries either backend keeps before evicting the least recently used (memory) or written (filesystem)
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 500))
+    
+    # Seconds a logged-in user's row is reused by the user loader (0 disables the cache)
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', 1000))
+    
+    # Seconds between checks of the category catalog version in the database
+    CATEGORY_CATALOG_CHECK_INTERVAL = float(os.getenv('CATEGORY_CATALOG_CHECK_INTERVAL', 5))
+    
+    # Seconds between checks for new ingredients to merge into the autocomplete index
+    INGREDIENT_INDEX_CHECK_INTERVAL = float(os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', 5))
+    
+    # Seconds between checks for recipe ingredient changes to merge into the pantry index
+    PANTRY_INDEX_CHECK_INTERVAL = float(os.getenv('PANTRY_INDEX_CHECK_INTERVAL', 5))
+    
+    # Uploaded originals and their resized variants (served from /media/)
+    IMAGE_STORAGE_DIR = os.getenv('IMAGE_STORAGE_DIR',
+                                  os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media'))
+    # 'pool': resize in each web worker's process pool; 'queue': leave it to `flask process-images`
+    IMAGE_PROCESSING = os.getenv('IMAGE_PROCESSING', 'pool')
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+    # Widths of the WebP and JPEG variants offered through srcset
+    IMAGE_VARIANT_WIDTHS = tuple(int(width) for width in os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(','))
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 80))
+    IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 8 * 1024 * 1024))
+    IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+    # Reject request bodies that could not hold a valid upload plus the rest of the form
+    MAX_CONTENT_LENGTH = IMAGE_MAX_BYTES + 1024 * 1024
+    
+    # Output of `flask build-assets`: fingerprinted, precompressed copies of app/static and their manifest
+    ASSETS_DIR = os.getenv('ASSETS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist'))
+    
+    # bcrypt work factor; existing hashes are upgraded on their owner's next login
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # Threads hashing passwords, and how many more operations may wait before login answers "busy".
+    # Together they are capped at WEB_THREADS - 1, so logins can never occupy every request thread.
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv('PASSWORD_HASH_QUEUE_DEPTH', 1))
+    # Request threads per server process (gunicorn --threads, see Procfile)
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+
+
+class TestConfig(Config):
+    """Configuration used by the unit tests (in-memory database, no CSRF)."""
+
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Catch N+1 query regressions in every request made by the tests
+    SQLALCHEMY_QUERY_BUDGET = 15
+    # Pages must reflect each test's own data
+    RESPONSE_CACHE_BACKEND = 'null'
+    CATEGORY_CATALOG_CHECK_INTERVAL = 0
+    INGREDIENT_INDEX_CHECK_INTERVAL = 0
+    PANTRY_INDEX_CHECK_INTERVAL = 0
+    USER_CACHE_TTL = 0
+    # Uploads stay pending until a test processes them
+    IMAGE_PROCESSING = 'queue'
+    # Cheap hashes keep the auth tests fast
+    BCRYPT_LOG_ROUNDS = 4
@@ -0,0 +1,69 @@
+"""Helpers for keeping the denormalized Recipe counter columns in sync."""
+from sqlalchemy import func, select, update
+from app.extensions import db
+from app.models import Recipe, Rating, Comment, Favorite
+
+# Counter columns that can be adjusted through adjust_recipe_counters()
+COUNTER_COLUMNS = ('rating_sum', 'rating_count', 'comment_count', 'favorite_count', 'trending_score')
+
+
+def adjust_recipe_counters(recipe_id, **deltas):
+    """
+    Apply deltas to a recipe's counter columns in the current transaction.
+
+    The update is issued as ``SET column = column + delta`` so that concurrent
+    writers never overwrite each other's increments.
+
+    Args:
+        recipe_id: ID of the recipe whose counters change
+        **deltas: Column name to signed delta, e.g. ``rating_count=1`` (see
+            app.trending for the ``trending_score`` points of a row)
+    """
+    values = {}
+    for name, delta in deltas.items():
+        if name not in COUNTER_COLUMNS:
+            raise ValueError(f'Unknown recipe counter: {name}')
+        if delta:
+            column = getattr(Recipe, name)
+            values[column] = column + delta
+
+    if values:
+        db.session.execute(
+            update(Recipe).where(Recipe.id == recipe_id).values(values)
+        )
+
+
+def recompute_recipe_counters(recipe_ids=None, touch=True):
+    """
+    Recalculate the counter columns from the source tables in one statement.
+
+    Args:
+        recipe_ids: Optional iterable of recipe IDs to limit the recalculation to
+        touch: Whether to bump updated_at (and so the recipes' API ETags); pass
+            False for recipes whose counts no client can have seen yet
+
+    Returns:
+        Number of recipe rows updated
+    """
+    rating_sum = (select(func.coalesce(func.sum(Rating.value), 0))
+                  .where(Rating.recipe_id == Recipe.id).scalar_subquery())
+    rating_count = (select(func.count(Rating.id))
+                    .where(Rating.recipe_id == Recipe.id).scalar_subquery())
+    comment_count = (select(func.count(Comment.id))
+                     .where(Comment.recipe_id == Recipe.id).scalar_subquery())
+    favorite_count = (select(func.count(Favorite.id))
+                      .where(Favorite.recipe_id == Recipe.id).scalar_subquery())
+
+    statement = update(Recipe).values(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        comment_count=comment_count,
+        favorite_count=favorite_count
+    )
+    if not touch:
+        statement = statement.values(updated_at=Recipe.updated_at)
+    if recipe_ids is not None:
+        statement = statement.where(Recipe.id.in_(list(recipe_ids)))
+
+    result = db.session.execute(statement.execution_options(synchronize_session=False))
+    return result.rowcount
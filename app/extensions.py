@@ -1,31 +1,18 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
-from app.config import Config
-import os
+from flask_migrate import Migrate
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-db = SQLAlchemy(app)
+# Unbound extensions; create_app() attaches them to each application it builds
+db = SQLAlchemy()
+migrate = Migrate()
 
 ###########################
 # Authentication
 ###########################
 
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please log in to access this page.'
 
-bcrypt = Bcrypt(app)
-
-# This is used by Flask-Login to load the user from the database
-@login_manager.user_loader
-def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
-
-
-
+bcrypt = Bcrypt()
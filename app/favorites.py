@@ -0,0 +1,30 @@
+"""Favorite-state lookups for the recipes shown on a page."""
+from sqlalchemy import select
+from app.extensions import db
+from app.models import Favorite
+
+
+def favorited_recipe_ids(user, recipe_ids):
+    """
+    Return which of the given recipes a user has favorited.
+
+    Runs one query restricted to the recipes on the page, answered from the
+    unique (user_id, recipe_id) index, instead of loading all of the user's
+    favorites.
+
+    Args:
+        user: User (or anonymous user) viewing the page
+        recipe_ids: IDs of the recipes shown on the page
+
+    Returns:
+        frozenset of favorited recipe IDs (empty for anonymous users)
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids or not user.is_authenticated:
+        return frozenset()
+
+    rows = db.session.execute(
+        select(Favorite.recipe_id)
+        .where(Favorite.user_id == user.id, Favorite.recipe_id.in_(recipe_ids))
+    )
+    return frozenset(rows.scalars())
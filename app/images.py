@@ -0,0 +1,216 @@
+"""
+Uploaded images and the resized variants served in their place.
+
+A request only hashes the upload, checks that it is an image of an allowed
+format and size (Pillow reads just the header), stores the original under
+its SHA-256 digest and records a pending UploadedImage. Resizing runs in a
+pool of worker processes (see app.thumbnails): with IMAGE_PROCESSING =
+'pool' each web worker hands its uploads to its pool straight away; with
+'queue' they wait for the ``process-images`` command, which also picks up
+images whose job was lost to a restart.
+
+Variants are named after a hash of their bytes, so /media/<filename> can be
+served with a one-year immutable Cache-Control header. Until an image is
+ready, pages fall back to the recipe's image_url or the placeholder.
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from flask import current_app
+from PIL import Image
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import Recipe, UploadedImage, recipe_categories
+from app.cache import invalidate_recipe_pages
+from app.thumbnails import render_variants, write_atomically
+
+logger = logging.getLogger(__name__)
+
+# Pillow formats accepted as uploads
+ALLOWED_FORMATS = frozenset({'JPEG', 'PNG', 'WEBP', 'GIF'})
+
+# File extensions offered by the upload fields
+ALLOWED_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an image the pipeline accepts."""
+
+
+class _PoolState:
+    """Worker processes for one application in one process."""
+
+    def __init__(self, workers):
+        self.pid = os.getpid()
+        # Spawned workers share no database connections or locks with the web process
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+
+class ImagePipeline:
+    """Flask extension that stores uploads and renders their variants off the request thread."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the extension; the pool itself starts on first use in each worker."""
+        app.extensions['image_pipeline'] = None
+
+    def _pool(self, replace=False):
+        """Return this process's pool, creating it after start-up, a fork or a crash."""
+        state = current_app.extensions.get('image_pipeline')
+        if replace or state is None or state.pid != os.getpid():
+            with self._lock:
+                current = current_app.extensions.get('image_pipeline')
+                if current is state:
+                    if replace and state is not None:
+                        state.executor.shutdown(wait=False)
+                    state = _PoolState(current_app.config.get('IMAGE_WORKERS', 2))
+                    current_app.extensions['image_pipeline'] = state
+                else:
+                    state = current
+        return state
+
+    @staticmethod
+    def path(kind, *parts):
+        """Return a path under IMAGE_STORAGE_DIR ('originals' or 'variants')."""
+        return os.path.join(current_app.config['IMAGE_STORAGE_DIR'], kind, *parts)
+
+    def store(self, file):
+        """
+        Save an upload and queue its variants.
+
+        Args:
+            file: Uploaded file (a werkzeug FileStorage or any binary file object)
+
+        Returns:
+            UploadedImage (an existing one when the same file was uploaded before)
+
+        Raises:
+            InvalidImage: If the file is too large, not an image or of a format that is not allowed
+        """
+        max_bytes = current_app.config['IMAGE_MAX_BYTES']
+        data = file.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise InvalidImage(f'Images must be smaller than {max_bytes // (1024 * 1024)} MB.')
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format, (width, height) = image.format, image.size
+        except (OSError, Image.DecompressionBombError):
+            raise InvalidImage('The file is not an image.') from None
+        if image_format not in ALLOWED_FORMATS:
+            raise InvalidImage('Images must be JPEG, PNG, WebP or GIF files.')
+        if width * height > current_app.config['IMAGE_MAX_PIXELS']:
+            raise InvalidImage('The image has too many pixels.')
+
+        digest = hashlib.sha256(data).hexdigest()
+        existing = db.session.execute(select(UploadedImage).filter_by(digest=digest)).scalar()
+        if existing is not None:
+            return existing
+
+        os.makedirs(self.path('originals'), exist_ok=True)
+        write_atomically(self.path('originals'), digest, data)
+        image = UploadedImage(digest=digest, format=image_format, width=width, height=height)
+        db.session.add(image)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # The same file was uploaded concurrently
+            db.session.rollback()
+            return db.session.execute(select(UploadedImage).filter_by(digest=digest)).scalar_one()
+
+        if current_app.config['IMAGE_PROCESSING'] == 'pool':
+            self._submit(image, current_app._get_current_object())
+        return image
+
+    def _job(self, image):
+        """Return the render_variants() arguments for an image."""
+        config = current_app.config
+        return (self.path('originals', image.digest), self.path('variants'),
+                tuple(config['IMAGE_VARIANT_WIDTHS']), ('webp', 'jpeg'), config['IMAGE_QUALITY'])
+
+    def _start(self, image):
+        """Submit an image to the pool, restarting a pool whose workers died."""
+        job = self._job(image)
+        try:
+            return self._pool().executor.submit(render_variants, *job)
+        except BrokenProcessPool:
+            return self._pool(replace=True).executor.submit(render_variants, *job)
+
+    def _submit(self, image, app):
+        """Render an image in the background and record the result when it is done."""
+        image_id = image.id
+
+        def finished(future):
+            with app.app_context():
+                self._finish(image_id, future)
+
+        try:
+            self._start(image).add_done_callback(finished)
+        except Exception:
+            # The image stays pending for the process-images command
+            logger.exception('Could not queue image %s for resizing', image_id)
+
+    def _finish(self, image_id, future):
+        """Store the outcome of a render job and expire the pages that show the image."""
+        try:
+            variants = future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); leave the image for process-images
+            logger.exception('Image worker crashed while resizing image %s', image_id)
+            return
+        except Exception as error:
+            logger.exception('Resizing image %s failed', image_id)
+            values = {'status': UploadedImage.FAILED, 'error': str(error)[:200]}
+        else:
+            values = {'status': UploadedImage.READY, 'variants': variants, 'error': None}
+        try:
+            db.session.execute(update(UploadedImage).where(UploadedImage.id == image_id)
+                               .values(processed_at=datetime.utcnow(), **values))
+            recipe_ids = db.session.execute(select(Recipe.id).where(Recipe.image_id == image_id)).scalars().all()
+            category_ids = db.session.execute(
+                select(recipe_categories.c.category_id).where(recipe_categories.c.recipe_id.in_(recipe_ids))
+            ).scalars().all() if recipe_ids else []
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # Cached listings still show these recipes without the image
+        if recipe_ids:
+            invalidate_recipe_pages(category_ids)
+
+    def process_pending(self, limit=None):
+        """
+        Render every pending image on the pool and wait for the results.
+
+        Args:
+            limit: Optional maximum number of images to process
+
+        Returns:
+            (number of images made ready, number that failed)
+        """
+        images = db.session.execute(
+            select(UploadedImage).filter_by(status=UploadedImage.PENDING).order_by(UploadedImage.id).limit(limit)
+        ).scalars().all()
+        futures = {self._start(image): image.id for image in images}
+        ready = failed = 0
+        for future in as_completed(futures):
+            self._finish(futures[future], future)
+            if future.exception() is None:
+                ready += 1
+            elif not isinstance(future.exception(), BrokenProcessPool):
+                failed += 1
+        return ready, failed
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,295 @@
+"""
+Streaming bulk import of recipes from JSON Lines or CSV files.
+
+Rows are read one at a time and written in batches: names of users,
+categories and ingredients are resolved to ids through in-memory maps
+(missing categories and ingredients are created once per batch, and
+ingredient names are matched by ingredient_key() like the recipe form
+matches them), recipes
+are inserted with one multi-row INSERT ... RETURNING per batch and their
+category and ingredient links with executemany. Memory use depends on the
+batch size, not on the size of the file.
+
+JSON Lines rows look like::
+
+    {"title": "...", "description": "...", "preparation_time": 10,
+     "cooking_time": 20, "servings": 4, "username": "chef",
+     "categories": ["Dinner"],
+     "ingredients": [{"name": "Rice", "quantity": 2, "unit": "cups"}]}
+
+CSV files use the same column names; ``categories`` is a ``;``-separated
+list and ``ingredients`` a ``;``-separated list of ``name:quantity:unit``.
+"""
+import csv
+import json
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import insert, select
+from app.extensions import db
+from app.models import User, Recipe, Category, Ingredient, RecipeIngredient, recipe_categories
+from app.catalog import CATALOG_NAME, bump_version
+from app.ingredient_index import INDEX_NAME as INGREDIENT_INDEX_NAME
+from app.pantry import INDEX_NAME as PANTRY_INDEX_NAME
+from app.recipes import ingredient_key
+
+ImportResult = namedtuple('ImportResult',
+                          ['recipes', 'skipped', 'categories_created', 'ingredients_created', 'errors'])
+
+# Columns copied from each row onto the recipe table
+RECIPE_FIELDS = ('title', 'description', 'preparation_time', 'cooking_time', 'servings', 'image_url')
+
+# Number of row errors kept for the summary
+MAX_REPORTED_ERRORS = 20
+
+
+def read_jsonl(stream):
+    """Yield (line number, row dict) pairs from a JSON Lines stream, skipping blank lines."""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def read_csv(stream):
+    """Yield (line number, row dict) pairs from a CSV stream with a header row."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        categories = [name.strip() for name in (row.get('categories') or '').split(';') if name.strip()]
+        ingredients = []
+        for item in (row.get('ingredients') or '').split(';'):
+            if item.strip():
+                name, _, rest = item.partition(':')
+                quantity, _, unit = rest.partition(':')
+                ingredients.append({'name': name.strip(), 'quantity': quantity.strip(), 'unit': unit.strip()})
+        row['categories'] = categories
+        row['ingredients'] = ingredients
+        yield reader.line_num, row
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def _check_length(value, column, label):
+    """Raise ValueError if value does not fit the given String column."""
+    if value and len(value) > column.type.length:
+        raise ValueError(f'{label} is longer than {column.type.length} characters')
+
+
+def normalize_row(row, default_username=None):
+    """
+    Validate one input row and convert it to plain Python values.
+
+    Args:
+        row: Parsed row from a reader
+        default_username: Author used when the row has no ``username``
+
+    Returns:
+        dict with the recipe fields, ``username``, ``created_at``,
+        ``categories`` and ``ingredients``
+
+    Raises:
+        ValueError: If a required field is missing or malformed
+    """
+    if not isinstance(row, dict):
+        raise ValueError('not a valid JSON object')
+    title = (row.get('title') or '').strip()
+    description = (row.get('description') or '').strip()
+    if not title or not description:
+        raise ValueError('title and description are required')
+    _check_length(title, Recipe.__table__.c.title, 'title')
+    image_url = row.get('image_url') or None
+    _check_length(image_url, Recipe.__table__.c.image_url, 'image_url')
+
+    username = (row.get('username') or default_username or '').strip()
+    if not username:
+        raise ValueError('no username given and no default author set')
+
+    created_at = row.get('created_at')
+    ingredients = []
+    for item in row.get('ingredients') or ():
+        name = ' '.join((item.get('name') or '').split())
+        if not name:
+            raise ValueError('ingredient without a name')
+        unit = (item.get('unit') or '').strip()
+        _check_length(name, Ingredient.__table__.c.name, 'ingredient name')
+        _check_length(unit, Ingredient.__table__.c.measurement_unit, f"unit of '{name}'")
+        ingredients.append((name, float(item.get('quantity') or 0), unit))
+
+    categories = [name.strip() for name in row.get('categories') or () if name.strip()]
+    for name in categories:
+        _check_length(name, Category.__table__.c.name, 'category name')
+
+    return {
+        'title': title,
+        'description': description,
+        'preparation_time': int(row.get('preparation_time') or 0),
+        'cooking_time': int(row.get('cooking_time') or 0),
+        'servings': int(row.get('servings') or 1),
+        'image_url': image_url,
+        'created_at': datetime.fromisoformat(created_at) if created_at else datetime.utcnow(),
+        'username': username,
+        'categories': categories,
+        'ingredients': ingredients,
+    }
+
+
+class RecipeImporter:
+    """
+    Writes batches of normalized rows, keeping name-to-id maps between batches.
+
+    Categories and ingredients are small tables and are loaded up front;
+    users are looked up per batch for the usernames not seen before.
+    """
+
+    def __init__(self):
+        self.user_ids = {}
+        self.category_ids = dict(db.session.execute(select(Category.name, Category.id)).all())
+        self.ingredient_ids = {ingredient_key(name): ingredient_id for name, ingredient_id
+                               in db.session.execute(select(Ingredient.name, Ingredient.id))}
+        self.categories_created = 0
+        self.ingredients_created = 0
+
+    def _resolve_users(self, rows):
+        missing = {row['username'] for row in rows} - self.user_ids.keys()
+        if missing:
+            self.user_ids.update(db.session.execute(
+                select(User.username, User.id).where(User.username.in_(missing))
+            ).all())
+
+    def _create_categories(self, rows):
+        missing = {name for row in rows for name in row['categories']} - self.category_ids.keys()
+        if not missing:
+            return
+        created = db.session.execute(
+            insert(Category.__table__).returning(Category.__table__.c.name, Category.__table__.c.id),
+            [{'name': name} for name in sorted(missing)]
+        ).all()
+        self.category_ids.update(created)
+        self.categories_created += len(created)
+        # Core inserts skip the mapper events, so mark the catalog stale here
+        bump_version(db.session.connection(), CATALOG_NAME)
+
+    def _create_ingredients(self, rows):
+        # The first spelling (and unit) of a new ingredient is the one stored
+        missing = {}
+        for row in rows:
+            for name, _, unit in row['ingredients']:
+                key = ingredient_key(name)
+                if key not in self.ingredient_ids:
+                    missing.setdefault(key, (name, unit))
+        if not missing:
+            return
+        created = db.session.execute(
+            insert(Ingredient.__table__).returning(Ingredient.__table__.c.name, Ingredient.__table__.c.id),
+            [{'name': name, 'measurement_unit': unit} for name, unit in sorted(missing.values())]
+        ).all()
+        self.ingredient_ids.update((ingredient_key(name), ingredient_id) for name, ingredient_id in created)
+        self.ingredients_created += len(created)
+        bump_version(db.session.connection(), INGREDIENT_INDEX_NAME)
+
+    def write_batch(self, rows):
+        """
+        Insert one batch of normalized rows and commit it.
+
+        Args:
+            rows: Normalized rows from normalize_row()
+
+        Returns:
+            (inserted, rejected) where rejected lists the positions of rows
+            whose author does not exist
+        """
+        self._resolve_users(rows)
+        rejected = [index for index, row in enumerate(rows) if row['username'] not in self.user_ids]
+        rows = [row for row in rows if row['username'] in self.user_ids]
+        if not rows:
+            return 0, rejected
+
+        # A failed batch must not leave its statements in the session for the caller
+        try:
+            self._create_categories(rows)
+            self._create_ingredients(rows)
+
+            recipe_table = Recipe.__table__
+            recipe_ids = db.session.execute(
+                insert(recipe_table).returning(recipe_table.c.id, sort_by_parameter_order=True),
+                [dict({field: row[field] for field in RECIPE_FIELDS},
+                      created_at=row['created_at'], user_id=self.user_ids[row['username']])
+                 for row in rows]
+            ).scalars().all()
+
+            links = []
+            amounts = []
+            for recipe_id, row in zip(recipe_ids, rows):
+                links.extend({'recipe_id': recipe_id, 'category_id': self.category_ids[name]}
+                             for name in dict.fromkeys(row['categories']))
+                # Like resolve_ingredients(), a repeated ingredient keeps its last quantity
+                quantities = {ingredient_key(name): quantity for name, quantity, _ in row['ingredients']}
+                amounts.extend({'recipe_id': recipe_id, 'ingredient_id': self.ingredient_ids[key],
+                                'quantity': quantity}
+                               for key, quantity in quantities.items())
+            if links:
+                db.session.execute(insert(recipe_categories), links)
+            if amounts:
+                db.session.execute(insert(RecipeIngredient.__table__), amounts)
+                bump_version(db.session.connection(), PANTRY_INDEX_NAME)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(recipe_ids), rejected
+
+
+def import_recipes(stream, file_format, batch_size=1000, default_username=None):
+    """
+    Import recipes from an open text stream.
+
+    Each batch is committed on its own, so an interrupted import keeps the
+    batches already written.
+
+    Args:
+        stream: Text stream to read rows from
+        file_format: 'jsonl' or 'csv'
+        batch_size: Number of recipes written per INSERT batch
+        default_username: Author for rows without a ``username``
+
+    Returns:
+        ImportResult with counts and up to MAX_REPORTED_ERRORS error messages
+    """
+    importer = RecipeImporter()
+    imported = skipped = 0
+    errors = []
+
+    def report(line, message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(f'line {line}: {message}')
+
+    def flush(batch):
+        nonlocal imported, skipped
+        inserted, rejected = importer.write_batch([row for _, row in batch])
+        imported += inserted
+        skipped += len(rejected)
+        for index in rejected:
+            line, row = batch[index]
+            report(line, f"unknown user '{row['username']}'")
+
+    batch = []
+    for line, row in READERS[file_format](stream):
+        try:
+            batch.append((line, normalize_row(row, default_username)))
+        except (ValueError, TypeError, AttributeError) as error:
+            skipped += 1
+            report(line, str(error))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    return ImportResult(imported, skipped, importer.categories_created,
+                        importer.ingredients_created, errors)
@@ -0,0 +1,166 @@
+"""
+Process-wide prefix index of ingredient names for autocomplete.
+
+Each worker keeps every ingredient name in sorted arrays and answers prefix
+lookups with a binary search, so typing in the recipe form never turns into
+``LIKE 'x%'`` queries. Names are indexed from the start and from every later
+word, so "sug" finds both "Sugar" and "Brown Sugar" (whole-name matches come
+first).
+
+Writers mark the index stale through the ``cache_version`` table, the same way
+as the category catalog. Inserts bump INDEX_NAME, after which workers fetch
+only the new rows and merge them in; renames and deletes bump REBUILD_NAME and
+trigger a full reload.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event, select
+from app.extensions import db
+from app.models import Ingredient, CacheVersion
+from app.catalog import bump_version
+
+INDEX_NAME = 'ingredients'
+REBUILD_NAME = 'ingredients:rebuild'
+
+# Concurrent transactions can commit ids out of order, so incremental loads
+# look back this many ids below the highest one already indexed
+ID_SLACK = 100
+
+IngredientEntry = namedtuple('IngredientEntry', ['id', 'name', 'measurement_unit'])
+
+
+@event.listens_for(Ingredient, 'after_insert')
+def _ingredient_added(mapper, connection, target):
+    """Let every worker merge the new ingredient into its index."""
+    bump_version(connection, INDEX_NAME)
+
+
+@event.listens_for(Ingredient, 'after_update')
+@event.listens_for(Ingredient, 'after_delete')
+def _ingredient_changed(mapper, connection, target):
+    """Make every worker rebuild its index."""
+    bump_version(connection, REBUILD_NAME)
+
+
+def _index_keys(entry):
+    """Return (whole-name key, later word keys) for an entry."""
+    words = entry.name.casefold().split()
+    return ((' '.join(words), entry.id),
+            [(' '.join(words[start:]), entry.id) for start in range(1, len(words))])
+
+
+class _IndexState:
+    """Loaded index for one application."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = None
+        self.checked_at = None
+        self.max_id = 0
+        self.by_id = {}
+        self.by_name = {}
+        # (names, words): sorted lists of (key, ingredient id), swapped as one value
+        self.keys = ([], [])
+
+
+class IngredientIndex:
+    """Flask extension answering ingredient name prefix lookups from memory."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create an empty index for an application; it loads on first use."""
+        app.extensions['ingredient_index'] = _IndexState()
+
+    def _state(self):
+        state = current_app.extensions.get('ingredient_index')
+        if state is None:
+            state = current_app.extensions.setdefault('ingredient_index', _IndexState())
+        interval = current_app.config.get('INGREDIENT_INDEX_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if state.checked_at is not None and now - state.checked_at < interval:
+            return state
+
+        with state.lock:
+            versions = dict(db.session.execute(
+                select(CacheVersion.name, CacheVersion.version)
+                .where(CacheVersion.name.in_([INDEX_NAME, REBUILD_NAME]))
+            ).all())
+            if state.checked_at is None or versions.get(REBUILD_NAME) != state.versions.get(REBUILD_NAME):
+                self._load(state, 0)
+            elif versions.get(INDEX_NAME) != state.versions.get(INDEX_NAME):
+                self._load(state, max(state.max_id - ID_SLACK, 0))
+            state.versions = versions
+            state.checked_at = now
+        return state
+
+    @staticmethod
+    def _load(state, after_id):
+        """Index the ingredients with an id above ``after_id`` (all of them for 0)."""
+        rows = db.session.execute(
+            select(Ingredient.id, Ingredient.name, Ingredient.measurement_unit)
+            .where(Ingredient.id > after_id)
+        ).all()
+        if after_id:
+            by_id, by_name = dict(state.by_id), dict(state.by_name)
+            names, words = list(state.keys[0]), list(state.keys[1])
+        else:
+            by_id, by_name, names, words = {}, {}, [], []
+        for row in rows:
+            if row.id in by_id:
+                continue
+            entry = IngredientEntry(*row)
+            by_id[entry.id] = entry
+            name_key, word_keys = _index_keys(entry)
+            by_name[name_key[0]] = entry
+            names.append(name_key)
+            words.extend(word_keys)
+        # The old keys are one sorted run, so this costs little more than sorting the new ones
+        names.sort()
+        words.sort()
+        state.by_id = by_id
+        state.by_name = by_name
+        state.keys = (names, words)
+        state.max_id = max(by_id, default=0)
+
+    def complete(self, prefix, limit=10):
+        """
+        Return up to ``limit`` IngredientEntry whose name or a later word starts with ``prefix``.
+
+        Whole-name matches come first, each group in alphabetical order.
+        """
+        prefix = ' '.join(prefix.casefold().split())
+        if not prefix or limit < 1:
+            return []
+        state = self._state()
+        by_id = state.by_id
+        matches = []
+        seen = set()
+        for keys in state.keys:
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and len(matches) < limit:
+                key, ingredient_id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                entry = by_id.get(ingredient_id)
+                if entry is not None and ingredient_id not in seen:
+                    seen.add(ingredient_id)
+                    matches.append(entry)
+                position += 1
+        return matches
+
+    def get(self, ingredient_id):
+        """Return the IngredientEntry for an id, or None if it does not exist."""
+        return self._state().by_id.get(ingredient_id)
+
+    def find(self, name):
+        """Return the IngredientEntry with this name (ignoring case and spacing), or None."""
+        return self._state().by_name.get(' '.join(name.casefold().split()))
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,39 @@
+"""
+Named loader-option presets for the queries behind each view.
+
+Each preset lists the relationships a template walks, so they are fetched
+up front (joined for many-to-one, selectin for collections) instead of
+with one lazy load per row. Apply them with ``query.options(*PRESET)``.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import Recipe, RecipeIngredient, Comment, Favorite, Rating
+
+# Recipe cards in listings show the author's username and the uploaded image
+RECIPE_CARD = (
+    joinedload(Recipe.user),
+    joinedload(Recipe.image),
+)
+
+# The detail page walks ingredients and categories (comments are paged separately)
+RECIPE_DETAIL = (
+    joinedload(Recipe.user),
+    joinedload(Recipe.image),
+    selectinload(Recipe.recipe_ingredients).joinedload(RecipeIngredient.ingredient),
+    selectinload(Recipe.categories),
+)
+
+# Comment cards show the author's username
+COMMENT_CARD = (
+    joinedload(Comment.user),
+)
+
+# Dashboard favorites render the favorited recipe and its author
+FAVORITE_CARD = (
+    joinedload(Favorite.recipe).joinedload(Recipe.user),
+    joinedload(Favorite.recipe).joinedload(Recipe.image),
+)
+
+# Dashboard "recently rated" rows render the rated recipe and its author
+RATING_ROW = (
+    joinedload(Rating.recipe).joinedload(Recipe.user),
+)
@@ -1,9 +1,38 @@
 # Create your forms here.
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, IntegerField, SelectMultipleField, SubmitField, FloatField, PasswordField, RadioField
+from flask_wtf.file import FileField, FileAllowed
+from wtforms import StringField, TextAreaField, IntegerField, SelectMultipleField, SubmitField, FloatField, PasswordField, RadioField, FieldList, FormField
 from wtforms.validators import DataRequired, Length, NumberRange, URL, Optional, Email, EqualTo, ValidationError
-from app.models import Category, User
+from app.models import User
+from app.catalog import category_catalog
+from app.recipes import RECIPE_FIELDS
+from app.images import ALLOWED_EXTENSIONS
+
+# Most named ingredient rows a recipe form accepts
+MAX_INGREDIENTS = 50
+
+class IngredientForm(FlaskForm):
+    """One ingredient row of a recipe; rows with no name are ignored."""
+    
+    class Meta:
+        # Rendered inside RecipeForm, which carries the CSRF token
+        csrf = False
+    
+    name = StringField('Ingredient', validators=[
+        Optional(),
+        Length(max=100, message='Ingredient names can be at most 100 characters')
+    ])
+    quantity = FloatField('Quantity', validators=[
+        Optional(),
+        NumberRange(min=0.01, message='Quantity must be greater than 0')
+    ])
+    
+    def validate_name(self, field):
+        """Require a quantity for every named ingredient."""
+        if self.quantity.data is None:
+            raise ValidationError(f'Please enter a quantity for {field.data.strip()}.')
+
 
 class RecipeForm(FlaskForm):
     """Form for creating and editing recipes."""
@@ -38,26 +67,35 @@ class RecipeForm(FlaskForm):
         URL(message='Please provide a valid URL for the image')
     ])
     
+    image = FileField('Upload Image', validators=[
+        FileAllowed(ALLOWED_EXTENSIONS, message='Please upload a JPEG, PNG, WebP or GIF image')
+    ])
+    
     category_ids = SelectMultipleField('Categories', coerce=int)
     
+    # No max_entries: FieldList would silently drop the extra rows, and the save would delete them
+    ingredients = FieldList(FormField(IngredientForm), min_entries=1)
+    
     submit = SubmitField('Save Recipe')
     
     def __init__(self, *args, **kwargs):
         """Initialize the form and set up category choices."""
         super(RecipeForm, self).__init__(*args, **kwargs)
-        self.category_ids.choices = [(c.id, c.name) for c in Category.query.order_by('name')]
-
-
-class IngredientForm(FlaskForm):
-    """Form for adding an ingredient to a recipe."""
+        self.category_ids.choices = category_catalog.choices()
     
-    ingredient_id = SelectMultipleField('Ingredient', coerce=int)
-    quantity = FloatField('Quantity', validators=[
-        DataRequired(),
-        NumberRange(min=0.01, message='Quantity must be greater than 0')
-    ])
+    def validate_ingredients(self, field):
+        """Reject recipes with more than MAX_INGREDIENTS named ingredients."""
+        if len(self.ingredient_pairs()) > MAX_INGREDIENTS:
+            raise ValidationError(f'A recipe can have at most {MAX_INGREDIENTS} ingredients.')
     
-    submit = SubmitField('Add Ingredient')
+    def recipe_fields(self):
+        """Return the recipe column values entered in the form (uploads are stored separately)."""
+        return {name: getattr(self, name).data for name in RECIPE_FIELDS if name in self}
+    
+    def ingredient_pairs(self):
+        """Return the (name, quantity) pairs of the non-empty ingredient rows."""
+        return [(entry.form.name.data.strip(), entry.form.quantity.data)
+                for entry in self.ingredients if entry.form.name.data and entry.form.name.data.strip()]
 
 
 class CommentForm(FlaskForm):
@@ -89,6 +127,10 @@ class ProfileForm(FlaskForm):
         URL(message='Please provide a valid URL for the profile picture')
     ])
     
+    picture = FileField('Upload Profile Picture', validators=[
+        FileAllowed(ALLOWED_EXTENSIONS, message='Please upload a JPEG, PNG, WebP or GIF image')
+    ])
+    
     current_password = PasswordField('Current Password')
     
     new_password = PasswordField('New Password', validators=[
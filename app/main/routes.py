@@ -1,23 +1,81 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from datetime import datetime
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, current_app, abort, jsonify,
+                   send_from_directory)
 from flask_login import login_required, current_user
-from app.extensions import db, bcrypt
-from app.models import Recipe, Category, User, Ingredient, RecipeIngredient, Comment, Favorite, Rating
+from app.extensions import db
+from app.models import Recipe, User, Ingredient, RecipeIngredient, Comment, Favorite, Rating, SimilarRecipe, recipe_categories
 from app.main.forms import RecipeForm, CommentForm, ProfileForm, RatingForm
-from sqlalchemy import or_
+from app.counters import adjust_recipe_counters
+from app.search import search_recipes
+from app.pagination import keyset_paginate
+from app.loaders import RECIPE_CARD, RECIPE_DETAIL, COMMENT_CARD, FAVORITE_CARD, RATING_ROW
+from app.cache import response_cache, invalidate_recipe_pages, invalidate_all_pages
+from app.catalog import category_catalog
+from app.stats import user_statistics
+from app.favorites import favorited_recipe_ids
+from app.user_cache import user_cache
+from app.passwords import password_hasher, HashingBusy
+from app.recipes import save_recipe, resolve_ingredients
+from app.ingredient_index import ingredient_index
+from app.pantry import pantry_index
+from app.trending import comment_points, favorite_points, rating_points
+from app.images import image_pipeline, InvalidImage
 
 main = Blueprint('main', __name__)
 
+# Largest number of extra ingredients the pantry search allows a recipe to need
+MAX_MISSING_INGREDIENTS = 3
+
+# Image variants are named after their content, so browsers may keep them for a year
+MEDIA_MAX_AGE = 365 * 24 * 3600
+
+def index_cache_tags():
+    """Tags for the cached homepage."""
+    return ['categories', 'recipes:index']
+
+def store_image_upload(field):
+    """
+    Store the file chosen in an upload field; resizing happens in the background.
+    
+    Returns:
+        ID of the UploadedImage, or None if the file was rejected (the reason
+        is added to the field's errors)
+    """
+    try:
+        return image_pipeline.store(field.data).id
+    except InvalidImage as error:
+        field.errors.append(str(error))
+        return None
+
+def listing_cache_tags():
+    """Tags for a cached recipe listing page, based on its filters."""
+    category_id = request.args.get('category', type=int)
+    if request.args.get('search'):
+        return ['categories', 'recipes:search']
+    if category_id:
+        return ['categories', f'recipes:category:{category_id}']
+    return ['categories', 'recipes:all']
+
 @main.route('/')
+@response_cache.cached(tags=index_cache_tags)
 def index():
-    """Homepage route showing featured recipes and categories."""
+    """Homepage route showing trending and featured recipes and categories."""
+    # Highest time-decayed activity first, read straight off ix_recipe_trending_score
+    trending = (Recipe.query.options(*RECIPE_CARD)
+                .filter(Recipe.trending_score > 0)
+                .order_by(Recipe.trending_score.desc())
+                .limit(current_app.config['TRENDING_RECIPES_SHOWN']).all())
+    
     # Get 6 most recent recipes for featured display
-    recipes = Recipe.query.order_by(Recipe.created_at.desc()).limit(6).all()
+    recipes = Recipe.query.options(*RECIPE_CARD).order_by(Recipe.created_at.desc()).limit(6).all()
     
-    # Get all categories
-    categories = Category.query.all()
+    # Get all categories from the in-memory catalog
+    categories = category_catalog.all()
     
     return render_template('main/index.html', 
+                          trending=trending,
                           recipes=recipes, 
+                          favorited_ids=favorited_recipe_ids(current_user, {r.id for r in trending + recipes}),
                           categories=categories,
                           title='Home - CulinaryConnect')
 
@@ -25,7 +83,7 @@ def index():
 def profile(user_id):
     """Display a user's profile and their recipes."""
     user = User.query.get_or_404(user_id)
-    recipes = Recipe.query.filter_by(user_id=user.id).order_by(Recipe.created_at.desc()).all()
+    recipes = Recipe.query.options(*RECIPE_CARD).filter_by(user_id=user.id).order_by(Recipe.created_at.desc()).all()
     
     return render_template('main/profile.html', 
                           user=user, 
@@ -39,24 +97,41 @@ def edit_profile():
     form = ProfileForm(original_username=current_user.username, original_email=current_user.email)
     
     if form.validate_on_submit():
+        picture_id = store_image_upload(form.picture) if form.picture.data else None
+        if form.picture.errors:
+            return render_template('main/profile_edit.html', form=form, title='Edit Profile')
+        
         # Verify current password if changing password
         password_changed = form.new_password.data and form.current_password.data
         
-        if password_changed and not bcrypt.check_password_hash(current_user.password, form.current_password.data):
-            flash('Current password is incorrect.', 'danger')
-            return render_template('main/profile_edit.html', form=form, title='Edit Profile')
+        try:
+            if password_changed and not password_hasher.check(current_user.password, form.current_password.data):
+                flash('Current password is incorrect.', 'danger')
+                return render_template('main/profile_edit.html', form=form, title='Edit Profile')
+            hashed_password = password_hasher.hash(form.new_password.data) if password_changed else None
+        except HashingBusy:
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('main/profile_edit.html', form=form, title='Edit Profile'), 503
         
         # Update user information
+        original_username = current_user.username
         current_user.username = form.username.data
         current_user.email = form.email.data
         current_user.profile_picture = form.profile_picture.data
+        if picture_id:
+            current_user.picture_id = picture_id
         
         # Update password if provided
-        if password_changed:
-            hashed_password = bcrypt.generate_password_hash(form.new_password.data).decode('utf-8')
+        if hashed_password:
             current_user.password = hashed_password
         
         db.session.commit()
+        user_cache.invalidate(current_user.id)
+        
+        # Usernames appear on recipe cards across the cached pages
+        if current_user.username != original_username:
+            invalidate_all_pages()
+        
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('main.profile', user_id=current_user.id))
     
@@ -69,62 +144,123 @@ def edit_profile():
     return render_template('main/profile_edit.html', form=form, title='Edit Profile')
 
 @main.route('/recipes')
+@response_cache.cached(tags=listing_cache_tags)
 def all_recipes():
     """
     Display all recipes with filtering options and pagination.
     
     Supports filtering by category and paginates results for better performance.
-    Also allows searching by recipe title and description.
+    Also allows full-text searching by recipe title and description.
+    
+    Browsing uses keyset pagination (``after``/``before`` cursor tokens) unless
+    the app is configured for offset pagination. Searches, which are ordered by
+    relevance, and legacy ``?page=`` links use offset pagination.
     """
     # Get query parameters for filtering and search
     category_id = request.args.get('category', type=int)
     search_query = request.args.get('search', type=str)
     page = request.args.get('page', 1, type=int)
-    per_page = 9  # Number of recipes per page
+    per_page = current_app.config['RECIPES_PER_PAGE']
     
-    # Base query
-    query = Recipe.query
+    # Base query, loading each card's author up front
+    query = Recipe.query.options(*RECIPE_CARD)
     
     # Apply category filter if provided
     if category_id:
-        category = Category.query.get_or_404(category_id)
-        query = query.filter(Recipe.categories.contains(category))
-    
-    # Apply search filter if provided
+        if category_catalog.get(category_id) is None:
+            abort(404)
+        query = query.filter(Recipe.id.in_(
+            db.select(recipe_categories.c.recipe_id)
+            .where(recipe_categories.c.category_id == category_id)
+        ))
+    
+    # Apply full-text search if provided (results are ranked by relevance)
     if search_query:
-        search_terms = f"%{search_query}%"
-        query = query.filter(
-            or_(
-                Recipe.title.ilike(search_terms),
-                Recipe.description.ilike(search_terms)
-            )
-        )
+        query = search_recipes(query, search_query)
     
     # Get recipes, newest first with pagination
-    pagination = query.order_by(Recipe.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    use_offset = (search_query or 'page' in request.args
+                  or current_app.config['RECIPES_PAGINATION'] == 'offset')
+    if use_offset:
+        pagination = query.order_by(Recipe.created_at.desc(), Recipe.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+    else:
+        pagination = keyset_paginate(
+            query, per_page,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            total=current_app.config['RECIPES_PAGINATION_TOTAL']
+        )
     recipes = pagination.items
     
     # Get all categories for filter dropdown
-    categories = Category.query.all()
+    categories = category_catalog.all()
     
     return render_template('main/recipes.html', 
                           recipes=recipes,
+                          favorited_ids=favorited_recipe_ids(current_user, [r.id for r in recipes]),
                           pagination=pagination,
                           categories=categories,
                           selected_category=category_id,
                           search_query=search_query,
                           title='All Recipes')
 
+@main.route('/recipes/cook')
+def cook_with():
+    """
+    Find recipes that can be made from the ingredients the user has.
+    
+    ``have`` is a comma-separated list of ingredient names; recipes may need up
+    to ``missing`` other ingredients, and with ``all`` they must use every one
+    listed. Matching runs on the in-memory pantry index, so the only query is
+    the one loading the cards of the current page.
+    """
+    have = request.args.get('have', '', type=str)
+    max_missing = min(max(request.args.get('missing', 0, type=int), 0), MAX_MISSING_INGREDIENTS)
+    require_all = bool(request.args.get('all'))
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 9
+    
+    names = list(dict.fromkeys(name.strip() for name in have.split(',') if name.strip()))
+    found = [(name, ingredient_index.find(name)) for name in names]
+    ingredients = [entry for _, entry in found if entry is not None]
+    unknown = {name: ingredient_index.complete(name, 3) for name, entry in found if entry is None}
+    
+    total, matches = pantry_index.search([entry.id for entry in ingredients], max_missing, require_all,
+                                         limit=per_page, offset=(page - 1) * per_page)
+    recipes = {recipe.id: recipe for recipe in
+               Recipe.query.options(*RECIPE_CARD).filter(Recipe.id.in_([m.recipe_id for m in matches]))}
+    have_ids = {entry.id for entry in ingredients}
+    results = []
+    for match in matches:
+        if match.recipe_id in recipes:
+            missing_names = sorted(entry.name for entry in map(ingredient_index.get,
+                                   pantry_index.ingredients_of(match.recipe_id) - have_ids) if entry)
+            results.append((recipes[match.recipe_id], missing_names))
+    
+    return render_template('main/cook.html',
+                           results=results,
+                           total=total,
+                           page=page,
+                           has_next=page * per_page < total,
+                           have=have,
+                           ingredients=ingredients,
+                           unknown=unknown,
+                           max_missing=max_missing,
+                           require_all=require_all,
+                           max_missing_choices=range(MAX_MISSING_INGREDIENTS + 1),
+                           title='Cook With What I Have')
+
 @main.route('/recipes/<int:recipe_id>', methods=['GET', 'POST'])
 def recipe_detail(recipe_id):
     """
     Display a specific recipe with details and handle comments and ratings.
     
-    Allows authenticated users to comment on and rate recipes.
+    Allows authenticated users to comment on and rate recipes. Only the newest
+    comments are rendered; older ones are fetched from recipe_comments().
     """
-    recipe = Recipe.query.get_or_404(recipe_id)
+    recipe = Recipe.query.options(*RECIPE_DETAIL).get_or_404(recipe_id)
     comment_form = CommentForm()
     rating_form = RatingForm()
     
@@ -136,18 +272,20 @@ def recipe_detail(recipe_id):
             recipe_id=recipe.id
         ).first()
         
-        # Pre-select current rating if it exists
-        if user_rating:
+        # Pre-select current rating if it exists (without clobbering a submitted value)
+        if user_rating and request.method == 'GET':
             rating_form.value.data = user_rating.value
     
     # Handle comment submission
     if comment_form.validate_on_submit() and current_user.is_authenticated:
         comment = Comment(
             content=comment_form.content.data,
+            created_at=datetime.utcnow(),
             recipe_id=recipe.id,
             user_id=current_user.id
         )
         db.session.add(comment)
+        adjust_recipe_counters(recipe.id, comment_count=1, trending_score=comment_points(comment))
         db.session.commit()
         flash('Your comment has been added!', 'success')
         return redirect(url_for('main.recipe_detail', recipe_id=recipe.id))
@@ -155,29 +293,94 @@ def recipe_detail(recipe_id):
     # Handle rating submission
     if 'rating_submit' in request.form and rating_form.validate_on_submit() and current_user.is_authenticated:
         if user_rating:
-            # Update existing rating
+            # Update existing rating; its trending points keep the original rating time
+            adjust_recipe_counters(recipe.id, rating_sum=rating_form.value.data - user_rating.value,
+                                   trending_score=rating_points(user_rating, rating_form.value.data)
+                                   - rating_points(user_rating))
             user_rating.value = rating_form.value.data
             flash('Your rating has been updated!', 'success')
         else:
             # Create new rating
             rating = Rating(
                 value=rating_form.value.data,
+                created_at=datetime.utcnow(),
                 recipe_id=recipe.id,
                 user_id=current_user.id
             )
             db.session.add(rating)
+            adjust_recipe_counters(recipe.id, rating_sum=rating.value, rating_count=1,
+                                   trending_score=rating_points(rating))
             flash('Your rating has been added!', 'success')
             
         db.session.commit()
         return redirect(url_for('main.recipe_detail', recipe_id=recipe.id))
+    
+    # Newest comments first; the rest load on demand
+    comments = keyset_paginate(
+        Comment.query.options(*COMMENT_CARD).filter_by(recipe_id=recipe.id),
+        current_app.config['COMMENTS_PER_PAGE'],
+        model=Comment
+    )
+    
+    # Precomputed by the similar-recipes command: one primary-key range read
+    similar_recipes = db.session.execute(
+        db.select(Recipe.id, Recipe.title, SimilarRecipe.score)
+        .join(SimilarRecipe, SimilarRecipe.similar_id == Recipe.id)
+        .where(SimilarRecipe.recipe_id == recipe.id)
+        .order_by(SimilarRecipe.rank)
+        .limit(current_app.config['SIMILAR_RECIPES_SHOWN'])
+    ).all()
         
     return render_template('main/recipe_detail.html', 
                            recipe=recipe,
+                           similar_recipes=similar_recipes,
+                           is_favorited=recipe.id in favorited_recipe_ids(current_user, [recipe.id]),
+                           comments=comments,
                            comment_form=comment_form,
                            rating_form=rating_form,
                            user_rating=user_rating,
                            title=recipe.title)
 
+@main.route('/media/<path:filename>')
+def media(filename):
+    """Serve a resized image variant with far-future, immutable caching."""
+    response = send_from_directory(image_pipeline.path('variants'), filename, max_age=MEDIA_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@main.route('/recipes/<int:recipe_id>/comments')
+def recipe_comments(recipe_id):
+    """
+    Return a page of a recipe's comments as JSON, newest first.
+    
+    Used by the "Load more comments" button. Pass the ``next_cursor`` of the
+    previous response as ``after`` to continue with older comments.
+    """
+    if db.session.get(Recipe, recipe_id) is None:
+        abort(404)
+    
+    comments = keyset_paginate(
+        Comment.query.options(*COMMENT_CARD).filter_by(recipe_id=recipe_id),
+        current_app.config['COMMENTS_PER_PAGE'],
+        after=request.args.get('after'),
+        model=Comment
+    )
+    
+    current_user_id = current_user.id if current_user.is_authenticated else None
+    return jsonify({
+        'comments': [{
+            'id': comment.id,
+            'content': comment.content,
+            'created_at': comment.created_at.isoformat(),
+            'created_at_display': comment.created_at.strftime('%B %d, %Y %I:%M %p'),
+            'username': comment.user.username,
+            'delete_url': (url_for('main.delete_comment', comment_id=comment.id)
+                           if comment.user_id == current_user_id else None),
+        } for comment in comments.items],
+        'next_cursor': comments.next_cursor,
+    })
+
 @main.route('/recipes/new', methods=['GET', 'POST'])
 @login_required
 def new_recipe():
@@ -185,27 +388,16 @@ def new_recipe():
     form = RecipeForm()
     
     if form.validate_on_submit():
-        recipe = Recipe(
-            title=form.title.data,
-            description=form.description.data,
-            preparation_time=form.preparation_time.data,
-            cooking_time=form.cooking_time.data,
-            servings=form.servings.data,
-            image_url=form.image_url.data,
-            user_id=current_user.id
-        )
-        
-        # Add categories
-        for category_id in form.category_ids.data:
-            category = Category.query.get(category_id)
-            if category:
-                recipe.categories.append(category)
-        
-        db.session.add(recipe)
-        db.session.commit()
-        
-        flash('Your recipe has been created!', 'success')
-        return redirect(url_for('main.recipe_detail', recipe_id=recipe.id))
+        fields = form.recipe_fields()
+        if form.image.data:
+            fields['image_id'] = store_image_upload(form.image)
+        if not form.image.errors:
+            changes = save_recipe(None, current_user.id, fields, form.category_ids.data or [],
+                                  resolve_ingredients(form.ingredient_pairs()))
+            invalidate_recipe_pages(changes.category_ids)
+            
+            flash('Your recipe has been created!', 'success')
+            return redirect(url_for('main.recipe_detail', recipe_id=changes.recipe_id))
     
     return render_template('main/recipe_form.html', 
                            form=form,
@@ -234,27 +426,30 @@ def edit_recipe(recipe_id):
         form.servings.data = recipe.servings
         form.image_url.data = recipe.image_url
         form.category_ids.data = [category.id for category in recipe.categories]
+        rows = db.session.execute(
+            db.select(Ingredient.name, RecipeIngredient.quantity)
+            .join(RecipeIngredient, RecipeIngredient.ingredient_id == Ingredient.id)
+            .where(RecipeIngredient.recipe_id == recipe.id)
+            .order_by(RecipeIngredient.id)
+        ).all()
+        if rows:
+            form.ingredients.pop_entry()
+        for row in rows:
+            form.ingredients.append_entry({'name': row.name, 'quantity': row.quantity})
     
     if form.validate_on_submit():
-        # Update recipe with form data
-        recipe.title = form.title.data
-        recipe.description = form.description.data
-        recipe.preparation_time = form.preparation_time.data
-        recipe.cooking_time = form.cooking_time.data
-        recipe.servings = form.servings.data
-        recipe.image_url = form.image_url.data
-        
-        # Update categories
-        recipe.categories = []
-        for category_id in form.category_ids.data:
-            category = Category.query.get(category_id)
-            if category:
-                recipe.categories.append(category)
-        
-        db.session.commit()
-        
-        flash('Your recipe has been updated!', 'success')
-        return redirect(url_for('main.recipe_detail', recipe_id=recipe.id))
+        # A new upload replaces the recipe's image; without one the image is kept
+        fields = form.recipe_fields()
+        if form.image.data:
+            fields['image_id'] = store_image_upload(form.image)
+        if not form.image.errors:
+            # Only the fields, categories and ingredients that changed are written
+            changes = save_recipe(recipe.id, current_user.id, fields, form.category_ids.data or [],
+                                  resolve_ingredients(form.ingredient_pairs()))
+            invalidate_recipe_pages(changes.category_ids | changes.categories_removed)
+            
+            flash('Your recipe has been updated!', 'success')
+            return redirect(url_for('main.recipe_detail', recipe_id=recipe_id))
     
     return render_template('main/recipe_form.html', 
                            form=form,
@@ -272,8 +467,10 @@ def delete_recipe(recipe_id):
         flash('You can only delete your own recipes!', 'danger')
         return redirect(url_for('main.recipe_detail', recipe_id=recipe.id))
     
+    category_ids = [category.id for category in recipe.categories]
     db.session.delete(recipe)
     db.session.commit()
+    invalidate_recipe_pages(category_ids)
     
     flash('Your recipe has been deleted!', 'success')
     return redirect(url_for('main.all_recipes'))
@@ -292,6 +489,7 @@ def delete_comment(comment_id):
     recipe_id = comment.recipe_id
     
     db.session.delete(comment)
+    adjust_recipe_counters(recipe_id, comment_count=-1, trending_score=-comment_points(comment))
     db.session.commit()
     
     flash('Your comment has been deleted!', 'success')
@@ -304,31 +502,43 @@ def dashboard():
     User dashboard for managing recipes, favorites, and ratings.
     
     Displays user's recipes, favorites, and recently rated recipes in a dashboard layout.
+    The recipe and favorite grids are paginated separately (``recipes_page`` and
+    ``favorites_page``), and all counters come from a single aggregate query.
     """
-    # Get user's recipes
-    user_recipes = Recipe.query.filter_by(user_id=current_user.id).order_by(Recipe.created_at.desc()).all()
-    
-    # Get user's favorite recipes
-    favorites = Favorite.query.filter_by(user_id=current_user.id).order_by(Favorite.id.desc()).all()
-    favorite_recipes = [favorite.recipe for favorite in favorites]
+    per_page = 6  # Number of cards per dashboard grid
+    
+    # Get all counters in one round trip
+    stats = user_statistics(current_user.id)
+    
+    # Get a page of the user's recipes (the total is already known from stats)
+    recipe_pagination = (Recipe.query.options(*RECIPE_CARD).filter_by(user_id=current_user.id)
+                         .order_by(Recipe.created_at.desc())
+                         .paginate(page=request.args.get('recipes_page', 1, type=int),
+                                   per_page=per_page, error_out=False, count=False))
+    recipe_pagination.total = stats.recipe_count
+    
+    # Get a page of the user's favorite recipes
+    favorite_pagination = (Favorite.query.options(*FAVORITE_CARD)
+                           .filter_by(user_id=current_user.id).order_by(Favorite.id.desc())
+                           .paginate(page=request.args.get('favorites_page', 1, type=int),
+                                     per_page=per_page, error_out=False, count=False))
+    favorite_pagination.total = stats.favorite_count
+    favorite_recipes = [favorite.recipe for favorite in favorite_pagination.items]
     
     # Get user's recent ratings
-    recent_ratings = Rating.query.filter_by(user_id=current_user.id).order_by(Rating.created_at.desc()).limit(5).all()
-    
-    # Get counts
-    recipe_count = len(user_recipes)
-    favorite_count = len(favorites)
-    comment_count = Comment.query.filter_by(user_id=current_user.id).count()
-    rating_count = Rating.query.filter_by(user_id=current_user.id).count()
+    recent_ratings = (Rating.query.options(*RATING_ROW)
+                      .filter_by(user_id=current_user.id).order_by(Rating.created_at.desc()).limit(5).all())
     
     return render_template('main/dashboard.html',
-                          user_recipes=user_recipes,
+                          user_recipes=recipe_pagination.items,
+                          recipe_pagination=recipe_pagination,
                           favorite_recipes=favorite_recipes,
+                          favorite_pagination=favorite_pagination,
                           recent_ratings=recent_ratings,
-                          recipe_count=recipe_count,
-                          favorite_count=favorite_count,
-                          comment_count=comment_count,
-                          rating_count=rating_count,
+                          recipe_count=stats.recipe_count,
+                          favorite_count=stats.favorite_count,
+                          comment_count=stats.comment_count,
+                          rating_count=stats.rating_count,
                           title='My Dashboard')
 
 @main.route('/favorites/toggle/<int:recipe_id>', methods=['POST'])
@@ -350,12 +560,14 @@ def toggle_favorite(recipe_id):
     if favorite:
         # Remove from favorites
         db.session.delete(favorite)
+        adjust_recipe_counters(recipe.id, favorite_count=-1, trending_score=-favorite_points(favorite))
         db.session.commit()
         flash('Recipe removed from favorites', 'info')
     else:
         # Add to favorites
-        favorite = Favorite(user_id=current_user.id, recipe_id=recipe.id)
+        favorite = Favorite(user_id=current_user.id, recipe_id=recipe.id, created_at=datetime.utcnow())
         db.session.add(favorite)
+        adjust_recipe_counters(recipe.id, favorite_count=1, trending_score=favorite_points(favorite))
         db.session.commit()
         flash('Recipe added to favorites', 'success')
     
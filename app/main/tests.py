@@ -1,10 +1,50 @@
 # Create your tests here.
 
+import gzip
+import io
+import json
+import logging
+import os
+import runpy
+import tempfile
 import unittest
+from unittest import mock
+from datetime import datetime, timedelta
 from flask import url_for
-from app import app, db
-from app.models import User, Recipe, Category
+from app import create_app
+from app.config import Config, TestConfig
+from app.extensions import db
+from app.models import User, Recipe, Category, Comment, Favorite, Rating, Ingredient, RecipeIngredient
+from app.counters import adjust_recipe_counters, recompute_recipe_counters
+from app.trending import recompute_trending_scores, trending_epoch
+from app.pagination import keyset_paginate
+from app.sqlstats import assert_max_queries, count_queries, normalize_sql
+from app.cache import FileSystemBackend, MemoryBackend, response_cache
+from app.catalog import category_catalog
+from app.stats import user_statistics
+from app.favorites import favorited_recipe_ids
 from app.extensions import bcrypt
+from app.config import engine_options
+from app.poolstats import InstrumentedQueuePool, pool_metrics
+from app.importer import import_recipes
+from app.main.forms import MAX_INGREDIENTS
+from app.synthetic import generate_dataset
+from app.benchmark import build_scenarios, run_benchmarks, compare_reports, percentile
+from app.recipes import save_recipe, resolve_ingredients
+from app.pantry import pantry_index
+from app.similarity import refresh_similar_recipes
+from app.images import image_pipeline
+from app.assets import build_assets, minify_css, minify_js
+from PIL import Image
+import brotli
+from app.models import SimilarRecipe
+from sqlalchemy import create_engine, func, inspect
+from flask_migrate import downgrade, upgrade
+
+app = create_app(TestConfig)
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MIGRATIONS_DIRECTORY = os.path.join(PROJECT_DIRECTORY, 'migrations')
 
 class MainRouteTests(unittest.TestCase):
     def setUp(self):
@@ -77,4 +117,880 @@ class MainRouteTests(unittest.TestCase):
         db.session.commit()
         
         response = self.app.get(f'/recipes?category={self.category.id}', follow_redirects=True)
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+        
+    def login(self):
+        """Log in as the test user."""
+        return self.app.post('/login', data={
+            'username': 'testuser',
+            'password': 'password'
+        }, follow_redirects=True)
+        
+    def test_recipe_counters_follow_writes(self):
+        """Test that ratings, comments and favorites keep the recipe counters in sync."""
+        self.login()
+        recipe_url = f'/recipes/{self.recipe.id}'
+        
+        self.app.post(recipe_url, data={'value': 4, 'rating_submit': ''})
+        self.app.post(recipe_url, data={'value': 2, 'rating_submit': ''})
+        self.app.post(recipe_url, data={'content': 'Lovely and easy to make.'})
+        self.app.post(f'/favorites/toggle/{self.recipe.id}')
+        
+        db.session.refresh(self.recipe)
+        self.assertEqual(self.recipe.rating_sum, 2)
+        self.assertEqual(self.recipe.rating_count, 1)
+        self.assertEqual(self.recipe.comment_count, 1)
+        self.assertEqual(self.recipe.favorite_count, 1)
+        self.assertEqual(self.recipe.average_rating, 2)
+        
+        comment = Comment.query.filter_by(recipe_id=self.recipe.id).first()
+        self.app.post(f'/comments/{comment.id}/delete')
+        self.app.post(f'/favorites/toggle/{self.recipe.id}')
+        
+        db.session.refresh(self.recipe)
+        self.assertEqual(self.recipe.comment_count, 0)
+        self.assertEqual(self.recipe.favorite_count, 0)
+        
+    def test_recompute_recipe_counters(self):
+        """Test that drifted counters are rebuilt from the source tables."""
+        db.session.add(Comment(content='Drifted comment', recipe_id=self.recipe.id, user_id=self.user.id))
+        self.recipe.rating_count = 7
+        db.session.commit()
+        
+        self.assertEqual(recompute_recipe_counters(), 1)
+        db.session.commit()
+        db.session.refresh(self.recipe)
+        self.assertEqual(self.recipe.rating_count, 0)
+        self.assertEqual(self.recipe.comment_count, 1)
+        
+    def test_trending_scores_follow_writes(self):
+        """Test that activity keeps trending scores in step with a recompute and ranks the homepage."""
+        quiet = Recipe(title='Quiet Recipe', description='Nobody cooks this', preparation_time=5,
+                       cooking_time=5, servings=1, user_id=self.user.id)
+        db.session.add(quiet)
+        db.session.add(Comment(content='Made it last year.', recipe=quiet, user_id=self.user.id,
+                               created_at=datetime.utcnow() - timedelta(days=365)))
+        db.session.commit()
+        recompute_trending_scores()
+        db.session.commit()
+        
+        self.login()
+        recipe_url = f'/recipes/{self.recipe.id}'
+        self.app.post(recipe_url, data={'value': 5, 'rating_submit': ''})
+        self.app.post(recipe_url, data={'value': 3, 'rating_submit': ''})
+        self.app.post(recipe_url, data={'content': 'Made it tonight.'})
+        self.app.post(recipe_url, data={'content': 'And again.'})
+        self.app.post(f'/favorites/toggle/{self.recipe.id}')
+        comment = Comment.query.filter_by(recipe_id=self.recipe.id, content='And again.').one()
+        self.app.post(f'/comments/{comment.id}/delete')
+        
+        db.session.refresh(self.recipe)
+        db.session.refresh(quiet)
+        incremental = (self.recipe.trending_score, quiet.trending_score)
+        self.assertGreater(incremental[0], incremental[1])
+        self.assertGreater(incremental[1], 0)
+        
+        updated_at = self.recipe.updated_at
+        self.assertEqual(recompute_trending_scores(), 2)
+        db.session.commit()
+        db.session.refresh(self.recipe)
+        db.session.refresh(quiet)
+        self.assertAlmostEqual(self.recipe.trending_score / incremental[0], 1)
+        self.assertAlmostEqual(quiet.trending_score / incremental[1], 1)
+        self.assertEqual(self.recipe.updated_at, updated_at)
+        
+        page = self.app.get('/').get_data(as_text=True)
+        trending = page[page.index('Trending Now'):page.index('Featured Recipes')]
+        self.assertLess(trending.index('Test Recipe'), trending.index('Quiet Recipe'))
+        
+    def test_trending_epoch_moves_before_scores_overflow(self):
+        """Test that writes survive an epoch too old to score against and a recompute moves it."""
+        half_life = timedelta(hours=app.config['TRENDING_HALF_LIFE_HOURS'])
+        self.addCleanup(app.config.__setitem__, 'TRENDING_EPOCH', TestConfig.TRENDING_EPOCH)
+        app.config['TRENDING_EPOCH'] = datetime.utcnow() - half_life * 1100
+        
+        self.login()
+        recipe_url = f'/recipes/{self.recipe.id}'
+        with self.assertLogs('app.trending', 'ERROR'):
+            response = self.app.post(recipe_url, data={'content': 'Made it tonight.'})
+        self.assertEqual(response.status_code, 302)
+        
+        recompute_trending_scores()
+        db.session.commit()
+        self.assertGreater(trending_epoch(), datetime.utcnow() - timedelta(hours=2))
+        db.session.refresh(self.recipe)
+        self.assertGreater(self.recipe.trending_score, 0)
+        
+        # Writes now score against the stored epoch, in step with a recompute
+        self.app.post(recipe_url, data={'content': 'And again.'})
+        db.session.refresh(self.recipe)
+        incremental = self.recipe.trending_score
+        recompute_trending_scores()
+        db.session.commit()
+        db.session.refresh(self.recipe)
+        self.assertAlmostEqual(self.recipe.trending_score / incremental, 1)
+        
+    def test_search_ranks_title_matches_first(self):
+        """Test that full-text search finds stemmed words and ranks title hits first."""
+        db.session.add_all([
+            Recipe(title='Weeknight Pasta', description='Quick dinner with roasted tomatoes.',
+                   preparation_time=5, cooking_time=15, servings=2, user_id=self.user.id),
+            Recipe(title='Tomato Soup', description='Smooth soup finished with cream.',
+                   preparation_time=10, cooking_time=30, servings=4, user_id=self.user.id),
+        ])
+        db.session.commit()
+        
+        response = self.app.get('/recipes?search=tomato')
+        body = response.get_data(as_text=True)
+        self.assertIn('Weeknight Pasta', body)
+        self.assertLess(body.index('Tomato Soup'), body.index('Weeknight Pasta'))
+        self.assertNotIn('Test Recipe', body)
+        
+        # Edits are picked up by the index
+        self.recipe.title = 'Tomato Salad'
+        db.session.commit()
+        response = self.app.get('/recipes?search=tomatoes')
+        self.assertIn('Tomato Salad', response.get_data(as_text=True))
+        
+    def test_keyset_pagination_walks_forward_and_back(self):
+        """Test that cursor tokens page through recipes without gaps or repeats."""
+        start = datetime(2024, 1, 1)
+        for i in range(20):
+            db.session.add(Recipe(title=f'Paged Recipe {i:02d}', description='Paged description',
+                                  preparation_time=1, cooking_time=1, servings=1,
+                                  user_id=self.user.id, created_at=start + timedelta(hours=i)))
+        db.session.commit()
+        
+        with app.test_request_context():
+            first = keyset_paginate(Recipe.query, 9)
+            second = keyset_paginate(Recipe.query, 9, after=first.next_cursor)
+            third = keyset_paginate(Recipe.query, 9, after=second.next_cursor, total='exact')
+            back = keyset_paginate(Recipe.query, 9, before=second.prev_cursor)
+        
+        seen = [r.id for page in (first, second, third) for r in page.items]
+        self.assertEqual(len(seen), 21)
+        self.assertEqual(len(set(seen)), 21)
+        self.assertFalse(first.has_prev)
+        self.assertFalse(third.has_next)
+        self.assertEqual(third.total, 21)
+        self.assertEqual([r.id for r in back.items], [r.id for r in first.items])
+        self.assertFalse(back.has_prev)
+        
+        response = self.app.get(f'/recipes?after={first.next_cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Paged Recipe 10', response.get_data(as_text=True))
+        
+    def make_authors(self, count):
+        """Create recipes, each by a different user and with a comment from that user."""
+        for i in range(count):
+            author = User(username=f'author{i}', email=f'author{i}@example.com', password='x')
+            db.session.add(author)
+            db.session.flush()
+            db.session.add(Recipe(title=f'Author Recipe {i}', description='Shared by an author',
+                                  preparation_time=1, cooking_time=1, servings=1, user_id=author.id))
+            db.session.add(Comment(content=f'Comment {i}', recipe_id=self.recipe.id, user_id=author.id))
+        db.session.commit()
+        db.session.expunge_all()
+        
+    def test_listing_query_count_is_constant(self):
+        """Test that listing pages do not lazy-load each card's author."""
+        self.make_authors(9)
+        with assert_max_queries(3):
+            self.app.get('/recipes')
+        with assert_max_queries(3):
+            self.app.get('/')
+            
+    def test_recipe_detail_query_count_is_constant(self):
+        """Test that the detail page loads comment authors in bulk."""
+        recipe_id = self.recipe.id
+        self.make_authors(12)
+        with assert_max_queries(7):
+            response = self.app.get(f'/recipes/{recipe_id}')
+        self.assertIn('Comment 11', response.get_data(as_text=True))
+        
+    def test_anonymous_page_cache(self):
+        """Test that anonymous listings are cached and only affected pages are invalidated."""
+        self.app.get('/')  # load this test's category catalog
+        previous_backend = app.extensions['response_cache']
+        app.extensions['response_cache'] = MemoryBackend()
+        self.addCleanup(app.extensions.__setitem__, 'response_cache', previous_backend)
+        category_url = f'/recipes?category={self.category.id}'
+        
+        self.assertEqual(self.app.get('/recipes').headers['X-Cache'], 'MISS')
+        self.assertEqual(self.app.get(category_url).headers['X-Cache'], 'MISS')
+        with assert_max_queries(0):
+            self.assertEqual(self.app.get('/recipes').headers['X-Cache'], 'HIT')
+        
+        self.login()
+        self.assertNotIn('X-Cache', self.app.get('/recipes').headers)
+        self.app.post('/recipes/new', data={
+            'title': 'Fresh Recipe',
+            'description': 'Just added to the site',
+            'preparation_time': 5,
+            'cooking_time': 5,
+            'servings': 2
+        })
+        self.app.get('/logout')
+        self.app.get('/recipes')  # consumes the logout flash message
+        
+        response = self.app.get('/recipes')
+        self.assertEqual(response.headers['X-Cache'], 'MISS')
+        self.assertIn('Fresh Recipe', response.get_data(as_text=True))
+        self.assertEqual(self.app.get(category_url).headers['X-Cache'], 'HIT')
+        
+    def test_page_cache_key_encodes_arguments(self):
+        """Test that an argument value cannot spell out another page's cache key."""
+        with app.test_request_context('/recipes?category=1%26search%3Da'):
+            smuggled = response_cache._page_key()
+        with app.test_request_context('/recipes?category=1&search=a'):
+            genuine = response_cache._page_key()
+        self.assertNotEqual(smuggled, genuine)
+        
+    def test_filesystem_page_cache_is_bounded(self):
+        """Test that the shared page cache evicts its oldest files past the entry cap."""
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileSystemBackend(directory, max_entries=2)
+            backend.set('first', 1, None)
+            os.utime(backend._path('first'), (1, 1))
+            backend.set('second', 2, None)
+            backend.set('third', 3, None)
+            
+            self.assertEqual(len(os.listdir(directory)), 2)
+            self.assertIsNone(backend.get('first'))
+            self.assertEqual((backend.get('second'), backend.get('third')), (2, 3))
+        
+    def test_category_catalog_reloads_on_change(self):
+        """Test that the catalog serves tuples from memory and reloads after a category write."""
+        with app.test_request_context():
+            self.assertEqual([c.name for c in category_catalog.all()], ['Test Category'])
+            with assert_max_queries(1):  # only the version check
+                category_catalog.all()
+            
+            db.session.add(Category(name='Brunch'))
+            db.session.commit()
+            self.assertEqual(category_catalog.choices()[0][1], 'Brunch')
+            self.assertIsInstance(category_catalog.all(), tuple)
+        
+        response = self.app.get('/recipes?category=999')
+        self.assertEqual(response.status_code, 404)
+        
+    def test_dashboard_statistics_and_pagination(self):
+        """Test that dashboard counters come from one query and the grids are paginated."""
+        for i in range(7):
+            db.session.add(Recipe(title=f'Dashboard Recipe {i}', description='Mine',
+                                  preparation_time=1, cooking_time=1, servings=1, user_id=self.user.id))
+        db.session.add(Comment(content='Nice', recipe_id=self.recipe.id, user_id=self.user.id))
+        db.session.commit()
+        
+        stats = user_statistics(self.user.id)
+        self.assertEqual(stats, (8, 0, 1, 0))
+        
+        self.login()
+        response = self.app.get('/dashboard')
+        body = response.get_data(as_text=True)
+        self.assertIn('Page 1 of 2', body)
+        response = self.app.get('/dashboard?recipes_page=2')
+        self.assertIn('Page 2 of 2', response.get_data(as_text=True))
+        
+    def test_recipe_comments_are_paginated(self):
+        """Test that the detail page shows the newest comments and JSON pages the rest."""
+        start = datetime(2024, 1, 1)
+        for i in range(15):
+            db.session.add(Comment(content=f'Comment number {i:02d}', recipe_id=self.recipe.id,
+                                   user_id=self.user.id, created_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        
+        body = self.app.get(f'/recipes/{self.recipe.id}').get_data(as_text=True)
+        self.assertIn('Comment number 14', body)
+        self.assertIn('Comment number 05', body)
+        self.assertNotIn('Comment number 04', body)
+        self.assertIn('load-more-comments', body)
+        
+        with app.test_request_context():
+            first_page = keyset_paginate(Comment.query.filter_by(recipe_id=self.recipe.id), 10, model=Comment)
+        data = self.app.get(f'/recipes/{self.recipe.id}/comments?after={first_page.next_cursor}').get_json()
+        self.assertEqual([c['content'] for c in data['comments']],
+                         [f'Comment number {i:02d}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next_cursor'])
+        self.assertIsNone(data['comments'][0]['delete_url'])
+        self.assertEqual(self.app.get('/recipes/9999/comments').status_code, 404)
+        
+    def test_favorite_state_is_looked_up_per_page(self):
+        """Test that favorite state comes from one lookup limited to the recipes shown."""
+        other = User(username='other', email='other@example.com', password='x')
+        db.session.add(other)
+        db.session.flush()
+        others_recipe = Recipe(title='Other Recipe', description='Not mine',
+                               preparation_time=1, cooking_time=1, servings=1, user_id=other.id)
+        db.session.add(others_recipe)
+        db.session.flush()
+        db.session.add(Favorite(user_id=self.user.id, recipe_id=others_recipe.id))
+        db.session.commit()
+        
+        with app.test_request_context():
+            self.assertEqual(favorited_recipe_ids(self.user, [others_recipe.id, self.recipe.id]),
+                             {others_recipe.id})
+        
+        self.login()
+        body = self.app.get(f'/recipes/{others_recipe.id}').get_data(as_text=True)
+        self.assertIn('Favorited', body)
+        body = self.app.get('/recipes').get_data(as_text=True)
+        self.assertIn('Remove from favorites', body)
+        
+    def test_pool_options_and_metrics(self):
+        """Test pool settings for server databases and the checkout metrics they report."""
+        self.assertEqual(engine_options('sqlite:///culinaryconnect.db'), {})
+        options = engine_options('postgresql://localhost/culinaryconnect')
+        self.assertIs(options['poolclass'], InstrumentedQueuePool)
+        self.assertTrue(options['pool_pre_ping'])
+        
+        engine = create_engine('sqlite://', poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0)
+        with engine.connect():
+            metrics = pool_metrics(engine)
+            self.assertEqual(metrics['checked_out'], 1)
+            self.assertEqual(metrics['checkouts'], 1)
+        self.assertEqual(pool_metrics(engine)['checked_out'], 0)
+        engine.dispose()
+        
+    def test_migrations_build_indexed_schema(self):
+        """Test that the migration chain creates the hot-path indexes."""
+        with tempfile.TemporaryDirectory() as directory:
+            class MigrationConfig(TestConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "migrated.db")}'
+            
+            migrated = create_app(MigrationConfig)
+            with migrated.app_context():
+                upgrade(directory=MIGRATIONS_DIRECTORY)
+                inspector = inspect(db.engine)
+                comment_indexes = {index['name'] for index in inspector.get_indexes('comment')}
+                rating_indexes = {index['name'] for index in inspector.get_indexes('rating')}
+                db.engine.dispose()
+        
+        self.assertIn('ix_comment_user_id_created_at', comment_indexes)
+        self.assertIn('ix_rating_user_id_created_at', rating_indexes)
+        
+    def test_entry_point_serves_pages(self):
+        """Test that the documented `python app.py` entry point renders the site's pages."""
+        with tempfile.TemporaryDirectory() as directory:
+            database = f'sqlite:///{os.path.join(directory, "entry.db")}'
+            with mock.patch.object(Config, 'SQLALCHEMY_DATABASE_URI', database), \
+                    mock.patch.object(Config, 'SQLALCHEMY_ENGINE_OPTIONS', {}):
+                entry = runpy.run_path(os.path.join(PROJECT_DIRECTORY, 'app.py'))['app']
+            client = entry.test_client()
+            statuses = {path: client.get(path).status_code for path in ('/', '/recipes', '/login')}
+            page = client.get('/').get_data(as_text=True)
+            with entry.app_context():
+                db.engine.dispose()
+        
+        self.assertEqual(statuses, {'/': 200, '/recipes': 200, '/login': 200})
+        self.assertIn('css/style.css', page)
+        
+    def test_migrations_backfill_listing_timestamps(self):
+        """Test that rows without created_at get one before the column becomes NOT NULL."""
+        with tempfile.TemporaryDirectory() as directory:
+            class MigrationConfig(TestConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "migrated.db")}'
+            
+            migrated = create_app(MigrationConfig)
+            with migrated.app_context():
+                upgrade(directory=MIGRATIONS_DIRECTORY, revision='0009')
+                for statement in (
+                    "INSERT INTO user (id, username, email, password) VALUES (1, 'legacy', 'l@example.com', 'x')",
+                    "INSERT INTO recipe (id, title, description, preparation_time, cooking_time, servings,"
+                    " created_at, updated_at, user_id) VALUES (1, 'Old', 'Dated', 1, 1, 1,"
+                    " '2020-01-01 00:00:00.000000', '2020-01-01 00:00:00.000000', 1)",
+                    "INSERT INTO recipe (id, title, description, preparation_time, cooking_time, servings, user_id)"
+                    " VALUES (2, 'Legacy', 'Undated', 1, 1, 1, 1)",
+                    "INSERT INTO comment (id, content, recipe_id, user_id) VALUES (1, 'Undated', 2, 1)",
+                ):
+                    db.session.execute(db.text(statement))
+                db.session.commit()
+                upgrade(directory=MIGRATIONS_DIRECTORY)
+                recipe_created = db.session.get(Recipe, 2).created_at
+                comment_created = db.session.get(Comment, 1).created_at
+                columns = {column['name']: column for column in inspect(db.engine).get_columns('comment')}
+                db.session.remove()
+                db.engine.dispose()
+        
+        self.assertEqual(recipe_created, datetime(2020, 1, 1))
+        self.assertEqual(comment_created, recipe_created)
+        self.assertFalse(columns['created_at']['nullable'])
+        
+    def test_migrations_keep_search_triggers(self):
+        """Test that later migrations leave the full-text sync triggers in place."""
+        trigger_names = {'recipe_search_ai', 'recipe_search_ad', 'recipe_search_au'}
+        query = "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        with tempfile.TemporaryDirectory() as directory:
+            class MigrationConfig(TestConfig):
+                SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(directory, "migrated.db")}'
+            
+            migrated = create_app(MigrationConfig)
+            with migrated.app_context():
+                upgrade(directory=MIGRATIONS_DIRECTORY)
+                at_head = set(db.session.execute(db.text(query)).scalars())
+                downgrade(directory=MIGRATIONS_DIRECTORY, revision='0008')
+                at_0008 = set(db.session.execute(db.text(query)).scalars())
+                db.session.remove()
+                db.engine.dispose()
+        
+        self.assertLessEqual(trigger_names, at_head)
+        self.assertLessEqual(trigger_names, at_0008)
+        
+    def test_import_recipes_in_batches(self):
+        """Test streaming recipes from JSON Lines and CSV with name resolution."""
+        jsonl = io.StringIO(
+            '{"title": "Rice Bowl", "description": "Simple rice", "servings": 2,'
+            ' "categories": ["Test Category", "Vegan"],'
+            ' "ingredients": [{"name": "Rice", "quantity": 2, "unit": "cups"}]}\n'
+            'not json\n'
+            '{"title": "Ghost Recipe", "description": "No author", "username": "nobody"}\n'
+        )
+        result = import_recipes(jsonl, 'jsonl', batch_size=1, default_username='testuser')
+        self.assertEqual((result.recipes, result.skipped), (1, 2))
+        self.assertEqual((result.categories_created, result.ingredients_created), (1, 1))
+        self.assertEqual(len(result.errors), 2)
+        
+        rows = io.StringIO(
+            'title,description,username,categories,ingredients\n'
+            'Fried Rice,Rice again,testuser,Vegan;Test Category,Rice:1:cups;Egg:2:\n'
+        )
+        result = import_recipes(rows, 'csv')
+        self.assertEqual((result.recipes, result.categories_created, result.ingredients_created), (1, 0, 1))
+        
+        db.session.expire_all()
+        fried_rice = Recipe.query.filter_by(title='Fried Rice').one()
+        self.assertEqual(sorted(c.name for c in fried_rice.categories), ['Test Category', 'Vegan'])
+        self.assertEqual(sorted((ri.ingredient.name, ri.quantity) for ri in fried_rice.recipe_ingredients),
+                         [('Egg', 2.0), ('Rice', 1.0)])
+        self.assertEqual(fried_rice.user_id, self.user.id)
+        with app.test_request_context():
+            self.assertIn('Vegan', [entry.name for entry in category_catalog.all()])
+        
+    def test_import_matches_ingredient_names_like_the_form(self):
+        """Test that the importer reuses existing ingredients whatever their case and spacing."""
+        db.session.add(Ingredient(name='Brown Rice', measurement_unit='cups'))
+        db.session.commit()
+        rows = io.StringIO(
+            'title,description,username,ingredients\n'
+            'Rice Bowl,Simple rice,testuser,brown  rice:1:cups;Egg:2:;egg:3:\n'
+        )
+        result = import_recipes(rows, 'csv')
+        self.assertEqual((result.recipes, result.ingredients_created), (1, 1))
+        
+        db.session.expire_all()
+        bowl = Recipe.query.filter_by(title='Rice Bowl').one()
+        self.assertEqual(sorted((ri.ingredient.name, ri.quantity) for ri in bowl.recipe_ingredients),
+                         [('Brown Rice', 1.0), ('Egg', 3.0)])
+        
+    def test_import_skips_values_longer_than_their_columns(self):
+        """Test that over-long names are reported as row errors instead of aborting the import."""
+        long_name = 'x' * 101
+        rows = io.StringIO('\n'.join(json.dumps(row) for row in [
+            {'title': 'Long Ingredient', 'description': 'Too long',
+             'ingredients': [{'name': long_name, 'quantity': 1}]},
+            {'title': 'Long Unit', 'description': 'Too long',
+             'ingredients': [{'name': 'Rice', 'quantity': 1, 'unit': 'u' * 51}]},
+            {'title': 'Long Category', 'description': 'Too long', 'categories': [long_name]},
+            {'title': 'Fine', 'description': 'Fits', 'ingredients': [{'name': 'Rice', 'quantity': 1}]},
+        ]))
+        result = import_recipes(rows, 'jsonl', default_username='testuser')
+        self.assertEqual((result.recipes, result.skipped), (1, 3))
+        self.assertEqual(result.errors, [
+            'line 1: ingredient name is longer than 100 characters',
+            "line 2: unit of 'Rice' is longer than 50 characters",
+            'line 3: category name is longer than 100 characters',
+        ])
+        self.assertEqual([recipe.title for recipe in Recipe.query.filter(Recipe.title != 'Test Recipe')], ['Fine'])
+        
+    def test_generate_synthetic_dataset(self):
+        """Test that the generator is deterministic, skewed and keeps counters consistent."""
+        written = generate_dataset(users=100, recipes=50, categories=3, ingredients=30, comments=200,
+                                   ratings=300, favorites=100, seed=7, batch_size=64)
+        self.assertEqual((written['user'], written['recipe'], written['category']), (100, 50, 3))
+        self.assertEqual(written['rating'], Rating.query.count())
+        self.assertEqual(db.session.query(func.sum(Recipe.rating_count)).scalar(), written['rating'])
+        
+        # The most popular recipe collects far more ratings than an average one
+        top = db.session.query(func.max(Recipe.rating_count)).scalar()
+        self.assertGreater(top, 3 * written['rating'] / 51)
+        
+        # The same seed produces the same data, timestamps and trending scores included
+        def snapshot(first_recipe_id, first_comment_id):
+            recipes = [(recipe.title, recipe.rating_count, recipe.created_at, recipe.updated_at,
+                        recipe.trending_score)
+                       for recipe in Recipe.query.filter(Recipe.id >= first_recipe_id).order_by(Recipe.id)]
+            comments = [comment.created_at for comment in
+                        Comment.query.filter(Comment.id >= first_comment_id).order_by(Comment.id)]
+            return recipes, comments
+        
+        generated = snapshot(self.recipe.id + 1, 1)
+        self.assertTrue(all(created_at < datetime(2026, 1, 1) for _, _, created_at, _, _ in generated[0]))
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        generate_dataset(users=100, recipes=50, categories=3, ingredients=30, comments=200,
+                         ratings=300, favorites=100, seed=7, batch_size=64)
+        self.assertEqual(snapshot(1, 1), generated)
+        
+    def test_benchmark_reports_percentiles_and_regressions(self):
+        """Test the benchmark harness on a couple of routes."""
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 0.5), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        
+        scenarios = [scenario for scenario in build_scenarios('testuser', 'password')
+                     if scenario.name in ('recipe_detail', 'dashboard')]
+        report = run_benchmarks(app, scenarios, {'username': 'testuser', 'password': 'password'},
+                                requests=4, concurrency=2, warmup=1)
+        for name in ('recipe_detail', 'dashboard'):
+            result = report['scenarios'][name]
+            self.assertEqual(result['statuses'], {'200': 4})
+            self.assertGreater(result['sql_statements']['mean'], 0)
+        
+        slower = json.loads(json.dumps(report))
+        dashboard_latency = slower['scenarios']['dashboard']['latency_ms']
+        dashboard_latency['p99'] = dashboard_latency['p99'] * 2 + 1
+        regressions = compare_reports(report, slower)
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions], [('dashboard', 'p99')])
+        
+    def test_benchmark_deep_pages_read_the_same_rows(self):
+        """Test that the deep keyset and offset scenarios land on the same listing page."""
+        start = datetime(2024, 1, 1)
+        for i in range(25):
+            db.session.add(Recipe(title=f'Deep Recipe {i:02d}', description='Listing filler', preparation_time=1,
+                                  cooking_time=1, servings=1, user_id=self.user.id,
+                                  created_at=start + timedelta(minutes=i)))
+        db.session.commit()
+        
+        scenarios = {scenario.name: scenario for scenario in build_scenarios('testuser', 'password', deep_page=3)}
+        self.assertEqual(scenarios['all_recipes_deep_offset'].path, '/recipes?page=3')
+        cursor = scenarios['all_recipes_deep_keyset'].path.split('after=', 1)[1]
+        
+        per_page = app.config['RECIPES_PER_PAGE']
+        with app.test_request_context():
+            offset_page = (Recipe.query.order_by(Recipe.created_at.desc(), Recipe.id.desc())
+                           .paginate(page=3, per_page=per_page, error_out=False))
+            keyset_page = keyset_paginate(Recipe.query, per_page, after=cursor)
+        self.assertEqual(len(offset_page.items), 26 - 2 * per_page)
+        self.assertEqual([recipe.id for recipe in keyset_page.items], [recipe.id for recipe in offset_page.items])
+        
+    def test_server_timing_and_slow_query_log(self):
+        """Test that requests report their SQL time and log slow statements."""
+        self.assertNotIn('Server-Timing', self.app.get(f'/recipes/{self.recipe.id}').headers)
+        app.config['SERVER_TIMING_ENABLED'] = True
+        self.addCleanup(app.config.__setitem__, 'SERVER_TIMING_ENABLED', TestConfig.SERVER_TIMING_ENABLED)
+        response = self.app.get(f'/recipes/{self.recipe.id}')
+        self.assertRegex(response.headers['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", db-slowest;dur=[\d.]+, app;dur=[\d.]+$')
+        
+        app.config['SQLALCHEMY_SLOW_QUERY_MS'] = 0.000001
+        self.addCleanup(app.config.__setitem__, 'SQLALCHEMY_SLOW_QUERY_MS', TestConfig.SQLALCHEMY_SLOW_QUERY_MS)
+        with self.assertLogs('app.sqlstats', 'WARNING') as logs:
+            self.app.get(f'/recipes/{self.recipe.id}')
+        self.assertIn('in main.recipe_detail: SELECT', logs.output[0])
+        
+        self.assertEqual(normalize_sql("SELECT * FROM recipe\n WHERE id IN (?, ?, ?) AND title = 'x' LIMIT 10"),
+                         'SELECT * FROM recipe WHERE id IN (?...) AND title = ? LIMIT ?')
+        
+    def test_slow_query_log_file_is_attached_once(self):
+        """Test that creating several apps does not duplicate the slow-query file handler."""
+        sql_logger = logging.getLogger('app.sqlstats')
+        with tempfile.TemporaryDirectory() as directory:
+            class LogFileConfig(TestConfig):
+                SLOW_QUERY_LOG_FILE = os.path.join(directory, 'slow.log')
+            
+            create_app(LogFileConfig)
+            create_app(LogFileConfig)
+            handlers = [handler for handler in sql_logger.handlers if isinstance(handler, logging.FileHandler)
+                        and handler.baseFilename == LogFileConfig.SLOW_QUERY_LOG_FILE]
+            for handler in handlers:
+                sql_logger.removeHandler(handler)
+                handler.close()
+        
+        self.assertEqual(len(handlers), 1)
+        
+    def test_recipe_form_rejects_too_many_ingredients(self):
+        """Test that ingredient rows past the limit are rejected instead of silently dropped."""
+        self.login()
+        form = {'title': 'Big Stew', 'description': 'Everything in the pantry', 'preparation_time': 5,
+                'cooking_time': 60, 'servings': 8}
+        for index in range(MAX_INGREDIENTS + 1):
+            form[f'ingredients-{index}-name'] = f'Ingredient {index}'
+            form[f'ingredients-{index}-quantity'] = 1
+        response = self.app.post('/recipes/new', data=form)
+        self.assertIn(f'at most {MAX_INGREDIENTS} ingredients', response.get_data(as_text=True))
+        self.assertIsNone(Recipe.query.filter_by(title='Big Stew').first())
+        
+        del form[f'ingredients-{MAX_INGREDIENTS}-name'], form[f'ingredients-{MAX_INGREDIENTS}-quantity']
+        self.app.post('/recipes/new', data=form)
+        self.assertEqual(len(Recipe.query.filter_by(title='Big Stew').one().recipe_ingredients), MAX_INGREDIENTS)
+        
+    def test_recipe_edit_writes_only_the_difference(self):
+        """Test that saving a recipe diffs its categories and ingredients instead of rewriting them."""
+        self.login()
+        dinner = Category(name='Dinner')
+        db.session.add_all([dinner, Ingredient(name='Rice', measurement_unit='cups')])
+        db.session.commit()
+        category_ids = [self.category.id, dinner.id]
+        self.app.post('/recipes/new', data={
+            'title': 'Fried Rice',
+            'description': 'Leftover rice, fried',
+            'preparation_time': 5,
+            'cooking_time': 10,
+            'servings': 2,
+            'category_ids': category_ids,
+            'ingredients-0-name': 'rice',
+            'ingredients-0-quantity': 2,
+            'ingredients-1-name': 'Egg',
+            'ingredients-1-quantity': 3,
+            'ingredients-2-name': '',
+        })
+        recipe = Recipe.query.filter_by(title='Fried Rice').one()
+        recipe_id = recipe.id
+        self.assertEqual(sorted((item.ingredient.name, item.quantity) for item in recipe.recipe_ingredients),
+                         [('Egg', 3.0), ('Rice', 2.0)])
+        self.assertEqual(sorted(category.id for category in recipe.categories), category_ids)
+        self.assertEqual(Ingredient.query.count(), 2)
+        
+        fields = {'title': 'Fried Rice', 'description': 'Leftover rice, fried', 'preparation_time': 5,
+                  'cooking_time': 10, 'servings': 2, 'image_url': None}
+        with count_queries() as counter:
+            changes = save_recipe(recipe_id, self.user.id, fields, category_ids,
+                                  resolve_ingredients([('Rice', 2.0), ('Egg', 3.0)]))
+        self.assertFalse([sql for sql in counter.statements if not sql.startswith('SELECT')])
+        self.assertEqual(changes.fields, ())
+        
+        egg_row_id = RecipeIngredient.query.join(Ingredient).filter(Ingredient.name == 'Egg').one().id
+        with count_queries() as counter:
+            changes = save_recipe(recipe_id, self.user.id, dict(fields, servings=3), [dinner.id],
+                                  resolve_ingredients([('Egg', 4.0), ('Scallion', 1.0)]))
+        writes = [sql.split(' WHERE')[0] for sql in counter.statements if not sql.startswith('SELECT')]
+        self.assertEqual(sorted(writes), sorted([
+            'INSERT INTO ingredient (name, measurement_unit) VALUES (?, ?) RETURNING id, name',
+            'UPDATE cache_version SET version=?',
+            'UPDATE cache_version SET version=?',
+            'DELETE FROM recipe_categories',
+            'INSERT INTO recipe_ingredient (recipe_id, ingredient_id, quantity) VALUES (?, ?, ?)',
+            'UPDATE recipe_ingredient SET quantity=?',
+            'DELETE FROM recipe_ingredient',
+            'UPDATE recipe SET servings=?, updated_at=?, content_updated_at=?',
+        ]))
+        self.assertEqual(changes.fields, ('servings',))
+        self.assertEqual(changes.categories_removed, {self.category.id})
+        self.assertEqual(len(changes.ingredients_updated), 1)
+        
+        recipe = db.session.get(Recipe, recipe_id)
+        self.assertEqual([category.id for category in recipe.categories], [dinner.id])
+        self.assertEqual(sorted((item.ingredient.name, item.quantity) for item in recipe.recipe_ingredients),
+                         [('Egg', 4.0), ('Scallion', 1.0)])
+        # Unchanged ingredients keep their row
+        self.assertIn(egg_row_id, [item.id for item in recipe.recipe_ingredients])
+        
+        response = self.app.get(f'/recipes/{recipe_id}/edit')
+        self.assertIn('value="Scallion"', response.get_data(as_text=True))
+        
+    def test_cook_with_what_i_have(self):
+        """Test ranking recipes by missing ingredients and refreshing the index after edits."""
+        ids = resolve_ingredients([(name, 1) for name in ('Eggs', 'Flour', 'Milk', 'Sugar', 'Butter')])
+        eggs, flour, milk, sugar, butter = ids
+        db.session.commit()
+        fields = {'description': 'Test description', 'preparation_time': 5, 'cooking_time': 5, 'servings': 2}
+        pancakes = save_recipe(None, self.user.id, dict(fields, title='Pancakes'), [],
+                               {eggs: 2, flour: 1, milk: 1}).recipe_id
+        cake = save_recipe(None, self.user.id, dict(fields, title='Cake'), [],
+                           {eggs: 3, flour: 2, sugar: 1, butter: 1}).recipe_id
+        omelette = save_recipe(None, self.user.id, dict(fields, title='Omelette'), [], {eggs: 3}).recipe_id
+        
+        total, matches = pantry_index.search([eggs, flour, milk])
+        self.assertEqual(total, 2)
+        self.assertEqual([(m.recipe_id, m.matched, m.missing) for m in matches],
+                         [(pancakes, 3, 0), (omelette, 1, 0)])
+        total, matches = pantry_index.search([eggs, flour, milk], max_missing=2)
+        self.assertEqual([m.recipe_id for m in matches], [pancakes, omelette, cake])
+        total, matches = pantry_index.search([eggs, flour], max_missing=2, require_all=True)
+        self.assertEqual([m.recipe_id for m in matches], [pancakes, cake])
+        
+        # Once the indexes are loaded, matching runs no SQL; only the cards are queried
+        self.app.get('/recipes/cook?have=eggs')
+        for name in ('INGREDIENT_INDEX_CHECK_INTERVAL', 'PANTRY_INDEX_CHECK_INTERVAL'):
+            app.config[name] = 60
+            self.addCleanup(app.config.__setitem__, name, getattr(TestConfig, name))
+        with assert_max_queries(1):
+            response = self.app.get('/recipes/cook?have=eggs,%20FLOUR,%20milk,%20flr&missing=2')
+        app.config['INGREDIENT_INDEX_CHECK_INTERVAL'] = app.config['PANTRY_INDEX_CHECK_INTERVAL'] = 0
+        html = response.get_data(as_text=True)
+        self.assertIn('3 recipes using Eggs, Flour, Milk', html)
+        self.assertIn('Also needs: Butter, Sugar', html)
+        self.assertIn('We don\'t know "flr"', html)
+        
+        # Edits are merged into the index without a rebuild
+        save_recipe(cake, self.user.id, dict(fields, title='Cake'), [], {eggs: 3, flour: 2, milk: 1})
+        with count_queries() as counter:
+            total, matches = pantry_index.search([eggs, flour, milk])
+        self.assertEqual([m.recipe_id for m in matches], [cake, pancakes, omelette])
+        self.assertIn('recipe.updated_at >= ?', counter.statements[-1])
+        
+        self.login()
+        self.app.post(f'/recipes/{omelette}/delete')
+        self.assertEqual(pantry_index.search([eggs], max_missing=3)[0], 2)
+        
+    def test_similar_recipes_refresh(self):
+        """Test precomputing neighbors, refreshing them incrementally and showing them."""
+        rice, beans, salt, saffron = resolve_ingredients([(name, 1) for name in ('Rice', 'Beans', 'Salt', 'Saffron')])
+        fields = {'description': 'Test description', 'preparation_time': 5, 'cooking_time': 5, 'servings': 2}
+        create = lambda title, ingredients, categories=(): save_recipe(
+            None, self.user.id, dict(fields, title=title), categories, dict.fromkeys(ingredients, 1)).recipe_id
+        paella = create('Paella', [rice, saffron, salt], [self.category.id])
+        risotto = create('Risotto', [rice, saffron], [self.category.id])
+        rice_and_beans = create('Rice and Beans', [rice, beans, salt])
+        chili = create('Chili', [beans, salt])
+        stored = lambda: {recipe_id: [row.similar_id for row in SimilarRecipe.query.filter_by(recipe_id=recipe_id)
+                                      .order_by(SimilarRecipe.rank)]
+                          for recipe_id in (paella, risotto, rice_and_beans, chili)}
+        
+        result = refresh_similar_recipes(neighbors=2, batch_size=2)
+        self.assertTrue(result.full)
+        full = stored()
+        self.assertEqual(full[paella], [risotto, rice_and_beans])
+        self.assertEqual(full[chili], [rice_and_beans, paella])
+        
+        response = self.app.get(f'/recipes/{paella}')
+        self.assertIn('Similar Recipes', response.get_data(as_text=True))
+        
+        # Chili picks up saffron: only the recipes it can affect are recomputed
+        save_recipe(chili, self.user.id, dict(fields, title='Chili'), [], dict.fromkeys([beans, saffron], 1))
+        result = refresh_similar_recipes(neighbors=2, batch_size=2)
+        self.assertFalse(result.full)
+        self.assertLess(result.recomputed, result.recipes)
+        incremental = stored()
+        refresh_similar_recipes(neighbors=2, full=True)
+        self.assertEqual(incremental, stored())
+        
+    def test_similar_recipes_refresh_after_delete(self):
+        """Test that an incremental refresh repairs the lists that held a deleted recipe."""
+        rice, beans, salt, saffron = resolve_ingredients([(name, 1) for name in ('Rice', 'Beans', 'Salt', 'Saffron')])
+        fields = {'description': 'Test description', 'preparation_time': 5, 'cooking_time': 5, 'servings': 2}
+        create = lambda title, ingredients: save_recipe(
+            None, self.user.id, dict(fields, title=title), [], dict.fromkeys(ingredients, 1)).recipe_id
+        paella = create('Paella', [rice, saffron, salt])
+        risotto = create('Risotto', [rice, saffron])
+        rice_and_beans = create('Rice and Beans', [rice, beans, salt])
+        chili = create('Chili', [beans, salt])
+        neighbors = lambda: [row.similar_id for row in SimilarRecipe.query.filter_by(recipe_id=paella)
+                             .order_by(SimilarRecipe.rank)]
+        refresh_similar_recipes(neighbors=2)
+        self.assertEqual(neighbors(), [risotto, rice_and_beans])
+        
+        # Enforce foreign keys like PostgreSQL does, so any cascade on the neighbor rows would fire
+        db.session.commit()
+        db.session.execute(db.text('PRAGMA foreign_keys = ON'))
+        try:
+            db.session.delete(db.session.get(Recipe, risotto))
+            db.session.commit()
+        finally:
+            db.session.execute(db.text('PRAGMA foreign_keys = OFF'))
+        
+        result = refresh_similar_recipes(neighbors=2)
+        self.assertFalse(result.full)
+        self.assertEqual(neighbors(), [rice_and_beans, chili])
+        
+    def test_similar_recipes_refresh_ignores_activity(self):
+        """Test that comments, ratings and favorites do not make a recipe's neighbors stale."""
+        rice, beans, salt = resolve_ingredients([(name, 1) for name in ('Rice', 'Beans', 'Salt')])
+        fields = {'description': 'Test description', 'preparation_time': 5, 'cooking_time': 5, 'servings': 2}
+        create = lambda title, ingredients: save_recipe(
+            None, self.user.id, dict(fields, title=title), [], dict.fromkeys(ingredients, 1)).recipe_id
+        paella = create('Paella', [rice, salt])
+        chili = create('Chili', [beans, salt])
+        refresh_similar_recipes(neighbors=2)
+        
+        adjust_recipe_counters(paella, comment_count=1, rating_sum=5, rating_count=1)
+        adjust_recipe_counters(chili, favorite_count=1)
+        db.session.commit()
+        self.assertEqual(refresh_similar_recipes(neighbors=2).recomputed, 0)
+        
+        save_recipe(chili, self.user.id, dict(fields, title='Chili'), [], dict.fromkeys([beans, rice], 1))
+        self.assertGreater(refresh_similar_recipes(neighbors=2).recomputed, 0)
+        
+    def test_uploaded_image_variants(self):
+        """Test that uploads are resized off the request thread and served with srcset and immutable caching."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(app.config.__setitem__, 'IMAGE_STORAGE_DIR', app.config['IMAGE_STORAGE_DIR'])
+        app.config['IMAGE_STORAGE_DIR'] = directory.name
+        self.login()
+        
+        upload = io.BytesIO()
+        Image.new('RGBA', (800, 600), (200, 80, 40, 255)).save(upload, 'PNG')
+        form = {'title': 'Tomato Soup', 'description': 'Smooth and bright', 'preparation_time': 5,
+                'cooking_time': 20, 'servings': 4, 'ingredients-0-name': 'Tomato', 'ingredients-0-quantity': 6}
+        response = self.app.post('/recipes/new', data=dict(form, image=(io.BytesIO(b'not an image'), 'soup.png')),
+                                 content_type='multipart/form-data')
+        self.assertIn('The file is not an image.', response.get_data(as_text=True))
+        self.assertIsNone(Recipe.query.filter_by(title='Tomato Soup').first())
+        
+        self.app.post('/recipes/new', data=dict(form, image=(io.BytesIO(upload.getvalue()), 'soup.png')),
+                      content_type='multipart/form-data')
+        recipe = Recipe.query.filter_by(title='Tomato Soup').one()
+        self.assertEqual((recipe.image.status, recipe.image.width, recipe.image.height), ('pending', 800, 600))
+        # Nothing was resized while handling the request
+        self.assertFalse(os.path.exists(image_pipeline.path('variants')))
+        self.assertNotIn('srcset', self.app.get(f'/recipes/{recipe.id}').get_data(as_text=True))
+        
+        self.assertEqual(image_pipeline.process_pending(), (1, 0))
+        db.session.refresh(recipe.image)
+        # Widths above the original's collapse into the original width
+        self.assertEqual([(width, height) for width, height, _ in recipe.image.variants_in('webp')],
+                         [(320, 240), (640, 480), (800, 600)])
+        page = self.app.get(f'/recipes/{recipe.id}').get_data(as_text=True)
+        self.assertIn('type="image/webp"', page)
+        self.assertIn(' 640w', page)
+        
+        filename = recipe.image.variants_in('jpeg')[0][2]
+        response = self.app.get(f'/media/{filename}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/jpeg')
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 3600)
+        self.assertTrue(response.cache_control.immutable)
+        response.close()
+        self.assertEqual(self.app.get('/media/missing.webp').status_code, 404)
+        
+        # The same file uploaded again reuses the stored image
+        self.assertEqual(image_pipeline.store(io.BytesIO(upload.getvalue())).id, recipe.image_id)
+        
+    def test_fingerprinted_assets(self):
+        """Test building hashed, precompressed assets and serving them by Accept-Encoding."""
+        self.assertEqual(minify_css('a > b {\n  color: red; /* note */\n  content: "a ; b";\n}\n'),
+                         'a>b{color:red;content:"a ; b"}')
+        self.assertEqual(minify_js('var a = 1 // one\nvar re = /\\/\\*/g;\nif (a) {\n    b(- -a)\n}\n'),
+                         'var a=1\nvar re=/\\/\\*/g;if(a){b(- -a)}\n')
+        
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(app.config.__setitem__, 'ASSETS_DIR', app.config['ASSETS_DIR'])
+        self.assertIn('/static/css/style.css', self.app.get('/').get_data(as_text=True))
+        
+        manifest = build_assets(app.static_folder, directory.name)
+        app.config['ASSETS_DIR'] = directory.name
+        hashed = manifest['css/style.css']
+        self.assertRegex(hashed, r'^css/style\.[0-9a-f]{12}\.css$')
+        self.assertIn('js/script.js', manifest)
+        self.assertIn(f'/assets/{hashed}', self.app.get('/').get_data(as_text=True))
+        
+        with open(os.path.join(directory.name, hashed), 'rb') as handle:
+            minified = handle.read()
+        for accept, encoding in (('gzip, deflate, br', 'br'), ('gzip', 'gzip'), ('identity', None)):
+            response = self.app.get(f'/assets/{hashed}', headers={'Accept-Encoding': accept})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content_encoding, encoding)
+            self.assertEqual(response.mimetype, 'text/css')
+            self.assertTrue(response.cache_control.immutable)
+            self.assertEqual(response.cache_control.max_age, 365 * 24 * 3600)
+            self.assertIn('Accept-Encoding', response.vary)
+            body = response.get_data()
+            response.close()
+            if encoding == 'gzip':
+                body = gzip.decompress(body)
+            elif encoding == 'br':
+                body = brotli.decompress(body)
+            self.assertEqual(body, minified)
+        self.assertEqual(self.app.get('/assets/manifest.json').status_code, 404)
@@ -7,7 +7,9 @@ from app.extensions import db
 # Association table for Recipe and Category (many-to-many)
 recipe_categories = db.Table('recipe_categories',
     db.Column('recipe_id', db.Integer, db.ForeignKey('recipe.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True),
+    # The primary key covers lookups by recipe; category filters need their own index
+    db.Index('ix_recipe_categories_category_id', 'category_id')
 )
 
 class User(db.Model, UserMixin):
@@ -20,6 +22,9 @@ class User(db.Model, UserMixin):
         email (str): Unique email address for the user
         password (str): Hashed password for authentication
         profile_picture (str): URL to the user's profile picture
+        picture_id (int): Foreign key to an uploaded profile picture, shown
+            instead of profile_picture once its variants are ready
+        picture (relationship): Many-to-one relationship with UploadedImage model
         created_at (datetime): Timestamp when the user account was created
         recipes (relationship): One-to-many relationship with Recipe model
         comments (relationship): One-to-many relationship with Comment model
@@ -32,8 +37,10 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     profile_picture = db.Column(db.String(200))
+    picture_id = db.Column(db.Integer, db.ForeignKey('uploaded_image.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    picture = db.relationship('UploadedImage')
     recipes = db.relationship('Recipe', back_populates='user', cascade='all, delete-orphan')
     comments = db.relationship('Comment', back_populates='user', cascade='all, delete-orphan')
     favorites = db.relationship('Favorite', back_populates='user', cascade='all, delete-orphan')
@@ -54,9 +61,22 @@ class Recipe(db.Model):
         cooking_time (int): Time required for cooking in minutes
         servings (int): Number of servings the recipe yields
         image_url (str): URL to the recipe image
+        image_id (int): Foreign key to an uploaded image, shown instead of
+            image_url once its variants are ready
         created_at (datetime): Timestamp when the recipe was created
+        updated_at (datetime): Timestamp of the last change to the recipe, its
+            categories or its cached counters (drives API ETags)
+        content_updated_at (datetime): Timestamp of the last edit to the recipe's
+            fields, categories or ingredients; counter updates leave it alone
+            (drives the incremental similar-recipes refresh)
         user_id (int): Foreign key to the User who created the recipe
+        rating_sum (int): Cached sum of all rating values for the recipe
+        rating_count (int): Cached number of ratings for the recipe
+        comment_count (int): Cached number of comments on the recipe
+        favorite_count (int): Cached number of users who favorited the recipe
+        trending_score (float): Time-decayed activity score, maintained by app.trending
         user (relationship): Many-to-one relationship with User model
+        image (relationship): Many-to-one relationship with UploadedImage model
         recipe_ingredients (relationship): One-to-many relationship with RecipeIngredient model
         comments (relationship): One-to-many relationship with Comment model
         favorites (relationship): One-to-many relationship with Favorite model
@@ -71,10 +91,21 @@ class Recipe(db.Model):
     cooking_time = db.Column(db.Integer, nullable=False)  # in minutes
     servings = db.Column(db.Integer, nullable=False)
     image_url = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    image_id = db.Column(db.Integer, db.ForeignKey('uploaded_image.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    content_updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Denormalized aggregates, maintained by app.counters
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    trending_score = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    
     user = db.relationship('User', back_populates='recipes')
+    image = db.relationship('UploadedImage')
     recipe_ingredients = db.relationship('RecipeIngredient', 
                                         back_populates='recipe',
                                         cascade='all, delete-orphan')
@@ -87,15 +118,26 @@ class Recipe(db.Model):
     categories = db.relationship('Category', secondary=recipe_categories, 
                                 back_populates='recipes')
     
+    # Serve the newest-first listing (and its keyset pagination), each user's recipes,
+    # the pantry index's reads of recently changed recipes, the similar-recipes refresh's
+    # reads of recently edited ones and the trending section
+    __table_args__ = (
+        db.Index('ix_recipe_created_at_id', 'created_at', 'id'),
+        db.Index('ix_recipe_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_recipe_updated_at', 'updated_at'),
+        db.Index('ix_recipe_content_updated_at', 'content_updated_at'),
+        db.Index('ix_recipe_trending_score', 'trending_score'),
+    )
+    
     def __repr__(self):
         return f'<Recipe {self.title}>'
     
     @property
     def average_rating(self):
-        """Calculate the average rating for this recipe."""
-        if not self.ratings:
+        """Calculate the average rating for this recipe from the cached counters."""
+        if not self.rating_count:
             return 0
-        return sum(rating.value for rating in self.ratings) / len(self.ratings)
+        return self.rating_sum / self.rating_count
 
 class Ingredient(db.Model):
     """
@@ -141,6 +183,12 @@ class RecipeIngredient(db.Model):
     recipe = db.relationship('Recipe', back_populates='recipe_ingredients')
     ingredient = db.relationship('Ingredient', back_populates='recipe_ingredients')
     
+    # Load a recipe's ingredients, and find the recipes using an ingredient
+    __table_args__ = (
+        db.Index('ix_recipe_ingredient_recipe_id', 'recipe_id'),
+        db.Index('ix_recipe_ingredient_ingredient_id', 'ingredient_id'),
+    )
+    
     def __repr__(self):
         return f'<RecipeIngredient {self.recipe_id}:{self.ingredient_id}>'
 
@@ -181,13 +229,19 @@ class Comment(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     recipe = db.relationship('Recipe', back_populates='comments')
     user = db.relationship('User', back_populates='comments')
     
+    # Serve the newest-first comment pages on the recipe detail page and per-user counts
+    __table_args__ = (
+        db.Index('ix_comment_recipe_id_created_at', 'recipe_id', 'created_at'),
+        db.Index('ix_comment_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Comment {self.id}>'
 
@@ -199,6 +253,8 @@ class Favorite(db.Model):
         id (int): Primary key for the favorite entry
         user_id (int): Foreign key to the User who favorited
         recipe_id (int): Foreign key to the Recipe that was favorited
+        created_at (datetime): Timestamp when the recipe was favorited (unknown
+            for favorites made before it was recorded)
         user (relationship): Many-to-one relationship with User model
         recipe (relationship): Many-to-one relationship with Recipe model
     
@@ -209,12 +265,16 @@ class Favorite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     user = db.relationship('User', back_populates='favorites')
     recipe = db.relationship('Recipe', back_populates='favorites')
     
-    # Ensure a user can only favorite a recipe once
-    __table_args__ = (db.UniqueConstraint('user_id', 'recipe_id'),)
+    # Ensure a user can only favorite a recipe once; the index serves per-recipe counts
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recipe_id'),
+        db.Index('ix_favorite_recipe_id', 'recipe_id'),
+    )
     
     def __repr__(self):
         return f'<Favorite {self.user_id}:{self.recipe_id}>'
@@ -245,8 +305,117 @@ class Rating(db.Model):
     recipe = db.relationship('Recipe', back_populates='ratings')
     user = db.relationship('User', back_populates='ratings')
     
-    # Ensure a user can only rate a recipe once
-    __table_args__ = (db.UniqueConstraint('user_id', 'recipe_id'),)
+    # Ensure a user can only rate a recipe once; the indexes serve per-recipe totals,
+    # the dashboard's "recently rated" list and time-windowed queries
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recipe_id'),
+        db.Index('ix_rating_recipe_id', 'recipe_id'),
+        db.Index('ix_rating_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_rating_created_at', 'created_at'),
+    )
     
     def __repr__(self):
-        return f'<Rating {self.user_id}:{self.recipe_id}:{self.value}>'
\ No newline at end of file
+        return f'<Rating {self.user_id}:{self.recipe_id}:{self.value}>'
+
+class SimilarRecipe(db.Model):
+    """
+    Precomputed nearest neighbors of a recipe, by shared ingredients and categories.
+    
+    Rows are written by the ``similar-recipes`` command (see app.similarity),
+    never by requests, so the recipe page reads its panel with one lookup.
+    
+    Attributes:
+        recipe_id (int): Recipe the neighbors belong to
+        rank (int): Position of the neighbor, starting at 1 for the most similar
+        similar_id (int): The neighboring recipe
+        score (float): Cosine similarity of the two recipes
+        computed_at (datetime): Start of the run that computed the row
+    """
+    
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    # Deliberately not a foreign key: a row left pointing at a deleted recipe is how the next
+    # incremental refresh finds the lists to recompute (the recipe page joins it away meanwhile)
+    similar_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<SimilarRecipe {self.recipe_id}:{self.rank}:{self.similar_id}>'
+
+class UploadedImage(db.Model):
+    """
+    An image uploaded by a user, and the resized variants derived from it.
+    
+    The original is stored on disk under its SHA-256 digest, so uploading the
+    same file twice reuses the row. Variants are rendered by the worker
+    processes of app.images, never by requests.
+    
+    Attributes:
+        id (int): Primary key for the image
+        digest (str): SHA-256 of the original file (unique)
+        format (str): Pillow format name of the original, e.g. 'JPEG'
+        width (int): Width of the original in pixels
+        height (int): Height of the original in pixels
+        status (str): 'pending' until the variants are written, then 'ready' or 'failed'
+        variants (list): [format, width, height, filename] per variant, smallest first
+        error (str): Why rendering failed, for failed images
+        created_at (datetime): Timestamp when the image was uploaded
+        processed_at (datetime): Timestamp when the variants were written
+    """
+    
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(64), nullable=False, unique=True)
+    format = db.Column(db.String(10), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default=PENDING, server_default=PENDING)
+    variants = db.Column(db.JSON)
+    error = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    # Lets the process-images command find the images still waiting for variants
+    __table_args__ = (
+        db.Index('ix_uploaded_image_status', 'status'),
+    )
+    
+    def __repr__(self):
+        return f'<UploadedImage {self.id}:{self.status}>'
+    
+    @property
+    def ready(self):
+        """Whether the variants have been written."""
+        return self.status == self.READY and bool(self.variants)
+    
+    def variants_in(self, format):
+        """Return the (width, height, filename) of the variants in one format, smallest first."""
+        return [(width, height, filename) for name, width, height, filename in self.variants or ()
+                if name == format]
+
+class CacheVersion(db.Model):
+    """
+    Version tokens for data cached in memory by every worker process.
+    
+    Writers store a new random token under a cache's name; workers compare it
+    with the token they loaded to decide whether their copy is stale. The
+    ``trending_epoch`` row instead holds the reference time of the stored
+    trending scores (see app.trending).
+    
+    Attributes:
+        name (str): Name of the cached data set (primary key)
+        version (str): Token that changes on every write to the data set
+    """
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.String(32), nullable=False)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.name}:{self.version}>'
+
+# Register the full-text search DDL and the catalog version hooks with these tables
+from app import search, catalog  # noqa: E402,F401
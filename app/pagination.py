@@ -0,0 +1,146 @@
+"""Keyset (cursor) pagination for listings ordered newest first."""
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import text, tuple_
+from app.extensions import db
+from app.models import Recipe
+
+
+def encode_cursor(row):
+    """
+    Build an opaque cursor token pointing at a row's position in a listing.
+
+    Args:
+        row: Model instance (with ``created_at`` and ``id``) the cursor points at
+
+    Returns:
+        URL-safe token string
+    """
+    payload = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a token produced by encode_cursor().
+
+    Args:
+        token: Cursor token from the query string
+
+    Returns:
+        (created_at, id) tuple, or None if the token is missing or malformed
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def estimate_count(query):
+    """
+    Estimate the number of rows a query returns without counting them.
+
+    Uses the PostgreSQL planner's row estimate, so it costs one EXPLAIN
+    instead of a full COUNT(*). Other databases return None.
+
+    Args:
+        query: Query to estimate
+
+    Returns:
+        Estimated row count, or None if no estimate is available
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    statement = query.order_by(None).statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = db.session.execute(text(f'EXPLAIN (FORMAT JSON) {statement}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPage:
+    """
+    One page of a listing fetched with keyset pagination.
+
+    Rows are ordered by ``(created_at, id)`` descending. Instead of page
+    numbers the page exposes ``next_cursor`` / ``prev_cursor`` tokens, so
+    every page costs the same indexed range scan however deep it is.
+
+    Attributes:
+        items (list): Rows on this page
+        per_page (int): Maximum number of rows per page
+        has_next (bool): Whether older rows follow this page
+        has_prev (bool): Whether newer rows precede this page
+        next_cursor (str): Token for the following page, or None
+        prev_cursor (str): Token for the preceding page, or None
+        total (int): Exact or estimated total, or None when not requested
+        total_is_estimate (bool): Whether total is a planner estimate
+    """
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, has_next, has_prev, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor(items[-1]) if has_next and items else None
+        self.prev_cursor = encode_cursor(items[0]) if has_prev and items else None
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+
+def keyset_paginate(query, per_page, after=None, before=None, total='none', model=Recipe):
+    """
+    Fetch one page of rows newest first, starting from a cursor.
+
+    Args:
+        query: Filtered query (without ordering)
+        per_page: Number of rows per page
+        after: Cursor token; return the rows that follow it
+        before: Cursor token; return the rows that precede it
+        total: 'none' to skip counting, 'estimate' for a planner estimate
+            or 'exact' for a full COUNT(*)
+        model: Model whose ``(created_at, id)`` columns order the listing
+
+    Returns:
+        KeysetPage instance
+    """
+    key = tuple_(model.created_at, model.id)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    if before_key is not None:
+        # Walk backwards from the cursor, then restore newest-first order
+        rows = (query.filter(key > before_key)
+                .order_by(model.created_at.asc(), model.id.asc())
+                .limit(per_page + 1).all())
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        page_query = query
+        if after_key is not None:
+            page_query = page_query.filter(key < after_key)
+        rows = (page_query.order_by(model.created_at.desc(), model.id.desc())
+                .limit(per_page + 1).all())
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_key is not None
+
+    count = None
+    if total == 'exact':
+        count = query.order_by(None).count()
+    elif total == 'estimate':
+        count = estimate_count(query)
+
+    return KeysetPage(items, per_page, has_next, has_prev,
+                      total=count, total_is_estimate=(total == 'estimate'))
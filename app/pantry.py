@@ -0,0 +1,204 @@
+"""
+"Cook with what I have": an in-memory inverted index from ingredients to recipes.
+
+Each worker keeps, for every ingredient, a sorted ``array('I')`` of the ids of
+the recipes that use it (4 bytes per entry), plus each recipe's ingredient
+ids. Finding the recipes that can be made from a set of ingredients, or that
+miss at most ``k`` of theirs, then counts matches over a handful of posting
+lists instead of self-joining ``recipe_ingredient`` or grouping the whole
+table.
+
+Writers that change which ingredients a recipe uses bump INDEX_NAME in the
+``cache_version`` table. Workers then reload only the recipes whose
+``updated_at`` moved past what they have seen; deleting a recipe bumps
+REBUILD_NAME, which reloads everything.
+"""
+import threading
+import time
+from array import array
+from collections import Counter, namedtuple
+from datetime import timedelta
+from heapq import nsmallest
+from itertools import chain
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Recipe, RecipeIngredient, CacheVersion
+from app.catalog import bump_version
+
+INDEX_NAME = 'recipe_ingredients'
+REBUILD_NAME = 'recipe_ingredients:rebuild'
+
+# Recipes updated this close to the newest change seen are reloaded again,
+# covering late commits and clock differences between app servers
+UPDATE_SLACK = timedelta(minutes=5)
+
+PantryMatch = namedtuple('PantryMatch', ['recipe_id', 'matched', 'missing'])
+
+
+@event.listens_for(Session, 'after_flush')
+def _recipe_ingredients_flushed(session, flush_context):
+    """Mark every worker's index stale when the ORM writes recipe ingredients."""
+    if any(isinstance(obj, Recipe) for obj in session.deleted):
+        bump_version(session.connection(), REBUILD_NAME)
+    elif any(isinstance(obj, RecipeIngredient) for obj in chain(session.new, session.deleted)):
+        bump_version(session.connection(), INDEX_NAME)
+
+
+class _PantryState:
+    """Loaded index for one application."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = None
+        self.checked_at = None
+        self.loaded_until = None
+        # (postings, recipes): replaced as one value, never mutated, so lookups need no lock
+        self.data = ({}, {})
+
+
+class PantryIndex:
+    """Flask extension answering ingredient-based recipe searches from memory."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create an empty index for an application; it loads on first use."""
+        app.extensions['pantry_index'] = _PantryState()
+
+    def _state(self):
+        state = current_app.extensions.get('pantry_index')
+        if state is None:
+            state = current_app.extensions.setdefault('pantry_index', _PantryState())
+        interval = current_app.config.get('PANTRY_INDEX_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        if state.checked_at is not None and now - state.checked_at < interval:
+            return state
+
+        with state.lock:
+            versions = dict(db.session.execute(
+                select(CacheVersion.name, CacheVersion.version)
+                .where(CacheVersion.name.in_([INDEX_NAME, REBUILD_NAME]))
+            ).all())
+            if state.checked_at is None or versions.get(REBUILD_NAME) != state.versions.get(REBUILD_NAME):
+                self._load(state)
+            elif versions.get(INDEX_NAME) != state.versions.get(INDEX_NAME):
+                self._refresh(state)
+            state.versions = versions
+            state.checked_at = now
+        return state
+
+    @staticmethod
+    def _read(since=None):
+        """Return {recipe id: frozenset of ingredient ids} and the newest updated_at read."""
+        query = (select(Recipe.id, Recipe.updated_at, RecipeIngredient.ingredient_id)
+                 .outerjoin(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id))
+        if since is not None:
+            query = query.where(Recipe.updated_at >= since)
+        recipes = {}
+        newest = None
+        for recipe_id, updated_at, ingredient_id in db.session.execute(query):
+            ingredients = recipes.setdefault(recipe_id, set())
+            if ingredient_id is not None:
+                ingredients.add(ingredient_id)
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+        return {recipe_id: frozenset(ids) for recipe_id, ids in recipes.items()}, newest
+
+    def _load(self, state):
+        recipes, newest = self._read()
+        postings = {}
+        for recipe_id in sorted(recipes):
+            for ingredient_id in recipes[recipe_id]:
+                postings.setdefault(ingredient_id, []).append(recipe_id)
+        state.data = ({ingredient_id: array('I', ids) for ingredient_id, ids in postings.items()},
+                      {recipe_id: ids for recipe_id, ids in recipes.items() if ids})
+        state.loaded_until = newest
+
+    def _refresh(self, state):
+        """Re-read the recipes changed since the last load and patch their posting lists."""
+        since = state.loaded_until - UPDATE_SLACK if state.loaded_until else None
+        changed, newest = self._read(since)
+        added, removed = {}, {}
+        postings, recipes = state.data
+        recipes = dict(recipes)
+        for recipe_id, ingredients in changed.items():
+            previous = recipes.get(recipe_id, frozenset())
+            for ingredient_id in ingredients - previous:
+                added.setdefault(ingredient_id, set()).add(recipe_id)
+            for ingredient_id in previous - ingredients:
+                removed.setdefault(ingredient_id, set()).add(recipe_id)
+            if ingredients:
+                recipes[recipe_id] = ingredients
+            else:
+                recipes.pop(recipe_id, None)
+
+        postings = dict(postings)
+        for ingredient_id in added.keys() | removed.keys():
+            ids = set(postings.get(ingredient_id, ()))
+            ids -= removed.get(ingredient_id, set())
+            ids |= added.get(ingredient_id, set())
+            if ids:
+                postings[ingredient_id] = array('I', sorted(ids))
+            else:
+                postings.pop(ingredient_id, None)
+        state.data = (postings, recipes)
+        if newest is not None and (state.loaded_until is None or newest > state.loaded_until):
+            state.loaded_until = newest
+
+    def search(self, ingredient_ids, max_missing=0, require_all=False, limit=None, offset=0):
+        """
+        Rank the recipes that can be made from the given ingredients.
+
+        A recipe matches when it uses at least one of the ingredients (all of
+        them with ``require_all``) and needs at most ``max_missing`` others.
+        Results are ordered by fewest missing, then most matched, then newest.
+
+        Args:
+            ingredient_ids: Ingredients the cook has
+            max_missing: How many other ingredients a recipe may need
+            require_all: Only return recipes that use every given ingredient
+            limit: Maximum number of matches to return (all when None)
+            offset: Number of ranked matches to skip
+
+        Returns:
+            (total number of matching recipes, list of PantryMatch)
+        """
+        state = self._state()
+        postings, recipes = state.data
+        wanted = set(ingredient_ids)
+        if not wanted:
+            return 0, []
+
+        if require_all:
+            lists = sorted((postings.get(ingredient_id, ()) for ingredient_id in wanted), key=len)
+            candidates = set(lists[0])
+            for ids in lists[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(ids)
+            counts = dict.fromkeys(candidates, len(wanted))
+        else:
+            counts = Counter()
+            for ingredient_id in wanted:
+                counts.update(postings.get(ingredient_id, ()))
+
+        matches = [PantryMatch(recipe_id, matched, len(recipes[recipe_id]) - matched)
+                   for recipe_id, matched in counts.items()
+                   if len(recipes[recipe_id]) - matched <= max_missing]
+        rank = lambda match: (match.missing, -match.matched, -match.recipe_id)
+        if limit is None:
+            ranked = sorted(matches, key=rank)[offset:]
+        else:
+            ranked = nsmallest(offset + limit, matches, key=rank)[offset:]
+        return len(matches), ranked
+
+    def ingredients_of(self, recipe_id):
+        """Return the ingredient ids a recipe uses, as a frozenset."""
+        return self._state().data[1].get(recipe_id, frozenset())
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,127 @@
+"""
+Password hashing on a bounded worker pool.
+
+bcrypt is deliberately slow. Running it on a small thread pool (the bcrypt
+library releases the GIL while hashing) caps how many CPU cores hashing can
+take at once, and the queue-depth limit turns a login storm into fast
+"try again" responses instead of a backlog that stalls every page.
+
+Every request waiting on a hash holds one of the server's WEB_THREADS, so
+the number of operations admitted at once is also capped at one less than
+that: however many logins arrive, a thread is left to serve other pages.
+
+The work factor comes from BCRYPT_LOG_ROUNDS. Hashes made with a different
+cost are upgraded the next time their owner logs in successfully.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.extensions import bcrypt
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full and the request should be retried later."""
+
+
+class _PoolState:
+    """Executor and queue slots for one application in one process."""
+
+    def __init__(self, workers, slots):
+        self.pid = os.getpid()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.slots = threading.BoundedSemaphore(slots)
+
+
+def hashing_slots(config):
+    """
+    Return how many password operations may run or wait at once.
+
+    Args:
+        config: Application config with PASSWORD_HASH_WORKERS,
+            PASSWORD_HASH_QUEUE_DEPTH and WEB_THREADS
+
+    Returns:
+        Workers plus queue depth, capped so one request thread always stays free
+    """
+    wanted = config.get('PASSWORD_HASH_WORKERS', 2) + config.get('PASSWORD_HASH_QUEUE_DEPTH', 1)
+    # A single-threaded server cannot keep a thread free; it still hashes one at a time
+    return max(1, min(wanted, config.get('WEB_THREADS', 4) - 1))
+
+
+class PasswordHasher:
+    """Flask extension that runs bcrypt on a bounded thread pool."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the extension; the pool itself starts on first use in each worker."""
+        app.extensions['password_hasher'] = None
+
+    def _pool(self):
+        """Return this process's pool, creating it after start-up or a fork."""
+        state = current_app.extensions.get('password_hasher')
+        if state is None or state.pid != os.getpid():
+            with self._lock:
+                state = current_app.extensions.get('password_hasher')
+                if state is None or state.pid != os.getpid():
+                    state = _PoolState(current_app.config.get('PASSWORD_HASH_WORKERS', 2),
+                                       hashing_slots(current_app.config))
+                    current_app.extensions['password_hasher'] = state
+        return state
+
+    def _run(self, function, *args):
+        state = self._pool()
+        if not state.slots.acquire(blocking=False):
+            raise HashingBusy('Too many password operations are queued')
+        try:
+            future = state.executor.submit(function, *args)
+        except Exception:
+            state.slots.release()
+            raise
+        future.add_done_callback(lambda _: state.slots.release())
+        return future.result()
+
+    @staticmethod
+    def rounds():
+        """Return the configured bcrypt work factor."""
+        return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+    def hash(self, password):
+        """
+        Hash a password with the configured work factor.
+
+        Args:
+            password: Plain-text password
+
+        Returns:
+            bcrypt hash as a string
+
+        Raises:
+            HashingBusy: If the hashing queue is full
+        """
+        hashed = self._run(bcrypt.generate_password_hash, password, self.rounds())
+        return hashed.decode('utf-8')
+
+    def check(self, hashed, password):
+        """
+        Check a password against a stored hash.
+
+        Raises:
+            HashingBusy: If the hashing queue is full
+        """
+        return self._run(bcrypt.check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        """Return True if a hash was made with a different work factor than configured."""
+        try:
+            cost = int(hashed.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return True
+        return cost != self.rounds()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,124 @@
+"""
+Connection pool instrumentation.
+
+InstrumentedQueuePool is a drop-in QueuePool that times every checkout,
+so we can see how long requests wait for a connection and how often the
+pool runs into overflow or timeouts. The numbers are per process (one
+gunicorn worker) and are served as JSON from /metrics/pool when
+POOL_METRICS_ENABLED is set.
+"""
+import os
+import threading
+import time
+from flask import jsonify
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """
+    Running totals for connection checkouts from one pool.
+
+    Attributes:
+        checkouts (int): Connections handed out
+        timeouts (int): Checkouts that gave up after pool_timeout
+        slow_checkouts (int): Checkouts that waited longer than slow_threshold
+        total_wait (float): Seconds spent waiting for connections in total
+        max_wait (float): Longest single wait in seconds
+    """
+
+    def __init__(self, slow_threshold=0.1):
+        self.slow_threshold = slow_threshold
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, timed_out=False):
+        """Add one checkout attempt that took ``elapsed`` seconds."""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+            if elapsed > self.slow_threshold:
+                self.slow_checkouts += 1
+
+    def as_dict(self):
+        """Return the totals, plus the mean wait, as a plain dict."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'total_wait_ms': round(self.total_wait * 1000, 3),
+                'mean_wait_ms': round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+
+def pool_metrics(engine):
+    """
+    Describe an engine's pool as it is right now in this process.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        dict with the pool's size, checked-out connections, overflow and,
+        for an InstrumentedQueuePool, the checkout timings
+    """
+    pool = engine.pool
+    metrics = {'pid': os.getpid(), 'pool': type(pool).__name__, 'status': pool.status()}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        metrics.update(stats.as_dict())
+    return metrics
+
+
+def init_app(app):
+    """Serve /metrics/pool when POOL_METRICS_ENABLED is set."""
+    if not app.config.get('POOL_METRICS_ENABLED'):
+        return
+
+    def metrics_view():
+        from app.extensions import db
+        return jsonify(pool_metrics(db.engine))
+
+    app.add_url_rule('/metrics/pool', 'pool_metrics', metrics_view)
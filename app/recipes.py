@@ -0,0 +1,189 @@
+"""
+Transactional recipe writes.
+
+save_recipe() takes the full desired state of a recipe (its fields, category
+ids and ingredient/quantity pairs), compares it with what is stored and
+applies only the difference, with one bulk statement per kind of change and
+a single commit. Unchanged categories and ingredients keep their rows, so
+saving a large recipe no longer rewrites its association tables.
+"""
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, update
+from app.extensions import db
+from app.models import Recipe, Ingredient, RecipeIngredient, recipe_categories
+from app.catalog import bump_version
+from app.ingredient_index import INDEX_NAME as INGREDIENT_INDEX_NAME
+from app.pantry import INDEX_NAME as PANTRY_INDEX_NAME
+
+# Recipe columns a form can change
+RECIPE_FIELDS = ('title', 'description', 'preparation_time', 'cooking_time', 'servings', 'image_url', 'image_id')
+
+RecipeChanges = namedtuple('RecipeChanges', [
+    'recipe_id', 'fields', 'category_ids', 'categories_added', 'categories_removed',
+    'ingredients_added', 'ingredients_updated', 'ingredients_removed',
+])
+RecipeChanges.__doc__ = """
+What save_recipe() changed.
+
+Attributes:
+    recipe_id (int): ID of the saved recipe
+    fields (tuple): Names of the recipe columns that changed
+    category_ids (frozenset): Category IDs the recipe is in after the save
+    categories_added (frozenset): Category IDs linked to the recipe
+    categories_removed (frozenset): Category IDs unlinked from the recipe
+    ingredients_added (frozenset): Ingredient IDs added to the recipe
+    ingredients_updated (frozenset): Ingredient IDs whose quantity changed
+    ingredients_removed (frozenset): Ingredient IDs removed from the recipe
+"""
+
+
+def ingredient_key(name):
+    """Return the key ingredient names are matched on: trimmed, single-spaced and lowercased."""
+    return ' '.join(name.split()).lower()
+
+
+def resolve_ingredients(pairs):
+    """
+    Map ingredient names to ids, creating the ones that do not exist yet.
+
+    Args:
+        pairs: (name, quantity) pairs; names are matched by ingredient_key(),
+            and a repeated name keeps its last quantity
+
+    Returns:
+        dict mapping ingredient ID to quantity, in input order
+    """
+    wanted = {}
+    for name, quantity in pairs:
+        key = ingredient_key(name)
+        if key:
+            wanted.pop(key, None)
+            wanted[key] = (' '.join(name.split()), quantity)
+    if not wanted:
+        return {}
+
+    table = Ingredient.__table__
+    existing = {ingredient_key(name): ingredient_id for ingredient_id, name in db.session.execute(
+        select(table.c.id, table.c.name).where(db.func.lower(table.c.name).in_(wanted))
+    )}
+    missing = [name for key, (name, _) in wanted.items() if key not in existing]
+    if missing:
+        created = db.session.execute(
+            insert(table).returning(table.c.id, table.c.name),
+            [{'name': name, 'measurement_unit': ''} for name in missing]
+        )
+        existing.update((ingredient_key(name), ingredient_id) for ingredient_id, name in created)
+        # Core inserts skip the mapper event that marks the autocomplete index stale
+        bump_version(db.session.connection(), INGREDIENT_INDEX_NAME)
+
+    return {existing[key]: quantity for key, (_, quantity) in wanted.items()}
+
+
+def save_recipe(recipe_id, user_id, fields, category_ids, ingredients):
+    """
+    Create or update a recipe so that it matches the given state.
+
+    Everything runs in one transaction: either the whole save is committed
+    or, on error, nothing is.
+
+    Args:
+        recipe_id: ID of the recipe to update, or None to create one
+        user_id: Owner of a new recipe (ignored for updates)
+        fields: dict of RECIPE_FIELDS values
+        category_ids: IDs of the categories the recipe should be in
+        ingredients: dict mapping ingredient ID to quantity, e.g. from
+            resolve_ingredients()
+
+    Returns:
+        RecipeChanges describing what was written
+    """
+    fields = {name: fields[name] for name in RECIPE_FIELDS if name in fields}
+    recipe_table = Recipe.__table__
+    ingredient_table = RecipeIngredient.__table__
+    is_new = recipe_id is None
+    try:
+        if is_new:
+            recipe_id = db.session.execute(
+                insert(recipe_table).values(user_id=user_id, **fields).returning(recipe_table.c.id)
+            ).scalar_one()
+            changed_fields = tuple(fields)
+            current_categories = set()
+            current_ingredients = {}
+        else:
+            row = db.session.execute(
+                select(recipe_table.c.id, *(recipe_table.c[name] for name in fields))
+                .where(recipe_table.c.id == recipe_id)
+            ).one()
+            changed_fields = tuple(name for name in fields if getattr(row, name) != fields[name])
+            current_categories = set(db.session.execute(
+                select(recipe_categories.c.category_id).where(recipe_categories.c.recipe_id == recipe_id)
+            ).scalars())
+            current_ingredients = {ingredient_id: (row_id, quantity)
+                                   for row_id, ingredient_id, quantity in db.session.execute(
+                select(ingredient_table.c.id, ingredient_table.c.ingredient_id, ingredient_table.c.quantity)
+                .where(ingredient_table.c.recipe_id == recipe_id)
+            )}
+
+        # Categories: insert the new links, delete the dropped ones
+        wanted_categories = set(category_ids)
+        categories_added = wanted_categories - current_categories
+        categories_removed = current_categories - wanted_categories
+        if categories_added:
+            db.session.execute(insert(recipe_categories), [
+                {'recipe_id': recipe_id, 'category_id': category_id} for category_id in categories_added
+            ])
+        if categories_removed:
+            db.session.execute(delete(recipe_categories).where(
+                recipe_categories.c.recipe_id == recipe_id,
+                recipe_categories.c.category_id.in_(categories_removed)
+            ))
+
+        # Ingredients: insert, update changed quantities, delete the rest
+        ingredients_added = ingredients.keys() - current_ingredients.keys()
+        ingredients_removed = current_ingredients.keys() - ingredients.keys()
+        ingredients_updated = {ingredient_id for ingredient_id in ingredients.keys() & current_ingredients.keys()
+                               if current_ingredients[ingredient_id][1] != ingredients[ingredient_id]}
+        if ingredients_added:
+            db.session.execute(insert(ingredient_table), [
+                {'recipe_id': recipe_id, 'ingredient_id': ingredient_id, 'quantity': ingredients[ingredient_id]}
+                for ingredient_id in ingredients if ingredient_id in ingredients_added
+            ])
+        if ingredients_updated:
+            db.session.connection().execute(
+                update(ingredient_table)
+                .where(ingredient_table.c.id == bindparam('row_id'))
+                .values(quantity=bindparam('new_quantity')),
+                [{'row_id': current_ingredients[ingredient_id][0], 'new_quantity': ingredients[ingredient_id]}
+                 for ingredient_id in ingredients_updated]
+            )
+        if ingredients_removed:
+            db.session.execute(delete(ingredient_table).where(
+                ingredient_table.c.id.in_([current_ingredients[ingredient_id][0]
+                                           for ingredient_id in ingredients_removed])
+            ))
+
+        # Touch an existing recipe only when something changed (updated_at drives API ETags,
+        # content_updated_at the similar-recipes refresh)
+        associations_changed = (categories_added or categories_removed or ingredients_added
+                                or ingredients_updated or ingredients_removed)
+        if not is_new and (changed_fields or associations_changed):
+            values = {name: fields[name] for name in changed_fields}
+            now = datetime.utcnow()
+            db.session.execute(
+                update(recipe_table).where(recipe_table.c.id == recipe_id)
+                .values(updated_at=now, content_updated_at=now, **values)
+            )
+        if ingredients_added or ingredients_removed:
+            bump_version(db.session.connection(), PANTRY_INDEX_NAME)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # ORM instances loaded before the save no longer match the rows
+    db.session.expire_all()
+    return RecipeChanges(recipe_id, changed_fields, frozenset(wanted_categories), frozenset(categories_added), frozenset(categories_removed),
+                         frozenset(ingredients_added), frozenset(ingredients_updated),
+                         frozenset(ingredients_removed))
@@ -0,0 +1,195 @@
+"""
+Full-text search over recipe titles and descriptions.
+
+SQLite uses an FTS5 external-content table (``recipe_search``) kept in sync
+with the ``recipe`` table by triggers. PostgreSQL uses a generated
+``tsvector`` column with a GIN index. Both are owned by the migrations:
+0003 creates them, and 0009 and 0010 re-create the SQLite triggers after
+rebuilding the ``recipe`` table. Results are ranked by relevance at query
+time. Any other database falls back to the old ``ILIKE`` scan.
+
+The same DDL also runs on ``db.create_all()``, which the tests and
+``seed.py`` use to build throwaway schemas.
+"""
+import re
+from sqlalchemy import column, event, false, func, literal_column, or_, table, text
+from app.extensions import db
+from app.models import Recipe
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5(
+        title, description,
+        content='recipe', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ai AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ad AFTER DELETE ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    # Only reindex when the searchable text changes, not on counter updates
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_au AFTER UPDATE OF title, description ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    ALTER TABLE recipe ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipe_search_vector ON recipe USING gin (search_vector)",
+)
+
+# Lightweight handle on the FTS5 table, which lives outside the model metadata
+recipe_search = table('recipe_search', column('rowid'))
+
+# Relative bm25 weights for the (title, description) FTS5 columns
+SQLITE_COLUMN_WEIGHTS = (10.0, 1.0)
+
+# Cache of detected backend per engine, reset whenever the schema is (re)built
+_backends = {}
+
+
+def create_search_index(connection):
+    """
+    Create the full-text index objects for the connection's database.
+
+    Safe to run repeatedly; every statement is idempotent.
+
+    Args:
+        connection: SQLAlchemy connection to run the DDL on
+
+    Returns:
+        True if a full-text index is available afterwards
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_DDL
+    elif dialect == 'postgresql':
+        statements = POSTGRES_DDL
+    else:
+        return False
+
+    for statement in statements:
+        connection.execute(text(statement))
+    _backends.pop(connection.engine, None)
+    return True
+
+
+def drop_search_index(connection):
+    """Drop the SQLite FTS table, which is not part of the model metadata."""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DROP TABLE IF EXISTS recipe_search'))
+    _backends.pop(connection.engine, None)
+
+
+def rebuild_search_index():
+    """Create the index if needed and repopulate it from the recipe table."""
+    with db.engine.begin() as connection:
+        if not create_search_index(connection):
+            return False
+        if connection.dialect.name == 'sqlite':
+            connection.execute(text("INSERT INTO recipe_search(recipe_search) VALUES ('rebuild')"))
+    return True
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    """Build the search index whenever db.create_all() runs."""
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    """Remove the search index when db.drop_all() runs."""
+    drop_search_index(connection)
+
+
+def get_backend():
+    """
+    Return the full-text backend for the current database.
+
+    Returns:
+        'sqlite', 'postgresql' or None when only ILIKE matching is available
+    """
+    engine = db.engine
+    if engine not in _backends:
+        backend = None
+        with engine.connect() as connection:
+            dialect = connection.dialect.name
+            if dialect == 'sqlite':
+                found = connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'recipe_search'"
+                )).first()
+                backend = 'sqlite' if found else None
+            elif dialect == 'postgresql':
+                found = connection.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'recipe' AND column_name = 'search_vector'"
+                )).first()
+                backend = 'postgresql' if found else None
+        _backends[engine] = backend
+    return _backends[engine]
+
+
+def _fts5_query(search_query):
+    """Turn free text into an FTS5 query of quoted prefix terms."""
+    terms = re.findall(r'\w+', search_query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_recipes(query, search_query):
+    """
+    Filter a Recipe query by a free-text search, best matches first.
+
+    Args:
+        query: Recipe query to filter
+        search_query: Text entered by the user
+
+    Returns:
+        The filtered query, ordered by relevance
+    """
+    backend = get_backend()
+
+    if backend == 'sqlite':
+        match = _fts5_query(search_query)
+        if not match:
+            return query.filter(false())
+        fts = literal_column('recipe_search')
+        return (query
+                .join(recipe_search, recipe_search.c.rowid == Recipe.id)
+                .filter(fts.op('MATCH')(match))
+                .order_by(func.bm25(fts, *SQLITE_COLUMN_WEIGHTS)))
+
+    if backend == 'postgresql':
+        vector = literal_column('recipe.search_vector')
+        ts_query = func.websearch_to_tsquery('english', search_query)
+        return (query
+                .filter(vector.op('@@')(ts_query))
+                .order_by(func.ts_rank_cd(vector, ts_query).desc()))
+
+    search_terms = f"%{search_query}%"
+    return query.filter(
+        or_(
+            Recipe.title.ilike(search_terms),
+            Recipe.description.ilike(search_terms)
+        )
+    )
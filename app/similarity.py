@@ -0,0 +1,190 @@
+"""
+Offline job that precomputes "similar recipes".
+
+Every recipe becomes a sparse vector over its ingredients and categories,
+weighted by inverse document frequency (sharing saffron says more than
+sharing salt) and L2-normalized, so cosine similarity is a sparse matrix
+product. Rows are multiplied against the whole matrix in batches with SciPy,
+and the top neighbors of each recipe are stored in the ``similar_recipe``
+table, which the recipe page reads with a single indexed lookup.
+
+Incremental runs only recompute what can have changed since the previous
+run: recipes edited since it started (``Recipe.content_updated_at``, which
+comments, ratings and favorites leave alone), recipes whose stored neighbors
+include a changed or deleted recipe, and recipes a changed one now scores
+higher for than their weakest stored neighbor.
+
+NumPy and SciPy are only needed by this job, not by the web workers.
+"""
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select
+from app.extensions import db
+from app.models import Recipe, RecipeIngredient, SimilarRecipe, recipe_categories
+
+DEFAULT_NEIGHBORS = 6
+
+DEFAULT_BATCH_SIZE = 256
+
+RefreshResult = namedtuple('RefreshResult', ['recipes', 'recomputed', 'rows', 'full'])
+RefreshResult.__doc__ = """
+Outcome of refresh_similar_recipes().
+
+Attributes:
+    recipes (int): Number of recipes in the catalog
+    recomputed (int): Number of recipes whose neighbors were recomputed
+    rows (int): Number of similar_recipe rows written
+    full (bool): Whether every recipe was recomputed
+"""
+
+
+def _pairs(query):
+    """Run a two-column query and return its rows as an (n, 2) integer array."""
+    # Plain tuples convert far faster than Row objects, which NumPy probes attribute by attribute
+    return np.array([tuple(row) for row in db.session.execute(query)], dtype=np.int64).reshape(-1, 2)
+
+
+def build_vectors():
+    """
+    Encode every recipe's ingredients and categories as a sparse vector.
+
+    Returns:
+        (sorted array of recipe ids, CSR matrix with one L2-normalized row per recipe)
+    """
+    recipe_ids = np.array(db.session.execute(select(Recipe.id).order_by(Recipe.id)).scalars().all(),
+                          dtype=np.int64)
+    ingredient_pairs = _pairs(select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id).distinct())
+    category_pairs = _pairs(select(recipe_categories.c.recipe_id, recipe_categories.c.category_id))
+
+    # Features are numbered ingredients first, then categories
+    _, ingredient_columns = np.unique(ingredient_pairs[:, 1], return_inverse=True)
+    _, category_columns = np.unique(category_pairs[:, 1], return_inverse=True)
+    offset = ingredient_columns.max() + 1 if len(ingredient_columns) else 0
+    recipe_column = np.concatenate([ingredient_pairs[:, 0], category_pairs[:, 0]])
+    columns = np.concatenate([ingredient_columns, category_columns + offset]).astype(np.int64)
+
+    # Drop links to recipes deleted while the ids were being read
+    rows = np.searchsorted(recipe_ids, recipe_column)
+    known = rows < len(recipe_ids)
+    known[known] = recipe_ids[rows[known]] == recipe_column[known]
+    rows, columns = rows[known], columns[known]
+
+    features = int(columns.max()) + 1 if len(columns) else 0
+    document_frequency = np.bincount(columns, minlength=features)
+    idf = np.log((1 + len(recipe_ids)) / (1 + document_frequency)) + 1
+    matrix = sparse.csr_matrix((idf[columns].astype(np.float32), (rows, columns)),
+                               shape=(len(recipe_ids), features))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def _write_neighbors(recipe_ids, matrix, targets, neighbors, batch_size, computed_at, thresholds=None):
+    """
+    Recompute and store the neighbors of the recipes at the ``targets`` rows.
+
+    With ``thresholds`` (one score per recipe), also return a boolean mask
+    of the recipes that some target now scores higher for than its threshold.
+    """
+    count = len(recipe_ids)
+    displaced = np.zeros(count, dtype=bool) if thresholds is not None else None
+    written = 0
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        scores = (matrix[batch] @ matrix.T).toarray()
+        scores[np.arange(len(batch)), batch] = 0  # a recipe is not its own neighbor
+        if thresholds is not None:
+            displaced |= (scores > thresholds).any(axis=0)
+
+        keep = min(neighbors, count - 1)
+        rows = []
+        if keep > 0:
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row, columns, values in zip(batch, top, top_scores):
+                rank = 0
+                for column, score in zip(columns, values):
+                    if score > 0:
+                        rank += 1
+                        rows.append({'recipe_id': int(recipe_ids[row]), 'rank': rank,
+                                     'similar_id': int(recipe_ids[column]), 'score': float(score),
+                                     'computed_at': computed_at})
+
+        db.session.execute(delete(SimilarRecipe).where(
+            SimilarRecipe.recipe_id.in_(recipe_ids[batch].tolist())
+        ))
+        if rows:
+            db.session.execute(insert(SimilarRecipe.__table__), rows)
+        db.session.commit()
+        written += len(rows)
+    return written, displaced
+
+
+def refresh_similar_recipes(neighbors=DEFAULT_NEIGHBORS, batch_size=DEFAULT_BATCH_SIZE, full=False):
+    """
+    Recompute the stored similar recipes.
+
+    Args:
+        neighbors: How many neighbors to keep per recipe
+        batch_size: Recipes whose similarities are computed per matrix product
+        full: Recompute every recipe instead of only what changed since the last run
+
+    Returns:
+        RefreshResult
+    """
+    started = datetime.utcnow()
+    last_run = db.session.execute(select(func.max(SimilarRecipe.computed_at))).scalar()
+    recipe_ids, matrix = build_vectors()
+    count = len(recipe_ids)
+
+    if full or last_run is None:
+        db.session.execute(delete(SimilarRecipe))
+        db.session.commit()
+        written, _ = _write_neighbors(recipe_ids, matrix, np.arange(count), neighbors, batch_size, started)
+        return RefreshResult(count, count, written, True)
+
+    existing = set(recipe_ids.tolist())
+    changed = set(db.session.execute(select(Recipe.id).where(Recipe.content_updated_at >= last_run)).scalars())
+    changed &= existing
+    stored = db.session.execute(
+        select(SimilarRecipe.recipe_id, SimilarRecipe.similar_id, SimilarRecipe.score)
+    ).all()
+
+    # A recipe's stored list is stale if it holds a changed or deleted recipe; otherwise a
+    # changed recipe only enters it by beating its weakest neighbor (any positive score
+    # when the list is not full)
+    weakest = {}
+    stored_counts = {}
+    stale = set()
+    deleted = set()
+    for recipe_id, similar_id, score in stored:
+        if recipe_id not in existing:
+            deleted.add(recipe_id)
+            continue
+        if similar_id in changed or similar_id not in existing:
+            stale.add(recipe_id)
+        stored_counts[recipe_id] = stored_counts.get(recipe_id, 0) + 1
+        weakest[recipe_id] = min(score, weakest.get(recipe_id, score))
+    thresholds = np.zeros(count, dtype=np.float32)
+    for recipe_id, score in weakest.items():
+        if stored_counts[recipe_id] >= neighbors:
+            thresholds[np.searchsorted(recipe_ids, recipe_id)] = score
+
+    if deleted:
+        db.session.execute(delete(SimilarRecipe).where(SimilarRecipe.recipe_id.in_(deleted)))
+        db.session.commit()
+
+    changed_rows = np.searchsorted(recipe_ids, sorted(changed)).astype(np.int64)
+    written, displaced = _write_neighbors(recipe_ids, matrix, changed_rows, neighbors, batch_size,
+                                          started, thresholds)
+    affected = displaced
+    affected[np.searchsorted(recipe_ids, sorted(stale)).astype(np.int64)] = True
+    affected[changed_rows] = False
+    affected_rows = np.flatnonzero(affected)
+    more, _ = _write_neighbors(recipe_ids, matrix, affected_rows, neighbors, batch_size, started)
+    return RefreshResult(count, len(changed_rows) + len(affected_rows), written + more, False)
@@ -0,0 +1,216 @@
+"""
+Per-request SQL statement accounting.
+
+Every statement executed by SQLAlchemy is counted and timed against the
+current request. When ``SQLALCHEMY_QUERY_BUDGET`` is set (the test
+configuration does this), a request that runs more statements than the
+budget fails with QueryBudgetExceeded, which makes N+1 regressions show up
+as test failures.
+
+When ``SQLALCHEMY_SLOW_QUERY_MS`` is set, statements slower than it are
+written to the ``app.sqlstats`` logger with their endpoint and normalized
+SQL, and to ``SLOW_QUERY_LOG_FILE`` if that is set too.
+
+Separately, when ``SERVER_TIMING_ENABLED`` is set (it is off by default,
+since the header is visible to every client), each response carries a
+``Server-Timing`` header with the request's statement count, total database
+time and slowest statement.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Counters opened with count_queries() on the current thread
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request or block runs more SQL statements than allowed."""
+
+
+class QueryCounter:
+    """
+    Running tally of SQL statements.
+
+    Attributes:
+        count (int): Number of statements executed
+        statements (list): SQL text of each statement, in order
+        total_time (float): Seconds spent executing the statements
+        slowest_time (float): Duration of the slowest statement in seconds
+        slowest_statement (str): SQL text of the slowest statement
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, duration=0.0):
+        """Add one executed statement, and how long it took, to the tally."""
+        self.count += 1
+        self.statements.append(statement)
+        self.total_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+
+def normalize_sql(statement):
+    """
+    Reduce a statement to its shape, so repeated queries log identically.
+
+    Collapses whitespace, replaces literals with ``?`` and shortens
+    parameter lists such as ``IN (?, ?, ?)`` to ``IN (?...)``.
+
+    Args:
+        statement: SQL text
+
+    Returns:
+        Normalized SQL text
+    """
+    statement = re.sub(r"\s+", ' ', statement).strip()
+    statement = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    statement = re.sub(r"\b\d+(?:\.\d+)?\b", '?', statement)
+    statement = re.sub(r"%\(\w+\)s", '?', statement)
+    return re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", '(?...)', statement)
+
+
+def _active_counters():
+    if not hasattr(_local, 'counters'):
+        _local.counters = []
+    return _local.counters
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Note when a statement starts."""
+    conn.info.setdefault('sqlstats_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Record a statement against the request and any open count_queries() blocks."""
+    duration = time.perf_counter() - conn.info['sqlstats_started'].pop()
+    for counter in _active_counters():
+        counter.record(statement, duration)
+    if not has_app_context():
+        return
+
+    counter = g.get('sql_queries')
+    if counter is not None:
+        counter.record(statement, duration)
+
+    threshold = current_app.config.get('SQLALCHEMY_SLOW_QUERY_MS')
+    if threshold and duration * 1000 >= threshold:
+        endpoint = request.endpoint if has_request_context() else None
+        logger.warning('Slow query (%.1f ms) in %s: %s', duration * 1000,
+                       endpoint or '<no request>', normalize_sql(statement))
+
+
+def _handle_error(exception_context):
+    """Forget the start time of a statement that failed."""
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('sqlstats_started'):
+        connection.info['sqlstats_started'].pop()
+
+
+def server_timing(counter, request_time=None):
+    """
+    Format a Server-Timing header value for a request's statements.
+
+    Args:
+        counter: QueryCounter of the request
+        request_time: Seconds the whole request took, if known
+
+    Returns:
+        Header value, e.g. ``db;dur=4.2;desc="3 queries", db-slowest;dur=2.9, app;dur=11.0``
+    """
+    metrics = [f'db;dur={counter.total_time * 1000:.1f};desc="{counter.count} queries"',
+               f'db-slowest;dur={counter.slowest_time * 1000:.1f}']
+    if request_time is not None:
+        metrics.append(f'app;dur={request_time * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements executed inside a ``with`` block.
+
+    Yields:
+        QueryCounter that is updated as statements run
+    """
+    counter = QueryCounter()
+    _active_counters().append(counter)
+    try:
+        yield counter
+    finally:
+        _active_counters().remove(counter)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the ``with`` block executes more than ``limit`` SQL statements.
+
+    Args:
+        limit: Maximum number of statements allowed
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        raise QueryBudgetExceeded(
+            f'{counter.count} SQL statements executed, limit is {limit}:\n'
+            + '\n'.join(counter.statements)
+        )
+
+
+def init_app(app):
+    """
+    Start counting SQL statements per request for an application.
+
+    Args:
+        app: Flask application instance
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    log_file = app.config.get('SLOW_QUERY_LOG_FILE')
+    # The logger is module-wide, so each application created in this process must not add another handler
+    if log_file and not any(isinstance(handler, logging.FileHandler)
+                            and handler.baseFilename == os.path.abspath(log_file)
+                            for handler in logger.handlers):
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(process)d %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+
+    @app.before_request
+    def start_query_count():
+        g.sql_queries = QueryCounter()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def check_query_budget(response):
+        budget = app.config.get('SQLALCHEMY_QUERY_BUDGET')
+        counter = g.get('sql_queries')
+        if budget is not None and counter is not None and counter.count > budget:
+            raise QueryBudgetExceeded(
+                f'{counter.count} SQL statements executed for a request, budget is {budget}:\n'
+                + '\n'.join(counter.statements)
+            )
+        if counter is not None and app.config.get('SERVER_TIMING_ENABLED'):
+            response.headers['Server-Timing'] = server_timing(
+                counter, time.perf_counter() - g.request_started
+            )
+        return response
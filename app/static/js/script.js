@@ -16,4 +16,119 @@ document.addEventListener('DOMContentLoaded', function() {
             alertInstance.close();
         });
     }, 5000);
-}); 
\ No newline at end of file
+    
+    // Load older comments on the recipe page without reloading it
+    var loadMoreButton = document.getElementById('load-more-comments');
+    if (loadMoreButton) {
+        loadMoreButton.addEventListener('click', function() {
+            loadMoreButton.disabled = true;
+            var url = loadMoreButton.dataset.url + '?after=' + encodeURIComponent(loadMoreButton.dataset.cursor);
+            fetch(url, {headers: {'Accept': 'application/json'}})
+                .then(function(response) { return response.json(); })
+                .then(function(data) {
+                    var list = document.getElementById('comment-list');
+                    data.comments.forEach(function(comment) {
+                        list.appendChild(buildCommentCard(comment));
+                    });
+                    if (data.next_cursor) {
+                        loadMoreButton.dataset.cursor = data.next_cursor;
+                        loadMoreButton.disabled = false;
+                    } else {
+                        loadMoreButton.remove();
+                    }
+                })
+                .catch(function() {
+                    loadMoreButton.disabled = false;
+                });
+        });
+    }
+    
+    // Add an empty ingredient row to the recipe form
+    var addIngredientButton = document.getElementById('add-ingredient');
+    if (addIngredientButton) {
+        addIngredientButton.addEventListener('click', function() {
+            var rows = document.querySelectorAll('#ingredient-rows .ingredient-row');
+            var row = rows[rows.length - 1].cloneNode(true);
+            var index = rows.length;
+            row.querySelectorAll('.invalid-feedback').forEach(function(error) { error.remove(); });
+            row.querySelectorAll('input').forEach(function(input) {
+                input.name = input.name.replace(/ingredients-\d+-/, 'ingredients-' + index + '-');
+                input.id = input.name;
+                input.value = '';
+                input.classList.remove('is-invalid');
+            });
+            document.getElementById('ingredient-rows').appendChild(row);
+        });
+    }
+    
+    // Suggest ingredient names while typing (answered from the server's in-memory index)
+    var ingredientRows = document.getElementById('ingredient-rows');
+    if (ingredientRows) {
+        var suggestions = document.getElementById('ingredient-suggestions');
+        var suggestTimer = null;
+        ingredientRows.addEventListener('input', function(event) {
+            if (!/-name$/.test(event.target.name)) {
+                return;
+            }
+            var prefix = event.target.value.trim();
+            clearTimeout(suggestTimer);
+            if (!prefix) {
+                return;
+            }
+            suggestTimer = setTimeout(function() {
+                var url = ingredientRows.dataset.autocompleteUrl + '?q=' + encodeURIComponent(prefix);
+                fetch(url, {headers: {'Accept': 'application/json'}})
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        suggestions.replaceChildren();
+                        data.ingredients.forEach(function(ingredient) {
+                            var option = document.createElement('option');
+                            option.value = ingredient.name;
+                            option.label = ingredient.unit ? ingredient.name + ' (' + ingredient.unit + ')' : ingredient.name;
+                            suggestions.appendChild(option);
+                        });
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    }
+});
+
+// Build a comment card matching the server-rendered markup (text is never parsed as HTML)
+function buildCommentCard(comment) {
+    var card = document.createElement('div');
+    card.className = 'card mb-3 comment-card';
+    var body = document.createElement('div');
+    body.className = 'card-body';
+    card.appendChild(body);
+    
+    var title = document.createElement('h5');
+    title.className = 'card-title';
+    title.textContent = comment.username;
+    body.appendChild(title);
+    
+    var subtitle = document.createElement('h6');
+    subtitle.className = 'card-subtitle mb-2 text-muted';
+    subtitle.textContent = comment.created_at_display;
+    body.appendChild(subtitle);
+    
+    var content = document.createElement('p');
+    content.className = 'card-text';
+    content.textContent = comment.content;
+    body.appendChild(content);
+    
+    if (comment.delete_url) {
+        var form = document.createElement('form');
+        form.action = comment.delete_url;
+        form.method = 'POST';
+        form.className = 'd-inline mt-2';
+        form.innerHTML = '<button type="submit" class="btn btn-sm btn-outline-danger"><i class="fas fa-trash-alt"></i> Delete</button>';
+        form.addEventListener('submit', function(event) {
+            if (!confirm('Are you sure you want to delete this comment?')) {
+                event.preventDefault();
+            }
+        });
+        body.appendChild(form);
+    }
+    return card;
+}
@@ -0,0 +1,35 @@
+"""Aggregate statistics shown on the user dashboard."""
+from collections import namedtuple
+from sqlalchemy import func, select
+from app.extensions import db
+from app.models import Recipe, Favorite, Comment, Rating
+
+UserStatistics = namedtuple('UserStatistics',
+                            ['recipe_count', 'favorite_count', 'comment_count', 'rating_count'])
+
+
+def user_statistics(user_id):
+    """
+    Count a user's recipes, favorites, comments and ratings in one round trip.
+
+    Each counter is a scalar subquery of a single SELECT, so the database
+    answers all four from the per-user indexes at once.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        UserStatistics named tuple
+    """
+    def count_of(model):
+        return (select(func.count(model.id))
+                .where(model.user_id == user_id)
+                .scalar_subquery())
+
+    row = db.session.execute(select(
+        count_of(Recipe),
+        count_of(Favorite),
+        count_of(Comment),
+        count_of(Rating),
+    )).one()
+    return UserStatistics(*row)
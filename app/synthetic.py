@@ -0,0 +1,318 @@
+"""
+Synthetic, production-shaped data for load and performance testing.
+
+Rows are generated lazily and written with batched executemany inserts
+using precomputed ids, so tens of millions of rows can be produced without
+holding them in memory. A fixed seed always yields the same dataset:
+timestamps count back from a fixed ``end`` (DEFAULT_END unless given), not
+from the current time, so cursors, trending scores and benchmark results
+repeat from one run to the next.
+
+Activity is skewed the way real traffic is: recipe popularity and user
+activity follow a Zipf-like distribution (weight ``1 / rank ** skew``), so a
+few recipes collect most comments, ratings and favorites and a few users
+write most of them.
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from sqlalchemy import func, insert, select, text
+from app.extensions import db, bcrypt
+from app.models import (User, Recipe, Category, Ingredient, RecipeIngredient, Comment, Favorite,
+                        Rating, recipe_categories)
+from app.catalog import CATALOG_NAME, bump_version
+from app.ingredient_index import INDEX_NAME as INGREDIENT_INDEX_NAME
+from app.pantry import INDEX_NAME as PANTRY_INDEX_NAME
+from app.counters import recompute_recipe_counters
+from app.trending import recompute_trending_scores
+
+ADJECTIVES = ('Classic', 'Spicy', 'Creamy', 'Smoky', 'Crispy', 'Roasted', 'Grilled', 'Zesty', 'Hearty',
+              'Quick', 'Rustic', 'Golden', 'Sticky', 'Garlic', 'Lemon', 'Honey', 'Herbed', 'Slow-Cooked')
+DISHES = ('Pancakes', 'Stir Fry', 'Curry', 'Risotto', 'Tacos', 'Lasagna', 'Salad', 'Soup', 'Stew',
+          'Burger', 'Noodles', 'Pie', 'Omelette', 'Casserole', 'Flatbread', 'Chili', 'Dumplings', 'Bowl')
+FOODS = ('Flour', 'Sugar', 'Eggs', 'Milk', 'Butter', 'Salt', 'Pepper', 'Olive Oil', 'Chicken', 'Onion',
+         'Garlic', 'Tomato', 'Rice', 'Pasta', 'Cheese', 'Lettuce', 'Carrot', 'Potato', 'Broccoli', 'Beef',
+         'Pork', 'Tofu', 'Spinach', 'Mushroom', 'Basil', 'Ginger', 'Lime', 'Lemon', 'Yogurt', 'Beans',
+         'Lentils', 'Chickpeas', 'Cumin', 'Paprika', 'Cinnamon', 'Honey', 'Salmon', 'Shrimp', 'Corn', 'Peas')
+QUALIFIERS = ('', 'Fresh', 'Dried', 'Ground', 'Smoked', 'Organic', 'Frozen', 'Canned', 'Wild', 'Red',
+              'Green', 'Baby', 'Whole', 'Chopped', 'Roasted')
+UNITS = ('cups', 'tablespoons', 'teaspoons', 'grams', 'ounces', 'pounds', 'cloves', '')
+CATEGORY_NAMES = ('Breakfast', 'Lunch', 'Dinner', 'Dessert', 'Vegetarian', 'Vegan', 'Gluten-Free',
+                  'Snack', 'Soup', 'Salad', 'Baking', 'Grill', 'Seafood', 'Quick', 'Comfort Food')
+WORDS = ('simple', 'weeknight', 'family', 'favorite', 'easy', 'flavorful', 'comforting', 'bright',
+         'fresh', 'seasonal', 'crowd-pleasing', 'make-ahead', 'one-pan', 'healthy', 'rich', 'light')
+
+# Latest timestamp of a generated dataset unless another is given
+DEFAULT_END = datetime(2026, 1, 1)
+
+
+def zipf_cum_weights(count, skew):
+    """Return cumulative Zipf-like weights for ``count`` items ranked by popularity."""
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _existing_ids(model):
+    return list(db.session.execute(select(model.id).order_by(model.id)).scalars())
+
+
+def _write(table, rows, batch_size):
+    """Insert rows from an iterator in batches, committing after each one."""
+    written = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return written
+        db.session.execute(insert(table), batch)
+        db.session.commit()
+        written += len(batch)
+
+
+def _sync_sequences(*models):
+    """Move PostgreSQL id sequences past the explicitly inserted ids."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in models:
+        name = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM \"{name}\"))"
+        ))
+    db.session.commit()
+
+
+class DatasetGenerator:
+    """
+    Generates one synthetic dataset on top of whatever is already stored.
+
+    Args:
+        seed: Seed for the random generator
+        skew: Zipf exponent for recipe popularity and user activity
+        days: Timestamps are spread over this many days before ``end``
+        batch_size: Rows per INSERT batch
+        end: Latest timestamp to generate (DEFAULT_END when None)
+    """
+
+    def __init__(self, seed=42, skew=1.1, days=365, batch_size=5000, end=None):
+        self.random = random.Random(seed)
+        self.skew = skew
+        self.batch_size = batch_size
+        self.end = (end or DEFAULT_END).replace(microsecond=0)
+        self.seconds = int(timedelta(days=days).total_seconds())
+        self.user_ids = []
+        self.recipe_ids = []
+        self.category_ids = []
+        self.ingredient_ids = []
+
+    def _timestamp(self):
+        return self.end - timedelta(seconds=self.random.randrange(self.seconds))
+
+    def _sentence(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def users(self, count, password='password'):
+        """Insert ``count`` users who all share one password."""
+        first = _next_id(User)
+        hashed = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.user_ids = list(range(first, first + count))
+        rows = ({'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+                 'password': hashed, 'created_at': self._timestamp()}
+                for user_id in self.user_ids)
+        return _write(User.__table__, rows, self.batch_size)
+
+    def categories(self, count):
+        """Insert ``count`` categories, reusing the stock names first."""
+        first = _next_id(Category)
+        existing = set(db.session.execute(select(Category.name)).scalars())
+        names = [name for name in CATEGORY_NAMES if name not in existing]
+        names += [f'Collection {number}' for number in range(first, first + count)]
+        rows = [{'id': first + index, 'name': name, 'description': f'Synthetic {name.lower()} recipes.'}
+                for index, name in enumerate(names[:count])]
+        self.category_ids = [row['id'] for row in rows]
+        written = _write(Category.__table__, rows, self.batch_size)
+        if written:
+            # Core inserts skip the mapper events that normally do this
+            bump_version(db.session.connection(), CATALOG_NAME)
+            db.session.commit()
+        return written
+
+    def ingredients(self, count):
+        """Insert ``count`` ingredients with distinct names."""
+        first = _next_id(Ingredient)
+        existing = set(db.session.execute(select(Ingredient.name)).scalars())
+
+        def names():
+            for qualifier in QUALIFIERS:
+                for food in FOODS:
+                    yield f'{qualifier} {food}'.strip()
+            number = first
+            while True:
+                yield f'{self.random.choice(FOODS)} {number}'
+                number += 1
+
+        unique = (name for name in names() if name not in existing)
+        rows = [{'id': first + index, 'name': name, 'measurement_unit': self.random.choice(UNITS)}
+                for index, name in enumerate(islice(unique, count))]
+        self.ingredient_ids = [row['id'] for row in rows]
+        written = _write(Ingredient.__table__, rows, self.batch_size)
+        if written:
+            bump_version(db.session.connection(), INGREDIENT_INDEX_NAME)
+            db.session.commit()
+        return written
+
+    def recipes(self, count, ingredients_per_recipe=8, max_categories=3):
+        """Insert ``count`` recipes by skewed authors, with their categories and ingredients."""
+        # Build on existing rows for any table this run did not generate
+        self.user_ids = self.user_ids or _existing_ids(User)
+        self.category_ids = self.category_ids or _existing_ids(Category)
+        self.ingredient_ids = self.ingredient_ids or _existing_ids(Ingredient)
+        if not self.user_ids:
+            return 0
+
+        first = _next_id(Recipe)
+        self.recipe_ids = list(range(first, first + count))
+        authors = zipf_cum_weights(len(self.user_ids), self.skew)
+
+        def recipes():
+            for recipe_id in self.recipe_ids:
+                title = f'{self.random.choice(ADJECTIVES)} {self.random.choice(DISHES)}'
+                created_at = self._timestamp()
+                yield {'id': recipe_id, 'title': title,
+                       'description': f'{self._sentence(12)} {self._sentence(8)}',
+                       'preparation_time': self.random.randint(5, 60),
+                       'cooking_time': self.random.randint(0, 180),
+                       'servings': self.random.randint(1, 8),
+                       'created_at': created_at, 'updated_at': created_at,
+                       'content_updated_at': created_at,
+                       'user_id': self.random.choices(self.user_ids, cum_weights=authors)[0]}
+
+        def links():
+            for recipe_id in self.recipe_ids:
+                picks = self.random.sample(self.category_ids,
+                                           min(len(self.category_ids), self.random.randint(1, max_categories)))
+                for category_id in picks:
+                    yield {'recipe_id': recipe_id, 'category_id': category_id}
+
+        def amounts():
+            for recipe_id in self.recipe_ids:
+                size = min(len(self.ingredient_ids),
+                           max(1, int(self.random.gauss(ingredients_per_recipe, 2))))
+                for ingredient_id in self.random.sample(self.ingredient_ids, size):
+                    yield {'recipe_id': recipe_id, 'ingredient_id': ingredient_id,
+                           'quantity': round(self.random.uniform(0.25, 4), 2)}
+
+        written = _write(Recipe.__table__, recipes(), self.batch_size)
+        if self.category_ids:
+            _write(recipe_categories, links(), self.batch_size)
+        if self.ingredient_ids and _write(RecipeIngredient.__table__, amounts(), self.batch_size):
+            bump_version(db.session.connection(), PANTRY_INDEX_NAME)
+            db.session.commit()
+        return written
+
+    def _activity(self, total):
+        """
+        Yield (user_id, recipe_id) pairs, unique per user, skewed by user activity and recipe popularity.
+
+        Each user's share of ``total`` follows their activity weight and is
+        capped at the number of recipes.
+        """
+        self.user_ids = self.user_ids or _existing_ids(User)
+        self.recipe_ids = self.recipe_ids or _existing_ids(Recipe)
+        if not self.user_ids or not self.recipe_ids:
+            return
+        popularity = zipf_cum_weights(len(self.recipe_ids), self.skew)
+        weights = [1.0 / (rank ** self.skew) for rank in range(1, len(self.user_ids) + 1)]
+        scale = total / sum(weights)
+        activity = list(zip(self.user_ids, weights))
+        self.random.shuffle(activity)
+        remaining = total
+        for user_id, weight in activity:
+            share = min(remaining, len(self.recipe_ids), max(1, round(weight * scale)))
+            remaining -= share
+            if share * 4 > len(self.recipe_ids):
+                # Rejection sampling from a skewed distribution stalls near full coverage
+                for recipe_id in self.random.sample(self.recipe_ids, share):
+                    yield user_id, recipe_id
+                if not remaining:
+                    return
+                continue
+            seen = set()
+            while len(seen) < share:
+                recipe_id = self.random.choices(self.recipe_ids, cum_weights=popularity)[0]
+                if recipe_id not in seen:
+                    seen.add(recipe_id)
+                    yield user_id, recipe_id
+            if not remaining:
+                return
+
+    def comments(self, count):
+        """Insert about ``count`` comments on popular recipes."""
+        first = _next_id(Comment)
+        rows = ({'id': first + index, 'content': self._sentence(self.random.randint(4, 20)),
+                 'created_at': self._timestamp(), 'recipe_id': recipe_id, 'user_id': user_id}
+                for index, (user_id, recipe_id) in enumerate(self._activity(count)))
+        return _write(Comment.__table__, rows, self.batch_size)
+
+    def ratings(self, count):
+        """Insert about ``count`` ratings, at most one per user and recipe."""
+        first = _next_id(Rating)
+        rows = ({'id': first + index, 'value': self.random.choices((1, 2, 3, 4, 5), (1, 1, 3, 6, 8))[0],
+                 'created_at': self._timestamp(), 'recipe_id': recipe_id, 'user_id': user_id}
+                for index, (user_id, recipe_id) in enumerate(self._activity(count)))
+        return _write(Rating.__table__, rows, self.batch_size)
+
+    def favorites(self, count):
+        """Insert about ``count`` favorites, at most one per user and recipe."""
+        first = _next_id(Favorite)
+        rows = ({'id': first + index, 'created_at': self._timestamp(), 'recipe_id': recipe_id,
+                 'user_id': user_id}
+                for index, (user_id, recipe_id) in enumerate(self._activity(count)))
+        return _write(Favorite.__table__, rows, self.batch_size)
+
+
+def generate_dataset(users=1000, recipes=10000, categories=15, ingredients=500, ingredients_per_recipe=8,
+                     comments=50000, ratings=100000, favorites=50000, skew=1.1, seed=42, days=365,
+                     batch_size=5000, end=None, progress=None):
+    """
+    Generate a synthetic dataset and bring derived data up to date.
+
+    Args:
+        users, recipes, categories, ingredients: Number of rows to create
+        ingredients_per_recipe: Mean number of ingredients per recipe
+        comments, ratings, favorites: Approximate number of rows to create
+        skew: Zipf exponent for popularity and activity (0 = uniform)
+        seed: Seed for the random generator
+        days: Timestamps are spread over this many days before ``end``
+        batch_size: Rows per INSERT batch
+        end: Latest timestamp to generate (DEFAULT_END when None)
+        progress: Optional callable receiving (table, rows written)
+
+    Returns:
+        dict mapping each table to the number of rows written
+    """
+    generator = DatasetGenerator(seed=seed, skew=skew, days=days, batch_size=batch_size, end=end)
+    report = progress or (lambda table, written: None)
+    written = {}
+    steps = (
+        ('user', lambda: generator.users(users)),
+        ('category', lambda: generator.categories(categories)),
+        ('ingredient', lambda: generator.ingredients(ingredients)),
+        ('recipe', lambda: generator.recipes(recipes, ingredients_per_recipe)),
+        ('comment', lambda: generator.comments(comments)),
+        ('rating', lambda: generator.ratings(ratings)),
+        ('favorite', lambda: generator.favorites(favorites)),
+    )
+    for table, step in steps:
+        written[table] = step()
+        report(table, written[table])
+
+    # Activity goes to this run's recipes when it made any; their updated_at stays as generated
+    recompute_recipe_counters(touch=not written['recipe'])
+    recompute_trending_scores()
+    db.session.commit()
+    _sync_sequences(User, Category, Ingredient, Recipe, Comment, Rating, Favorite)
+    return written
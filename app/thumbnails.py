@@ -0,0 +1,82 @@
+"""
+Image resizing run in worker processes by app.images.
+
+Nothing here touches Flask or the database, so spawned workers only import
+Pillow. Each variant is named after a hash of its own bytes, which makes its
+URL safe to cache forever: different pixels always get a different name.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from PIL import Image, ImageOps
+
+# Pillow save() format and file extension per variant format
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def write_atomically(directory, filename, data):
+    """Write a file under its final name only once it is complete."""
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        return
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _flatten(image):
+    """Return an RGB copy of an image, with any transparency composited onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(original_path, output_dir, widths, formats, quality):
+    """
+    Write resized copies of an image.
+
+    Widths above the original's are dropped (the original width is used
+    instead), so small uploads are never upscaled.
+
+    Args:
+        original_path: Path of the uploaded file
+        output_dir: Directory the variants are written to
+        widths: Target widths in pixels
+        formats: Keys of FORMATS to write each width in
+        quality: Encoder quality (1-100)
+
+    Returns:
+        list of [format, width, height, filename] for every variant, smallest first
+    """
+    with Image.open(original_path) as source:
+        # Let JPEG decoding skip detail the largest variant does not need
+        source.draft('RGB', (max(widths), max(widths)))
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    os.makedirs(output_dir, exist_ok=True)
+    variants = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize(
+            (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for name in formats:
+            pillow_format, extension = FORMATS[name]
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, quality=quality, optimize=True)
+            data = buffer.getvalue()
+            filename = f'{hashlib.sha256(data).hexdigest()[:20]}.{extension}'
+            write_atomically(output_dir, filename, data)
+            variants.append([name, width, height, filename])
+    return variants
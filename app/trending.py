@@ -0,0 +1,168 @@
+"""
+Time-decayed "trending" scores for recipes.
+
+Each rating, comment and favorite is worth its weight halved every
+TRENDING_HALF_LIFE_HOURS since it happened. Rather than decaying every score
+as time passes, a row is stored worth ``weight * 2 ** (hours since
+TRENDING_EPOCH / half life)``: scaling all scores by the same factor leaves
+their order unchanged, so ``Recipe.trending_score`` never needs to be touched
+for time to pass, and the homepage reads the top recipes straight off its
+index.
+
+Writers add or subtract a row's points in the same transaction as the row,
+through adjust_recipe_counters(); recompute_trending_scores() rebuilds the
+scores from the source tables.
+
+Scores grow by a factor of two per half-life and would overflow a float
+after about a thousand of them, so the epoch moves. The one in use is stored
+in ``cache_version`` (TRENDING_EPOCH only seeds it), and writers read it in
+the same transaction as their update. A full recompute_trending_scores() run
+moves it to the present once activity is REBASE_EXPONENT half-lives past it,
+rebuilding every score on the new scale. Until a rebase happens, writers
+keep working (and log a warning) up to MAX_EXPONENT, beyond which new
+activity is logged as an error and counts for nothing rather than failing.
+"""
+import logging
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, insert, select, update
+from app.extensions import db
+from app.models import Recipe, Rating, Comment, Favorite, CacheVersion
+
+logger = logging.getLogger(__name__)
+
+# cache_version row holding the epoch the stored scores are relative to
+EPOCH_NAME = 'trending_epoch'
+
+# Half-lives past the epoch after which a full recompute moves it to the present
+REBASE_EXPONENT = 256
+
+# Largest exponent written; leaves room below 2 ** 1024 for a recipe's sum of many rows
+MAX_EXPONENT = 960
+
+# Points for one comment, one favorite and each star of a rating, at the moment they happen
+COMMENT_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+RATING_STAR_WEIGHT = 0.3
+
+
+def trending_epoch(lock=False):
+    """
+    Return the epoch the stored scores are relative to.
+
+    Args:
+        lock: Lock the epoch row for update (a rebase) instead of for share
+            (a write adding points), so neither can interleave with the other
+
+    Returns:
+        datetime
+    """
+    table = CacheVersion.__table__
+    query = select(table.c.version).where(table.c.name == EPOCH_NAME).with_for_update(read=not lock)
+    stored = db.session.execute(query).scalar()
+    return datetime.fromisoformat(stored) if stored else current_app.config['TRENDING_EPOCH']
+
+
+def _exponent(created_at, epoch):
+    """Return the number of half-lives from the epoch to a time."""
+    half_life = current_app.config['TRENDING_HALF_LIFE_HOURS'] * 3600
+    return (created_at - epoch).total_seconds() / half_life
+
+
+def trending_points(weight, created_at, epoch=None):
+    """
+    Return the score contribution of an activity row.
+
+    Args:
+        weight: Undecayed points of the row, e.g. COMMENT_WEIGHT
+        created_at: When the row was written; rows of unknown age count for nothing
+        epoch: Epoch to score against (read with trending_epoch() when None)
+
+    Returns:
+        float to add to the recipe's trending_score
+    """
+    if created_at is None or not weight:
+        return 0.0
+    exponent = _exponent(created_at, trending_epoch() if epoch is None else epoch)
+    if exponent > MAX_EXPONENT:
+        logger.error('Trending points for %s not counted: the epoch is %.0f half-lives old; '
+                     'run `flask recompute-trending` to move it', created_at, exponent)
+        return 0.0
+    if exponent > REBASE_EXPONENT:
+        logger.warning('The trending epoch is %.0f half-lives old; run `flask recompute-trending` to move it',
+                       exponent)
+    return weight * 2.0 ** exponent
+
+
+def comment_points(comment):
+    """Return the trending points of a comment."""
+    return trending_points(COMMENT_WEIGHT, comment.created_at)
+
+
+def favorite_points(favorite):
+    """Return the trending points of a favorite."""
+    return trending_points(FAVORITE_WEIGHT, favorite.created_at)
+
+
+def rating_points(rating, value=None):
+    """Return the trending points of a rating, optionally as if it had ``value`` stars."""
+    return trending_points(RATING_STAR_WEIGHT * (rating.value if value is None else value), rating.created_at)
+
+
+def recompute_trending_scores(recipe_ids=None):
+    """
+    Recalculate trending scores from the ratings, comments and favorites.
+
+    Rows are streamed and summed per recipe in Python (the exponential is not
+    portable SQL), then written back with one executemany UPDATE. The
+    recipes' updated_at is left alone. A full run first moves the epoch to
+    the present once it is REBASE_EXPONENT half-lives old.
+
+    Args:
+        recipe_ids: Optional iterable of recipe IDs to limit the recalculation to
+
+    Returns:
+        Number of recipe rows updated
+    """
+    recipe_ids = None if recipe_ids is None else list(recipe_ids)
+    # Writers wait for the rebase to commit, so no points land on the old scale after it
+    epoch = trending_epoch(lock=True)
+    now = datetime.utcnow()
+    if recipe_ids is None and _exponent(now, epoch) > REBASE_EXPONENT:
+        epoch = now.replace(minute=0, second=0, microsecond=0)
+        _store_epoch(epoch)
+    sources = (
+        (select(Comment.recipe_id, Comment.created_at, db.literal(COMMENT_WEIGHT)), Comment),
+        (select(Favorite.recipe_id, Favorite.created_at, db.literal(FAVORITE_WEIGHT)), Favorite),
+        (select(Rating.recipe_id, Rating.created_at, Rating.value * RATING_STAR_WEIGHT), Rating),
+    )
+    scores = {}
+    for query, model in sources:
+        if recipe_ids is not None:
+            query = query.where(model.recipe_id.in_(recipe_ids))
+        for recipe_id, created_at, weight in db.session.execute(query.execution_options(yield_per=5000)):
+            scores[recipe_id] = scores.get(recipe_id, 0.0) + trending_points(weight, created_at, epoch)
+
+    recipe_table = Recipe.__table__
+    targets = select(recipe_table.c.id)
+    if recipe_ids is not None:
+        targets = targets.where(recipe_table.c.id.in_(recipe_ids))
+    rows = [{'recipe_key': recipe_id, 'new_score': scores.get(recipe_id, 0.0)}
+            for recipe_id in db.session.execute(targets).scalars()]
+    if rows:
+        # Keep updated_at as it is: a rescore is not a change to the recipe
+        db.session.connection().execute(
+            update(recipe_table)
+            .where(recipe_table.c.id == bindparam('recipe_key'))
+            .values(trending_score=bindparam('new_score'), updated_at=recipe_table.c.updated_at),
+            rows
+        )
+    return len(rows)
+
+
+def _store_epoch(epoch):
+    """Record a new epoch in the current transaction."""
+    table = CacheVersion.__table__
+    result = db.session.execute(update(table).where(table.c.name == EPOCH_NAME).values(version=epoch.isoformat()))
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(name=EPOCH_NAME, version=epoch.isoformat()))
@@ -0,0 +1,99 @@
+"""
+Short-lived cache behind the Flask-Login user loader.
+
+The loader runs on every authenticated request. Instead of a primary-key
+query each time, the user's column values are kept in a small per-worker
+LRU for USER_CACHE_TTL seconds and turned back into a session-attached User
+without touching the database. Profile and password changes invalidate the
+entry; changes made by other workers are picked up once the TTL expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from app.extensions import db
+from app.models import User
+
+# Columns copied into the cache; relationships are still loaded lazily
+CACHED_COLUMNS = ('id', 'username', 'email', 'password', 'profile_picture', 'picture_id', 'created_at')
+
+
+class _UserCacheState:
+    """Cached rows for one application."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+
+class UserCache:
+    """Flask extension that caches users loaded by Flask-Login."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the cache for an application from USER_CACHE_TTL / USER_CACHE_MAX_ENTRIES."""
+        app.extensions['user_cache'] = _UserCacheState(
+            app.config.get('USER_CACHE_TTL', 60),
+            app.config.get('USER_CACHE_MAX_ENTRIES', 1000)
+        )
+
+    @staticmethod
+    def _state():
+        state = current_app.extensions.get('user_cache')
+        if state is None or not state.ttl:
+            return None
+        return state
+
+    def load(self, user_id):
+        """
+        Return the User for an id, from the cache when possible.
+
+        Args:
+            user_id: User ID stored in the session
+
+        Returns:
+            User attached to the current session, or None if it does not exist
+        """
+        user_id = int(user_id)
+        state = self._state()
+        if state is None:
+            return db.session.get(User, user_id)
+
+        with state.lock:
+            item = state.entries.get(user_id)
+            if item is not None and item[0] < time.monotonic():
+                del state.entries[user_id]
+                item = None
+            if item is not None:
+                state.entries.move_to_end(user_id)
+
+        if item is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                values = {column: getattr(user, column) for column in CACHED_COLUMNS}
+                with state.lock:
+                    state.entries[user_id] = (time.monotonic() + state.ttl, values)
+                    while len(state.entries) > state.max_entries:
+                        state.entries.popitem(last=False)
+            return user
+
+        # Rebuild the instance as if it had just been loaded and attach it without a query
+        user = User(**item[1])
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        """Drop a user's cached row, e.g. after their profile or password changed."""
+        state = self._state()
+        if state is not None:
+            with state.lock:
+                state.entries.pop(int(user_id), None)
+
+
+user_cache = UserCache()
@@ -0,0 +1,46 @@
+"""Cached recipe counters and the cache_version table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('rating_sum', 'rating_count', 'comment_count', 'favorite_count')
+
+
+def upgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.String(length=32), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Fill the new counters from the existing rows
+    op.execute("""
+        UPDATE recipe SET
+            rating_sum = (SELECT COALESCE(SUM(value), 0) FROM rating WHERE rating.recipe_id = recipe.id),
+            rating_count = (SELECT COUNT(*) FROM rating WHERE rating.recipe_id = recipe.id),
+            comment_count = (SELECT COUNT(*) FROM comment WHERE comment.recipe_id = recipe.id),
+            favorite_count = (SELECT COUNT(*) FROM favorite WHERE favorite.recipe_id = recipe.id)
+    """)
+
+
+def downgrade():
+    op.drop_table('cache_version')
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
@@ -0,0 +1,80 @@
+"""Full-text search index for recipes (FTS5 on SQLite, tsvector + GIN on PostgreSQL)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:20:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# A copy of app.search's DDL as of this revision, so later changes there cannot alter it
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5(
+        title, description,
+        content='recipe', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ai AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ad AFTER DELETE ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_au AFTER UPDATE OF title, description ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+POSTGRES_DDL = (
+    """
+    ALTER TABLE recipe ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_recipe_search_vector ON recipe USING gin (search_vector)",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        # The external-content table starts empty; index the existing recipes
+        op.execute("INSERT INTO recipe_search(recipe_search) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('recipe_search_ai', 'recipe_search_ad', 'recipe_search_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS recipe_search')
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_recipe_search_vector')
+        op.execute('ALTER TABLE recipe DROP COLUMN IF EXISTS search_vector')
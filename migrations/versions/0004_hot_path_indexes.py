@@ -0,0 +1,52 @@
+"""Indexes for listings, profiles, the dashboard and the recipe page
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY outside
+the migration transaction, so tables stay writable while they build.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:30:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_recipe_created_at_id', 'recipe', ['created_at', 'id']),
+    ('ix_recipe_user_id_created_at', 'recipe', ['user_id', 'created_at']),
+    ('ix_comment_recipe_id_created_at', 'comment', ['recipe_id', 'created_at']),
+    ('ix_comment_user_id_created_at', 'comment', ['user_id', 'created_at']),
+    ('ix_recipe_ingredient_recipe_id', 'recipe_ingredient', ['recipe_id']),
+    ('ix_recipe_ingredient_ingredient_id', 'recipe_ingredient', ['ingredient_id']),
+    ('ix_recipe_categories_category_id', 'recipe_categories', ['category_id']),
+    ('ix_favorite_recipe_id', 'favorite', ['recipe_id']),
+    ('ix_rating_recipe_id', 'rating', ['recipe_id']),
+    ('ix_rating_user_id_created_at', 'rating', ['user_id', 'created_at']),
+    ('ix_rating_created_at', 'rating', ['created_at']),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, columns in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,32 @@
+"""Index recipe.updated_at for incremental pantry index refreshes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_recipe_updated_at', 'recipe', ['updated_at'],
+                            postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index('ix_recipe_updated_at', 'recipe', ['updated_at'], if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_recipe_updated_at', table_name='recipe', postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index('ix_recipe_updated_at', table_name='recipe', if_exists=True)
@@ -0,0 +1,38 @@
+"""Recipe trending score and favorite timestamps
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00
+
+The scores start at zero; run ``flask recompute-trending`` after upgrading to
+fill them from the existing ratings, comments and favorites.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trending_score', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index('ix_recipe_trending_score', ['trending_score'], unique=False)
+
+    # Existing favorites keep an unknown time and do not count towards trending
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.drop_index('ix_recipe_trending_score')
+        batch_op.drop_column('trending_score')
@@ -0,0 +1,98 @@
+"""Uploaded images for recipes and profile pictures
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:00:00
+
+On SQLite the new reference columns are added with ALTER TABLE instead of
+batch mode: rebuilding the recipe table would drop the full-text search
+triggers created in 0003.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# Full-text sync triggers from 0003, recreated when SQLite rebuilds the recipe table
+SQLITE_SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ai AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ad AFTER DELETE ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_au AFTER UPDATE OF title, description ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def add_reference(table_name, column_name, constraint_name):
+    """Add a nullable column referencing uploaded_image.id without rebuilding the table."""
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite accepts a REFERENCES clause on ADD COLUMN, but not ADD CONSTRAINT
+        op.execute(f'ALTER TABLE "{table_name}" ADD COLUMN {column_name} INTEGER '
+                   f'CONSTRAINT {constraint_name} REFERENCES uploaded_image (id)')
+    else:
+        op.add_column(table_name, sa.Column(column_name, sa.Integer(), nullable=True))
+        op.create_foreign_key(constraint_name, table_name, 'uploaded_image', [column_name], ['id'])
+
+
+def upgrade():
+    op.create_table('uploaded_image',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=10), server_default='pending', nullable=False),
+    sa.Column('variants', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('digest')
+    )
+    op.create_index('ix_uploaded_image_status', 'uploaded_image', ['status'], unique=False)
+
+    add_reference('recipe', 'image_id', 'fk_recipe_image_id')
+    add_reference('user', 'picture_id', 'fk_user_picture_id')
+
+
+def drop_reference(table_name, column_name, constraint_name):
+    """Drop a column added by add_reference()."""
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        # SQLite does not report the names of column-level constraints; the rebuild drops it anyway
+        if not sqlite:
+            batch_op.drop_constraint(constraint_name, type_='foreignkey')
+        batch_op.drop_column(column_name)
+
+
+def downgrade():
+    drop_reference('user', 'picture_id', 'fk_user_picture_id')
+    drop_reference('recipe', 'image_id', 'fk_recipe_image_id')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Batch mode rebuilt the recipe table without its triggers
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
+
+    op.drop_index('ix_uploaded_image_status', table_name='uploaded_image')
+    op.drop_table('uploaded_image')
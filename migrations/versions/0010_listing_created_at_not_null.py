@@ -0,0 +1,77 @@
+"""Make recipe and comment created_at NOT NULL
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 20:00:00
+
+Both columns order keyset-paginated listings and go into their cursors, so a
+row without a timestamp cannot be paged past. Rows that have none are given
+the oldest time known for them, which keeps them at the end of the newest
+first listings and out of the trending scores.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+# Full-text sync triggers from 0003, recreated when SQLite rebuilds the recipe table
+SQLITE_SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ai AFTER INSERT ON recipe BEGIN
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_ad AFTER DELETE ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipe_search_au AFTER UPDATE OF title, description ON recipe BEGIN
+        INSERT INTO recipe_search(recipe_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO recipe_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def set_created_at_nullable(nullable):
+    with op.batch_alter_table('recipe', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        # Batch mode rebuilt the recipe table without its triggers
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
+
+
+def upgrade():
+    op.execute(
+        'UPDATE recipe SET created_at = COALESCE(updated_at, '
+        '(SELECT MIN(created_at) FROM recipe), CURRENT_TIMESTAMP) '
+        'WHERE created_at IS NULL'
+    )
+    # A comment cannot be older than its recipe
+    op.execute(
+        'UPDATE comment SET created_at = '
+        '(SELECT recipe.created_at FROM recipe WHERE recipe.id = comment.recipe_id) '
+        'WHERE created_at IS NULL'
+    )
+    set_created_at_nullable(False)
+
+
+def downgrade():
+    set_created_at_nullable(True)
@@ -0,0 +1,50 @@
+"""Drop the cascading foreign key on similar_recipe.similar_id
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 21:00:00
+
+Deleting a recipe cascaded to the rows listing it as a neighbor, so the
+incremental ``similar-recipes`` refresh never saw that those lists had lost
+an entry. Without the constraint the rows stay behind until the refresh
+replaces them.
+
+The table only holds precomputed data and SQLite cannot drop an unnamed
+constraint in place, so it is recreated empty; the next ``flask
+similar-recipes`` run finds no previous run and recomputes every recipe.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def create_similar_recipe(neighbor_ondelete=None):
+    constraints = [sa.ForeignKeyConstraint(['recipe_id'], ['recipe.id'], ondelete='CASCADE')]
+    if neighbor_ondelete:
+        constraints.append(sa.ForeignKeyConstraint(['similar_id'], ['recipe.id'], ondelete=neighbor_ondelete))
+    op.create_table('similar_recipe',
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('similar_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    *constraints,
+    sa.PrimaryKeyConstraint('recipe_id', 'rank')
+    )
+
+
+def upgrade():
+    op.drop_table('similar_recipe')
+    create_similar_recipe()
+
+
+def downgrade():
+    op.drop_table('similar_recipe')
+    create_similar_recipe(neighbor_ondelete='CASCADE')
@@ -0,0 +1,34 @@
+"""Recipe content_updated_at timestamp for the similar-recipes refresh
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 22:00:00
+
+``updated_at`` also moves when a comment, rating or favorite changes a
+recipe's cached counters, so the incremental ``similar-recipes`` refresh
+recomputed recipes whose ingredients and categories had not changed. The new
+column only moves when the recipe itself is edited. Existing rows start from
+``updated_at``, which is never earlier than their last edit.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A plain ADD COLUMN, so SQLite keeps the recipe table (and its search triggers)
+    op.add_column('recipe', sa.Column('content_updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE recipe SET content_updated_at = COALESCE(updated_at, created_at)')
+    op.create_index('ix_recipe_content_updated_at', 'recipe', ['content_updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_recipe_content_updated_at', table_name='recipe')
+    op.drop_column('recipe', 'content_updated_at')
@@ -1,6 +1,9 @@
 """Script to seed the database with sample data."""
-from app.extensions import app, db, bcrypt
+from app import create_app
+from app.extensions import db, bcrypt
 from app.models import User, Recipe, Ingredient, RecipeIngredient, Category, Comment, Favorite
+from app.counters import recompute_recipe_counters
+from app.trending import recompute_trending_scores
 from datetime import datetime, timedelta
 import random
 
@@ -191,13 +194,23 @@ def seed_database():
                 user_id=user.id, recipe_id=recipe.id
             ).first()
             if not existing_favorite:
-                favorite = Favorite(user_id=user.id, recipe_id=recipe.id)
+                favorite = Favorite(
+                    user_id=user.id,
+                    recipe_id=recipe.id,
+                    created_at=datetime.utcnow() - timedelta(days=random.randint(0, 10))
+                )
                 db.session.add(favorite)
     
     db.session.commit()
     
+    # Fill in the cached recipe counters and trending scores for the rows inserted above
+    recompute_recipe_counters()
+    recompute_trending_scores()
+    db.session.commit()
+    
     print("Database seeded successfully!")
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         seed_database() 
\ No newline at end of file